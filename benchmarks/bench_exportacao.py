@@ -0,0 +1,59 @@
+"""Benchmark: exportação de uma tabela grande para Excel, caminho antigo
+(pd.ExcelWriter em BytesIO, workbook inteiro em memória) vs. a gravação em
+fluxo de consumo/export.py (xlsxwriter constant_memory, lotes de linhas),
+e as alternativas CSV e Parquet. Mede tempo, acréscimo de pico de RSS durante a
+exportação e tamanho do arquivo, para tamanhos crescentes de tabela.
+
+    python benchmarks/bench_exportacao.py --linhas 50000 200000 800000
+"""
+import argparse
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from consumo import export  # noqa: E402
+from bench_pipeline import MedidorEtapas  # noqa: E402
+
+
+def caminho_antigo(df):
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Dados')
+    return output.getvalue()
+
+
+def tabela(linhas, colunas=14, semente=0):
+    # Parecida com a visão geral por unidade: descrição + colunas de consumo
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame(rng.gamma(0.3, 200, size=(linhas, colunas)).round(), columns=[f"UNIDADE {i:02d}" for i in range(colunas)])
+    df.insert(0, 'Descricao', [f"INSUMO SINTETICO {i:07d}" for i in range(linhas)])
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, nargs='+', default=[50_000, 200_000, 800_000])
+    args = parser.parse_args()
+
+    caminhos = {
+        'excel antigo (ExcelWriter)': caminho_antigo,
+        'excel em fluxo': lambda df: export.df_to_excel_bytes(df, export.FORMATO_INTEIRO),
+        'csv (.zip)': lambda df: export.frames_to_csv_zip_bytes({'Dados': df}),
+        'parquet (.zip)': lambda df: export.frames_to_parquet_zip_bytes({'Dados': df}),
+    }
+    for linhas in args.linhas:
+        df = tabela(linhas)
+        print(f"--- {linhas:,} linhas x {df.shape[1]} colunas (DataFrame: {df.memory_usage(deep=True).sum() / 2**20:.0f} MB)")
+        medidor = MedidorEtapas()
+        for nome, funcao in caminhos.items():
+            dados = medidor.run(nome, funcao, df)
+            print(f"{'':28s} arquivo: {len(dados) / 2**20:.1f} MB")
+            del dados
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark: gasto por fornecedor e lotes a vencer, pelos agregados montados
+na carga (consumo/spend.py, consumo/expiry_index.py) vs. varrendo as linhas
+pré-processadas a cada consulta (como a análise feita fora do dashboard).
+Mede a montagem dos agregados e o tempo por consulta, para combinações
+aleatórias de filtros, e confere que os dois caminhos dão o mesmo resultado.
+
+    python benchmarks/bench_gasto_validade.py --linhas 1000000 --consultas 30
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from consumo import engine, spend  # noqa: E402
+from consumo.expiry_index import LotExpiryIndex, build_lot_table  # noqa: E402
+from gerador_material import generate_material_csv  # noqa: E402
+
+
+def scan_supplier_spend(df, codigos, anos, movimento):
+    linhas = df[df['Ano'].isin(anos) & (df['Descricao Movimento'] == movimento) & (df['Cód. Insumo'].isin(codigos) if codigos is not None else True)]
+    return spend.spend_by(linhas.assign(Valor=linhas['Valor'].astype('float64'), Quantidade=linhas['Quantidade'].astype('float64')), spend.COLUNA_FORNECEDOR)
+
+
+def scan_expiring(df, referencia, dias, codigos):
+    # Filtra as linhas pela validade e agrega os lotes da janela a cada consulta
+    referencia = pd.Timestamp(referencia)
+    janela = df[(df['DT Validade'] >= referencia) & (df['DT Validade'] <= referencia + pd.Timedelta(days=dias))]
+    if codigos is not None: janela = janela[janela['Cód. Insumo'].isin(codigos)]
+    return build_lot_table(janela)
+
+
+def timed(funcao, *args):
+    inicio = time.perf_counter(); resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--consultas', type=int, default=30)
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = generate_material_csv(os.path.join(pasta, 'Material-CSVANUAL.csv'), args.linhas)
+        df = engine.load_material_frame(caminho)
+    cubo_fornecedor, t_cubo = timed(spend.build_supplier_cube, df)
+    lotes, t_lotes = timed(build_lot_table, df)
+    indice, t_indice = timed(LotExpiryIndex, lotes)
+    print(f"linhas: {len(df):,}  agregado de fornecedores: {len(cubo_fornecedor):,} células em {t_cubo:.2f} s  "
+          f"lotes: {len(lotes):,} em {t_lotes:.2f} s (+ índice {t_indice * 1000:.1f} ms)")
+
+    rng = np.random.default_rng(args.semente)
+    insumos = df['Cód. Insumo'].cat.categories
+    anos = sorted(df['Ano'].unique().tolist()); movimentos = engine.movement_options(df)
+    validades = lotes['DT Validade']
+    tempos = {'gasto (linhas)': 0.0, 'gasto (agregado)': 0.0, 'lotes (linhas)': 0.0, 'lotes (índice)': 0.0}
+    for _ in range(args.consultas):
+        codigos = list(rng.choice(insumos, size=int(rng.integers(1, 50)), replace=False)) if rng.random() < 0.7 else None
+        anos_consulta = [int(a) for a in rng.choice(anos, size=int(rng.integers(1, len(anos) + 1)), replace=False)]
+        movimento = movimentos[int(rng.integers(len(movimentos)))]
+        esperado, t = timed(scan_supplier_spend, df, codigos, anos_consulta, movimento); tempos['gasto (linhas)'] += t
+        obtido, t = timed(lambda: spend.spend_by(spend.select_supplier_cells(cubo_fornecedor, codigos, (), anos_consulta, movimento), spend.COLUNA_FORNECEDOR)); tempos['gasto (agregado)'] += t
+        pd.testing.assert_frame_equal(esperado.astype({spend.COLUNA_FORNECEDOR: object}), obtido.astype({spend.COLUNA_FORNECEDOR: object}), check_dtype=False, rtol=1e-6)
+
+        referencia = validades.iloc[int(rng.integers(len(validades)))] - pd.Timedelta(days=int(rng.integers(0, 60))); dias = int(rng.integers(30, 365))
+        esperado, t = timed(scan_expiring, df, referencia, dias, codigos); tempos['lotes (linhas)'] += t
+        obtido, t = timed(indice.expiring, referencia, dias, 0, codigos); tempos['lotes (índice)'] += t
+        assert len(esperado) == len(obtido), f"lotes: {len(esperado)} != {len(obtido)}"
+    for nome, segundos in tempos.items():
+        print(f"{nome:18s} {segundos / args.consultas * 1000:9.2f} ms por consulta")
+    print(f"{args.consultas} consultas com o mesmo resultado nos dois caminhos")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark: custo dos gráficos das seções por insumo conforme o número de
+insumos selecionados, sem limite de séries (uma por insumo) vs. com o limite
+de consumo/charts.py (maiores insumos + "Outros"). Mede montagem da figura,
+serialização (o que o st.plotly_chart faz a cada execução), tamanho do JSON
+enviado ao navegador e número de traces.
+
+    python benchmarks/bench_graficos.py --insumos 10 100 500 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from consumo import charts  # noqa: E402
+from consumo.pipeline import MESES_PT_ORDENADOS  # noqa: E402
+
+ANOS = [2023, 2024, 2025]
+
+
+def tabelas(insumos, semente=0):
+    # Consumo anual (insumo x ano), detalhe mensal (insumo x mês) e média geral, como os do engine
+    rng = np.random.default_rng(semente)
+    codigos = [str(100000 + i) for i in range(insumos)]
+    descricoes = pd.Categorical([f"INSUMO SINTETICO {i:05d}" for i in range(insumos)])
+    anual = pd.DataFrame({
+        'Cód. Insumo': np.repeat(codigos, len(ANOS)), 'Desc. Insumo': np.repeat(descricoes, len(ANOS)), 'Ano': np.tile(ANOS, insumos),
+        'Consumo Total Anual': rng.gamma(0.5, 2000, insumos * len(ANOS)).round(), 'Consumo Médio Mensal (agregado)': rng.gamma(0.5, 200, insumos * len(ANOS)),
+    })
+    mensal = pd.DataFrame({
+        'Cód. Insumo': np.repeat(codigos, 12), 'Desc. Insumo': np.repeat(descricoes, 12), 'Mês Num': np.tile(np.arange(1, 13), insumos),
+        'Mês Nome': np.tile(MESES_PT_ORDENADOS, insumos), 'Quantidade': rng.gamma(0.5, 200, insumos * 12),
+    })
+    geral = anual.groupby(['Cód. Insumo', 'Desc. Insumo'], observed=True)['Consumo Médio Mensal (agregado)'].mean().reset_index()
+    return anual, mensal, geral
+
+
+def measure(montar):
+    import plotly.io as pio
+    inicio = time.perf_counter(); fig = montar(); montagem = time.perf_counter() - inicio
+    inicio = time.perf_counter(); spec = pio.to_json(fig.to_dict(), validate=False); serializacao = time.perf_counter() - inicio
+    return montagem, serializacao, len(spec), len(fig.data), fig.data[0].type
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--insumos', type=int, nargs='+', default=[10, 100, 500, 2000])
+    args = parser.parse_args()
+
+    for insumos in args.insumos:
+        anual, mensal, geral = tabelas(insumos)
+        print(f"--- {insumos:,} insumos")
+        for limite, rotulo in ((None, 'sem limite'), (charts.LIMITE_SERIES, f'limite {charts.LIMITE_SERIES}')):
+            graficos = {
+                'tendência anual': lambda: charts.annual_trend_figure(anual, limite),
+                'média mensal anual': lambda: charts.annual_average_figure(anual, limite),
+                'detalhe mensal': lambda: charts.monthly_detail_figure(mensal, 'Detalhe', limite),
+                'média geral': lambda: charts.overall_average_figure(geral, 'Consumo Médio Mensal (agregado)', limite),
+            }
+            for nome, montar in graficos.items():
+                montagem, serializacao, tamanho, traces, tipo = measure(montar)
+                print(f"{rotulo:11s} {nome:19s} montagem {montagem * 1000:8.1f} ms  serialização {serializacao * 1000:7.1f} ms  "
+                      f"JSON {tamanho / 1024:8.1f} KB  {traces:5d} traces ({tipo})", flush=True)
+
+
+if __name__ == '__main__':
+    main()
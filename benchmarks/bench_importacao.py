@@ -0,0 +1,61 @@
+"""Benchmark: início de um worker novo. Em um processo Python novo, importa os
+módulos do dashboard e faz a primeira execução do script (AppTest, sem filtros
+selecionados, como a primeira visita), medindo tempo, memória residente e quais
+módulos só de exportação (reportlab, xlsxwriter, kaleido) já foram carregados.
+
+    python benchmarks/bench_importacao.py --dados pasta/com/Material-CSVANUAL.csv --repeticoes 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULOS_EXPORTACAO = ['reportlab.platypus', 'xlsxwriter', 'kaleido', 'plotly.express']
+
+CODIGO_WORKER = r'''
+import json, os, sys, time
+
+def rss():
+    with open('/proc/self/statm') as f: return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+inicio = time.perf_counter()
+import streamlit, pandas  # noqa: E401 (carregados por qualquer worker)
+base = time.perf_counter()
+import consumo.charts, consumo.export, consumo.report_pdf, consumo.report_jobs  # noqa: E401
+importacao = time.perf_counter()
+rss_importacao = rss()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=600)
+app.run()
+fim = time.perf_counter()
+print(json.dumps(dict(
+    importacao=importacao - base, primeira_execucao=fim - importacao, rss_importacao=rss_importacao, rss_final=rss(),
+    carregados=[m for m in sys.argv[2:] if m in sys.modules],
+)))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dados', required=True, help="diretório de trabalho do dashboard (com o CSV de material)")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    resultados = []
+    for _ in range(args.repeticoes):
+        saida = subprocess.run([sys.executable, '-c', CODIGO_WORKER, os.path.join(RAIZ, 'dashboards.py'), *MODULOS_EXPORTACAO],
+                               cwd=args.dados, env=ambiente, capture_output=True, text=True, check=True)
+        resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    def mediana(chave): return statistics.median(r[chave] for r in resultados)
+    print(f"importação dos módulos consumo.*: {mediana('importacao') * 1000:7.1f} ms   RSS: {mediana('rss_importacao') / 2**20:6.1f} MB")
+    print(f"primeira execução do dashboard:   {mediana('primeira_execucao') * 1000:7.1f} ms   RSS: {mediana('rss_final') / 2**20:6.1f} MB")
+    print(f"módulos de exportação carregados: {', '.join(resultados[-1]['carregados']) or 'nenhum'}")
+
+
+if __name__ == '__main__':
+    main()
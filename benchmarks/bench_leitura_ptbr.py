@@ -0,0 +1,83 @@
+"""Benchmark: conversão de números pt-BR e datas na leitura vs. o caminho antigo
+(astype(str).str.replace + to_numeric e to_datetime(dayfirst=True) sem formato).
+
+    python benchmarks/bench_leitura_ptbr.py --linhas 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from consumo.pipeline import read_material_csv, preprocess_frame  # noqa: E402
+
+AMOSTRA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Material-RELAJANEIRO.csv')
+
+
+def gera_csv_grande(destino, linhas):
+    with open(AMOSTRA, encoding='utf-8-sig') as f:
+        cabecalho, *corpo = f.read().splitlines()
+    with open(destino, 'w', encoding='utf-8') as f:
+        f.write(cabecalho + '\n')
+        escritas = 0
+        while escritas < linhas:
+            bloco = corpo[:linhas - escritas]
+            f.write('\n'.join(bloco) + '\n')
+            escritas += len(bloco)
+
+
+def _to_number_ptbr_antigo(serie):
+    return pd.to_numeric(serie.astype(str).str.replace('.', '', regex=False).str.replace(',', '.', regex=False), errors='coerce')
+
+
+def caminho_antigo(caminho):
+    df = pd.read_csv(caminho, sep=';', encoding='utf-8')
+    df['Quantidade'] = _to_number_ptbr_antigo(df['Quantidade']).abs()
+    df['Valor '] = _to_number_ptbr_antigo(df['Valor ']).abs()
+    df['Dt Movimento'] = pd.to_datetime(df['Dt Movimento'], dayfirst=True, errors='coerce')
+    return df
+
+
+def caminho_novo(caminho):
+    # Números e datas (Dt Movimento e DT Validade) já chegam convertidos do leitor
+    df = read_material_csv(caminho)
+    df['Quantidade'] = df['Quantidade'].abs()
+    df['Valor '] = df['Valor '].abs()
+    return df
+
+
+def cronometra(funcao, *args, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'Material-BENCH.csv')
+        gera_csv_grande(caminho, args.linhas)
+        t_antigo, df_antigo = cronometra(caminho_antigo, caminho, repeticoes=args.repeticoes)
+        t_novo, df_novo = cronometra(caminho_novo, caminho, repeticoes=args.repeticoes)
+        t_pre, _ = cronometra(preprocess_frame, read_material_csv(caminho), repeticoes=args.repeticoes)
+
+    for col in ['Quantidade', 'Valor ', 'Dt Movimento']:
+        pd.testing.assert_series_equal(df_antigo[col].astype(df_novo[col].dtype), df_novo[col])
+    print(f"linhas: {args.linhas:,}")
+    print(f"leitura + conversão (caminho antigo): {t_antigo:8.2f} s")
+    print(f"leitura + conversão (na leitura):     {t_novo:8.2f} s  ({t_antigo / t_novo:.1f}x)")
+    print(f"preprocess_frame completo:            {t_pre:8.2f} s")
+
+
+if __name__ == '__main__':
+    main()
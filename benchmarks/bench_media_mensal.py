@@ -0,0 +1,63 @@
+"""Benchmark: média mensal sobre meses com consumo, kernel vetorizado
+(consumo.metrics.monthly_average) vs. o caminho antigo (groupby sum + groupby
+nunique + merge + apply por linha), sobre as linhas pré-processadas
+(o pré-processamento descarta ~20% das linhas da amostra).
+
+    python benchmarks/bench_media_mensal.py --linhas 1300000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from consumo.metrics import COLUNA_MEDIA, monthly_average  # noqa: E402
+from consumo.pipeline import preprocess_frame, read_material_csv  # noqa: E402
+from bench_leitura_ptbr import cronometra, gera_csv_grande  # noqa: E402
+
+CENARIOS = {
+    'insumo/ano': ['Cód. Insumo', 'Desc. Insumo', 'Ano'],
+    'unidade/ano': ['Descricao Requisitante', 'Ano'],
+}
+
+
+def caminho_antigo(df, chaves):
+    total = df.groupby(chaves, observed=True)['Quantidade'].sum().reset_index()
+    meses = df[df['Quantidade'] > 0].groupby(chaves, observed=True)['Mês Num'].nunique().reset_index()
+    meses.rename(columns={'Mês Num': 'Meses'}, inplace=True)
+    resultado = pd.merge(total, meses, on=chaves, how='left')
+    resultado['Meses'] = resultado['Meses'].fillna(0)
+    resultado['Media'] = resultado.apply(lambda row: row['Quantidade'] / row['Meses'] if row['Meses'] > 0 else 0, axis=1)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--linhas', type=int, default=1_300_000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'Material-BENCH.csv')
+        gera_csv_grande(caminho, args.linhas)
+        df = preprocess_frame(read_material_csv(caminho))
+    # Espalha as linhas por meses e anos distintos, para o nº de meses variar por grupo
+    rng = np.random.default_rng(0)
+    df['Mês Num'] = rng.integers(1, 13, len(df)).astype(df['Mês Num'].dtype)
+    df['Ano'] = rng.integers(2022, 2025, len(df)).astype(df['Ano'].dtype)
+
+    print(f"linhas: {len(df):,}")
+    for nome, chaves in CENARIOS.items():
+        t_antigo, antigo = cronometra(caminho_antigo, df, chaves, repeticoes=args.repeticoes)
+        t_novo, novo = cronometra(monthly_average, df, chaves, repeticoes=args.repeticoes)
+        pd.testing.assert_frame_equal(antigo[chaves], novo.index.to_frame(index=False))
+        # Quantidade é float32 no esquema compacto; o kernel acumula em float64
+        np.testing.assert_allclose(antigo['Media'].to_numpy(), novo[COLUNA_MEDIA].to_numpy(), rtol=1e-6)
+        print(f"{nome:12s} grupos: {len(novo):6,}  antigo: {t_antigo:7.3f} s  kernel: {t_novo:7.3f} s  ({t_antigo / t_novo:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
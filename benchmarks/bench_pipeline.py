@@ -0,0 +1,171 @@
+"""Benchmark por etapa do pipeline carga -> pré-processamento -> filtros ->
+seções de análise -> exportação, sobre um CSV sintético (gerador_material.py).
+Cada etapa registra o tempo e o pico de memória (RSS); o resultado vai para um
+JSON, para comparar versões.
+
+    python benchmarks/bench_pipeline.py --linhas 1000000 --saida resultado.json
+    python benchmarks/bench_pipeline.py --comparar base.json resultado.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from consumo import engine  # noqa: E402
+from consumo.cube import build_consumption_cube  # noqa: E402
+from consumo.export import df_to_excel_bytes, report_excel_bytes  # noqa: E402
+from consumo.filter_index import FilterIndex  # noqa: E402
+from consumo.pipeline import load_material_csv_chunked, preprocess_frame, read_material_csv  # noqa: E402
+from consumo.profiling import rss_bytes  # noqa: E402
+from gerador_material import generate_material_csv  # noqa: E402
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOVIMENTO_CONSUMO = 'FORNECIMENTO A SETORES CONSUMIDORES'
+
+
+class MedidorEtapas:
+    # Cronometra etapas e amostra o RSS em uma thread durante cada uma.
+    def __init__(self, intervalo=0.005):
+        self.intervalo = intervalo
+        self.etapas = []
+
+    def run(self, nome, funcao, *args, **kwargs):
+        inicial = rss_bytes(); pico = [inicial]; parar = threading.Event()
+
+        def amostra():
+            while not parar.wait(self.intervalo):
+                pico[0] = max(pico[0], rss_bytes())
+        thread = threading.Thread(target=amostra, daemon=True); thread.start()
+        inicio = time.perf_counter()
+        try:
+            resultado = funcao(*args, **kwargs)
+        finally:
+            segundos = time.perf_counter() - inicio
+            parar.set(); thread.join()
+        pico[0] = max(pico[0], rss_bytes())
+        self.etapas.append({'etapa': nome, 'segundos': round(segundos, 4),
+                            'rss_inicial_mb': round(inicial / 2**20, 1), 'pico_rss_mb': round(pico[0] / 2**20, 1),
+                            'acrescimo_mb': round((pico[0] - inicial) / 2**20, 1)})
+        print(f"{nome:28s} {segundos:9.3f} s   pico RSS {pico[0] / 2**20:9.1f} MB (+{(pico[0] - inicial) / 2**20:.1f})", flush=True)
+        return resultado
+
+
+def _versao_codigo():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(caminho, args):
+    medidor = MedidorEtapas()
+    if args.blocos:
+        df = medidor.run('carga+preprocessamento (blocos)', load_material_csv_chunked, caminho, args.blocos * 2**20)
+    else:
+        bruto = medidor.run('load_data', read_material_csv, caminho)
+        df = medidor.run('preprocess_data', preprocess_frame, bruto)
+        del bruto
+    cubo = medidor.run('cubo mensal', build_consumption_cube, df)
+    indice = medidor.run('indice de filtros', FilterIndex, cubo)
+
+    # Seleção típica: os insumos mais consumidos de metade das classes, todos os anos
+    anos = sorted(cubo['Ano'].unique().tolist())
+    classes = sorted(cubo['Descricao Classe'].dropna().unique())[::2]
+    mais_consumidos = cubo.groupby('Desc. Insumo', observed=True)['Quantidade'].sum().nlargest(args.insumos_selecionados).index.tolist()
+
+    def bloco_filtros():
+        posicoes = engine.select_insumos(indice, desc=mais_consumidos, classes=classes)
+        return cubo['Desc. Insumo'].iloc[posicoes].unique(), engine.select_analysis(cubo, indice, posicoes, anos, MOVIMENTO_CONSUMO)
+    insumos, analise = medidor.run('bloco de filtros', bloco_filtros)
+    insumos = sorted(insumos)
+
+    consumo_anual = medidor.run('secao consumo anual', engine.annual_consumption, analise)
+    medidor.run('secao pivots anuais', lambda: (engine.annual_pivot(consumo_anual, 'Consumo Total Anual'),
+                                                engine.annual_pivot(consumo_anual, 'Consumo Médio Mensal (agregado)')))
+    medidor.run('secao detalhe mensal', engine.monthly_detail, analise, consumo_anual, anos)
+    medidor.run('secao media geral', engine.overall_monthly_average, consumo_anual, len(anos))
+    unidades = medidor.run('secao unidades', engine.unit_overview, analise)
+    medidor.run('secao analise por unidade', engine.unit_analysis, analise, insumos[0] if insumos else None)
+
+    relatorio = engine.build_report(cubo, indice, anos, MOVIMENTO_CONSUMO, desc=mais_consumidos, classes=classes)
+    medidor.run('df_to_excel_bytes', df_to_excel_bytes, unidades)
+    medidor.run('pacote excel', report_excel_bytes, relatorio)
+    if not args.sem_pdf:
+        # Importado aqui: o reportlab só entra na medição quando o PDF é pedido
+        from consumo.report_pdf import report_pdf_bytes
+        avisos = []
+        medidor.run('generate_pdf_report', report_pdf_bytes, relatorio, avisar=avisos.append)
+        if avisos: print(f"  (PDF gerado com {len(avisos)} aviso(s); ex.: {avisos[0].splitlines()[0]})")
+    return medidor.etapas, {'linhas_csv': args.linhas, 'linhas_preprocessadas': len(df), 'celulas_cubo': len(cubo),
+                            'linhas_analise': len(analise), 'insumos_selecionados': len(insumos)}
+
+
+def compare(caminho_base, caminho_novo):
+    with open(caminho_base, encoding='utf-8') as f: base = json.load(f)
+    with open(caminho_novo, encoding='utf-8') as f: novo = json.load(f)
+    print(f"base: {base['meta'].get('versao_codigo')} ({base['meta']['parametros']['linhas']:,} linhas)   "
+          f"novo: {novo['meta'].get('versao_codigo')} ({novo['meta']['parametros']['linhas']:,} linhas)")
+    etapas_base = {e['etapa']: e for e in base['etapas']}
+    for etapa in novo['etapas']:
+        anterior = etapas_base.get(etapa['etapa'])
+        if anterior is None:
+            print(f"{etapa['etapa']:28s} {etapa['segundos']:9.3f} s   (nova)"); continue
+        razao = anterior['segundos'] / etapa['segundos'] if etapa['segundos'] else float('inf')
+        print(f"{etapa['etapa']:28s} {anterior['segundos']:9.3f} s -> {etapa['segundos']:9.3f} s ({razao:5.2f}x)   "
+              f"pico {anterior['pico_rss_mb']:8.1f} -> {etapa['pico_rss_mb']:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--insumos', type=int, default=2000)
+    parser.add_argument('--requisitantes', type=int, default=300)
+    parser.add_argument('--classes', type=int, default=30)
+    parser.add_argument('--anos', type=int, nargs=2, default=[2024, 2025], metavar=('INICIAL', 'FINAL'))
+    parser.add_argument('--insumos-selecionados', type=int, default=20)
+    parser.add_argument('--blocos', type=int, metavar='MB', help="carrega com a leitura em blocos (tamanho do bloco em MB)")
+    parser.add_argument('--sem-pdf', action='store_true')
+    parser.add_argument('--csv', help="usa um CSV existente em vez de gerar um")
+    parser.add_argument('--saida', help="arquivo JSON de resultado (padrão: bench_pipeline_<versão>_<linhas>.json)")
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NOVO'))
+    args = parser.parse_args()
+    if args.comparar:
+        compare(*args.comparar); return
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = args.csv or os.path.join(pasta, 'Material-BENCH.csv')
+        if not args.csv:
+            inicio = time.perf_counter()
+            generate_material_csv(caminho, args.linhas, args.insumos, args.requisitantes, args.classes, args.anos)
+            print(f"CSV sintético: {args.linhas:,} linhas, {os.path.getsize(caminho) / 2**20:.0f} MB em {time.perf_counter() - inicio:.1f} s")
+        etapas, volumes = run_suite(caminho, args)
+        tamanho_csv = os.path.getsize(caminho)
+
+    versao = _versao_codigo()
+    resultado = {
+        'meta': {
+            'versao_codigo': versao, 'data': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'pandas': pd.__version__, 'plataforma': platform.platform(),
+            'cpus': os.cpu_count(), 'tamanho_csv_bytes': tamanho_csv,
+            'parametros': {k: v for k, v in vars(args).items() if k not in ('comparar', 'saida')},
+            'volumes': volumes,
+        },
+        'etapas': etapas,
+    }
+    saida = args.saida or f"bench_pipeline_{versao or 'local'}_{args.linhas}.json"
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=1)
+    print(f"resultado: {saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Gerador de CSVs sintéticos no layout exato das exportações Material-*.csv:
+UTF-8 com BOM, separador ';', decimais pt-BR, campos de texto com padding de
+espaços, as mesmas 28 colunas (e o ';' final de cada linha).
+
+    python benchmarks/gerador_material.py saida.csv --linhas 1000000 --insumos 2000 --requisitantes 300 --anos 2023 2025
+"""
+import argparse
+import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+CABECALHO = ("Insumo;Descricao;Embalagem;Dt Movimento;Requisicao;T;Mov;Descricao Movimento;Quantidade;Valor ;CGC;"
+             "Fornecedor;Lote;DT Validade;Empenho;Atendente;Local;RE Paciente;BE Paciente;Nome Paciente;Centro Custo;"
+             "Descricao Centro Custo;Contabil;Descricao Contabil;Codigo Requisitante;Descricao Requisitante;Classe;"
+             "Descricao da Classe;")
+
+# (Mov, Descricao Movimento, T, peso): distribuição próxima à da exportação real
+MOVIMENTOS = [
+    ('23100', 'FORNECIMENTO A SETORES CONSUMIDORES', 'S', 0.80),
+    ('21480', 'ESTORNO DE SAIDA DE MATERIAL', 'E', 0.06),
+    ('10942', 'AJUSTE DE ENTRADA - INVENTARIO', 'E', 0.05),
+    ('14302', 'AJUSTE DE SAIDA - INVENTARIO', 'S', 0.04),
+    ('10782', 'RECEB. NOTA DE ENTREGA FATURADO', 'E', 0.04),
+    ('14182', 'CONSERTO/TROCA/DEVOLUCAO', 'S', 0.01),
+]
+FORNECEDORES = ['LABNORTE', 'CIRURGICA FERNANDES', 'MEDICAL MERCANTIL', 'DISTRIBUIDORA NORTE', 'AJUSTE DE INVENTARIO', 'POLAR FIX']
+EMBALAGENS = ['PCT.', 'CX.', 'UND', 'FR.', 'PC.', 'RL.', 'KIT', 'ENV.']
+ATENDENTES = ['SAMUEL', 'SYRLENE', 'REGINA', 'LORENA', 'CAMILA', 'ANDREI']
+UNIDADES_SAUDE = ['HOSPITAL DE BASE', 'HOSPITAL JOAO PAULO II', 'CENTRO MEDICINA TROPICAL RONDO', 'POLICLINICA OSWALDO CRUZ', 'DIVERSOS']
+CONTABEIS = [('903036', 'MAT.HOSPITALAR PADRO'), ('903015', 'MAT.CURATIVOS HOSPIT'), ('903026', 'MAT.SONDAS')]
+TAMANHO_BLOCO_LINHAS = 500_000
+
+
+def _pad(valores, largura):
+    return np.array([str(v)[:largura].ljust(largura) for v in valores], dtype=object)
+
+
+def _dias(ano_inicial, ano_final):
+    inicio = datetime.date(ano_inicial, 1, 1)
+    n = (datetime.date(ano_final, 12, 31) - inicio).days + 1
+    return np.array([(inicio + datetime.timedelta(days=i)).strftime('%d/%m/%Y') for i in range(n)], dtype=object)
+
+
+def _numero_ptbr(centavos):
+    # Inteiro em centavos -> "-97,20" / "162"
+    absoluto = np.abs(centavos)
+    inteiro = pd.Series(absoluto // 100).astype(str)
+    fracao = pd.Series(absoluto % 100).astype(str).str.zfill(2)
+    sinal = pd.Series(np.where(centavos < 0, '-', ''))
+    return (sinal + inteiro + np.where(absoluto % 100 == 0, '', ',' + fracao)).to_numpy(dtype=object)
+
+
+def generate_material_csv(destino, linhas, insumos=2000, requisitantes=300, classes=30, anos=(2024, 2025), semente=0):
+    rng = np.random.default_rng(semente)
+    ano_inicial, ano_final = min(anos), max(anos)
+    dias = _dias(ano_inicial, ano_final)
+    validades = _dias(ano_final + 1, ano_final + 3)
+
+    # Dimensões: cada insumo pertence a uma classe e tem preço e embalagem próprios
+    codigos_insumo = np.array([str(100 + i) for i in range(insumos)], dtype=object)
+    descricoes = _pad([f"INSUMO SINTETICO {i:05d} REF {rng.integers(1000, 9999)} C/ {rng.integers(1, 200)} UND" for i in range(insumos)], 90)
+    embalagens = _pad(EMBALAGENS, 10)[rng.integers(0, len(EMBALAGENS), insumos)]
+    classe_do_insumo = rng.integers(0, classes, insumos)
+    precos_centavos = rng.integers(10, 50_000, insumos)
+    codigos_classe = np.array([str(3000001 + 1000 * c) for c in range(classes)], dtype=object)
+    descricoes_classe = _pad([f"CLASSE SINTETICA {c:03d}" for c in range(classes)], 20)
+    codigos_req = np.array([str(r + 1) for r in range(requisitantes)], dtype=object)
+    descricoes_req = _pad([f"SETOR {r:04d}" for r in range(requisitantes)], 20)
+    pesos_mov = np.array([m[3] for m in MOVIMENTOS]); pesos_mov /= pesos_mov.sum()
+    # Popularidade tipo Zipf: poucos insumos e setores concentram a maior parte das linhas
+    pop_insumo = 1.0 / np.arange(1, insumos + 1); pop_insumo /= pop_insumo.sum()
+    pop_req = 1.0 / np.arange(1, requisitantes + 1) ** 0.8; pop_req /= pop_req.sum()
+
+    # Escrita pelo writer CSV do Arrow, sem aspas (como a exportação original)
+    opcoes = pa_csv.WriteOptions(include_header=False, delimiter=';', quoting_style='none')
+    with open(destino, 'wb') as f:
+        f.write(('\ufeff' + CABECALHO + '\n').encode('utf-8'))
+        geradas = 0
+        while geradas < linhas:
+            n = min(TAMANHO_BLOCO_LINHAS, linhas - geradas)
+            insumo = rng.choice(insumos, n, p=pop_insumo)
+            req = rng.choice(requisitantes, n, p=pop_req)
+            mov = rng.choice(len(MOVIMENTOS), n, p=pesos_mov)
+            saida = np.array([m[2] == 'S' for m in MOVIMENTOS])[mov]
+            quantidade = rng.integers(1, 200, n) * np.where(saida, -1, 1)
+            fornecedor = rng.integers(0, len(FORNECEDORES), n)
+            contabil = rng.integers(0, len(CONTABEIS), n)
+            unidade = rng.integers(0, len(UNIDADES_SAUDE), n)
+            bloco = pd.DataFrame({
+                'Insumo': codigos_insumo[insumo],
+                'Descricao': descricoes[insumo],
+                'Embalagem': embalagens[insumo],
+                'Dt Movimento': dias[rng.integers(0, len(dias), n)],
+                'Requisicao': np.where(rng.random(n) < 0.3, '2,03E+11', (rng.integers(2_000_000_000, 2_099_999_999, n)).astype(str)),
+                'T': np.array([m[2] for m in MOVIMENTOS], dtype=object)[mov],
+                'Mov': np.array([m[0] for m in MOVIMENTOS], dtype=object)[mov],
+                'Descricao Movimento': _pad([m[1] for m in MOVIMENTOS], 40)[mov],
+                'Quantidade': _numero_ptbr(quantidade * 100),
+                'Valor ': _numero_ptbr(quantidade * precos_centavos[insumo]),
+                'CGC': '3,03E+12',
+                'Fornecedor': _pad(FORNECEDORES, 30)[fornecedor],
+                'Lote': _pad([f"L{i:06d}" for i in range(1000)], 15)[rng.integers(0, 1000, n)],
+                'DT Validade': validades[rng.integers(0, len(validades), n)],
+                'Empenho': ' ' * 19,
+                'Atendente': _pad(ATENDENTES, 8)[rng.integers(0, len(ATENDENTES), n)],
+                'Local': '0', 'RE Paciente': '0', 'BE Paciente': '0', 'Nome Paciente': '',
+                'Centro Custo': (unidade + 1).astype(str),
+                'Descricao Centro Custo': _pad(UNIDADES_SAUDE, 30)[unidade],
+                'Contabil': np.array([c[0] for c in CONTABEIS], dtype=object)[contabil],
+                'Descricao Contabil': _pad([c[1] for c in CONTABEIS], 20)[contabil],
+                'Codigo Requisitante': codigos_req[req],
+                'Descricao Requisitante': descricoes_req[req],
+                'Classe': codigos_classe[classe_do_insumo[insumo]],
+                'Descricao da Classe': descricoes_classe[classe_do_insumo[insumo]],
+                '': '',  # coluna vazia do ';' final
+            })
+            pa_csv.write_csv(pa.Table.from_pandas(bloco, preserve_index=False), f, opcoes)
+            geradas += n
+    return destino
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('destino')
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--insumos', type=int, default=2000)
+    parser.add_argument('--requisitantes', type=int, default=300)
+    parser.add_argument('--classes', type=int, default=30)
+    parser.add_argument('--anos', type=int, nargs=2, default=[2024, 2025], metavar=('INICIAL', 'FINAL'))
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+    generate_material_csv(args.destino, args.linhas, args.insumos, args.requisitantes, args.classes, args.anos, args.semente)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Tempo: backend DuckDB sobre Parquet (consumo/duckdb_backend.py) vs. o caminho
+pandas em memória (cubo + índice de filtros + consumo/engine.py). Mede a carga
+e, para combinações aleatórias de filtros (insumo por descrição/código, classe,
+anos, movimento), seleção da análise, consumo anual, detalhe mensal e visão
+geral por unidade. A igualdade dos resultados é verificada em
+tests/test_duckdb_parity.py.
+
+    python benchmarks/paridade_duckdb.py --linhas 300000 --combinacoes 50
+    python benchmarks/paridade_duckdb.py --csv Material-CSVANUAL.csv
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from consumo import engine  # noqa: E402
+from consumo.cube import build_consumption_cube  # noqa: E402
+from consumo.duckdb_backend import DuckDBBackend, parquet_from_csv  # noqa: E402
+from consumo.filter_index import FilterIndex  # noqa: E402
+from gerador_material import generate_material_csv  # noqa: E402
+
+
+def random_filters(rng, cubo):
+    insumos = cubo[['Desc. Insumo', 'Cód. Insumo']].drop_duplicates().dropna()
+    amostra = insumos.iloc[rng.choice(len(insumos), size=min(len(insumos), int(rng.integers(1, 15))), replace=False)]
+    corte = int(rng.integers(0, len(amostra) + 1))
+    classes = cubo['Descricao Classe'].dropna().unique().tolist()
+    anos = sorted(cubo['Ano'].dropna().unique().tolist())
+    movimentos = engine.movement_options(cubo)
+    return dict(
+        desc=amostra['Desc. Insumo'].astype(str).tolist()[:corte], cod=amostra['Cód. Insumo'].astype(str).tolist()[corte:],
+        classes=[classes[i] for i in rng.choice(len(classes), size=int(rng.integers(0, 3)), replace=False)] if classes and rng.random() < 0.3 else [],
+        anos=[int(a) for a in rng.choice(anos, size=int(rng.integers(1, len(anos) + 1)), replace=False)],
+        movimento=movimentos[engine.default_movement_index(movimentos)] if rng.random() < 0.8 else movimentos[int(rng.integers(len(movimentos)))],
+    )
+
+
+def pandas_sections(cubo, indice, filtros):
+    base = engine.select_insumos(indice, filtros['desc'], filtros['cod'], filtros['classes'])
+    analise = engine.select_analysis(cubo, indice, base, filtros['anos'], filtros['movimento'])
+    anual = engine.annual_consumption(analise)
+    return analise, anual, engine.monthly_detail(analise, anual, filtros['anos']), engine.unit_overview(analise, 20, 200)
+
+
+def duckdb_sections(backend, filtros):
+    analise = backend.analysis(**filtros)
+    anual = backend.annual_consumption(**filtros)
+    mensal = engine.monthly_detail(analise, anual, filtros['anos'], consumo_mensal=backend.monthly_consumption(**filtros))
+    return analise, anual, mensal, engine.unit_overview(analise, 20, 200, celulas=backend.unit_cells(**filtros))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=300_000)
+    parser.add_argument('--combinacoes', type=int, default=50)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--csv', help="usa um CSV existente em vez de gerar um")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = args.csv
+        if not caminho:
+            caminho = os.path.join(pasta, 'Material-CSVANUAL.csv')
+            generate_material_csv(caminho, args.linhas)
+
+        inicio = time.perf_counter()
+        df = engine.load_material_frame(caminho)
+        cubo = build_consumption_cube(df)
+        indice = FilterIndex(cubo)
+        t_carga_pandas = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        backend = DuckDBBackend(parquet_from_csv(caminho), diretorio_temporario=pasta)
+        backend.cube()
+        t_carga_duckdb = time.perf_counter() - inicio
+        print(f"células do cubo: {len(cubo):,}  carga pandas: {t_carga_pandas:.2f} s  carga DuckDB (Parquet + cubo): {t_carga_duckdb:.2f} s")
+        del df
+
+        rng = np.random.default_rng(args.semente)
+        t_pandas = t_duckdb = 0.0
+        for _ in range(args.combinacoes):
+            filtros = random_filters(rng, cubo)
+            inicio = time.perf_counter(); pandas_sections(cubo, indice, filtros); t_pandas += time.perf_counter() - inicio
+            inicio = time.perf_counter(); duckdb_sections(backend, filtros); t_duckdb += time.perf_counter() - inicio
+    print(f"{args.combinacoes} combinações  pandas: {t_pandas / args.combinacoes * 1000:.1f} ms  DuckDB: {t_duckdb / args.combinacoes * 1000:.1f} ms por combinação")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# Lógica de dados do dashboard de consumo, sem dependência do Streamlit.
@@ -0,0 +1,107 @@
+# Geração em lote dos pacotes de relatório (PDF + Excel), um por valor de uma
+# dimensão (classe, requisitante ou insumo), distribuída em um pool de processos.
+# Cada processo recebe o cubo uma vez (initializer) e monta o próprio índice de
+# filtros; os relatórios saem de consumo/engine.py, o mesmo código do dashboard.
+#
+#     python -m consumo.batch --csv Material-CSVANUAL.csv --por classe --anos 2024 2025 --saida relatorios
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from consumo import engine
+from consumo.cube import build_consumption_cube
+from consumo.export import report_excel_bytes
+from consumo.filter_index import FilterIndex
+from consumo.report_pdf import report_pdf_bytes
+
+# Dimensão do lote -> (coluna do cubo, argumento de engine.build_report)
+DIMENSOES_LOTE = {
+    'classe': ('Descricao Classe', 'classes'),
+    'requisitante': ('Descricao Requisitante', 'requisitantes'),
+    'insumo': ('Desc. Insumo', 'desc'),
+}
+FORMATOS = ('pdf', 'xlsx')
+
+_cubo = None
+_indice = None
+
+
+def _init_worker(cubo):
+    global _cubo, _indice
+    _cubo, _indice = cubo, FilterIndex(cubo)
+
+
+def file_slug(texto):
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^0-9A-Za-z]+', '_', texto).strip('_').lower() or 'sem_nome'
+
+
+def batch_tasks(cubo, por, anos, movimento):
+    coluna, argumento = DIMENSOES_LOTE[por]
+    return [(valor, {'anos': anos, 'movimento': movimento, argumento: [valor]}) for valor in sorted(cubo[coluna].dropna().unique())]
+
+
+def generate_pack(valor, filtros, destino, prefixo, formatos=FORMATOS):
+    # Roda no processo do pool. Retorna o resumo do pacote (arquivos vazios se o filtro não casou).
+    inicio = time.perf_counter()
+    relatorio = engine.build_report(_cubo, _indice, **filtros)
+    arquivos, avisos = [], []
+    if relatorio is not None:
+        base = os.path.join(destino, f"{prefixo}_{file_slug(valor)}")
+        if 'pdf' in formatos:
+            with open(base + '.pdf', 'wb') as f: f.write(report_pdf_bytes(relatorio, avisar=avisos.append))
+            arquivos.append(base + '.pdf')
+        if 'xlsx' in formatos:
+            with open(base + '.xlsx', 'wb') as f: f.write(report_excel_bytes(relatorio))
+            arquivos.append(base + '.xlsx')
+    return {'valor': valor, 'arquivos': arquivos, 'avisos': avisos, 'segundos': time.perf_counter() - inicio}
+
+
+def _generate_pack(tarefa):
+    return generate_pack(*tarefa)
+
+
+def run_batch(cubo, por, destino, anos=None, movimento=None, processos=None, formatos=FORMATOS, avisar=print):
+    # Sem anos/movimento, usa todos os anos do cubo e o movimento padrão do dashboard.
+    anos = sorted(anos or cubo['Ano'].dropna().unique().tolist())
+    if movimento is None:
+        opcoes = engine.movement_options(cubo)
+        movimento = opcoes[engine.default_movement_index(opcoes)]
+    os.makedirs(destino, exist_ok=True)
+    tarefas = [(valor, filtros, destino, por, tuple(formatos)) for valor, filtros in batch_tasks(cubo, por, anos, movimento)]
+    processos = processos or os.cpu_count() or 1
+
+    inicio = time.perf_counter(); resultados = []
+    with ProcessPoolExecutor(max_workers=processos, initializer=_init_worker, initargs=(cubo,)) as executor:
+        # Lotes pequenos por envio: o custo por tarefa é dominado pelo PDF, não pela comunicação
+        for resultado in executor.map(_generate_pack, tarefas, chunksize=max(1, len(tarefas) // (processos * 8))):
+            resultados.append(resultado)
+            if avisar:
+                estado = f"{len(resultado['arquivos'])} arquivo(s)" if resultado['arquivos'] else "sem dados"
+                avisar(f"[{len(resultados)}/{len(tarefas)}] {resultado['valor']}: {estado} em {resultado['segundos']:.1f} s")
+    total = time.perf_counter() - inicio
+    return {'pacotes': len(tarefas), 'com_dados': sum(1 for r in resultados if r['arquivos']), 'processos': processos,
+            'segundos': total, 'pacotes_por_segundo': len(tarefas) / total if total else 0.0, 'anos': anos, 'movimento': movimento,
+            'avisos': sorted({aviso for r in resultados for aviso in r['avisos']})}
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Geração em lote dos relatórios de consumo (PDF + Excel).")
+    origem = parser.add_mutually_exclusive_group()
+    origem.add_argument('--csv', default='Material-CSVANUAL.csv')
+    origem.add_argument('--diretorio-mensal')
+    parser.add_argument('--por', choices=sorted(DIMENSOES_LOTE), default='classe')
+    parser.add_argument('--anos', type=int, nargs='+')
+    parser.add_argument('--movimento')
+    parser.add_argument('--saida', default='relatorios')
+    parser.add_argument('--processos', type=int)
+    parser.add_argument('--formatos', nargs='+', choices=FORMATOS, default=list(FORMATOS))
+    args = parser.parse_args()
+
+    df = engine.load_material_frame(args.csv, args.diretorio_mensal, avisar=print)
+    resumo = run_batch(build_consumption_cube(df), args.por, args.saida, args.anos, args.movimento, args.processos, args.formatos)
+    print(json.dumps(resumo, ensure_ascii=False, indent=1))
@@ -0,0 +1,79 @@
+# Gráficos das seções do relatório (plotly), montados a partir das tabelas de
+# consumo/engine.py. Usados pelo dashboard e pelo PDF gerado em lote.
+# O plotly (e o plotly.io que ele carrega) só é importado no primeiro gráfico:
+# workers novos e execuções sem análise não pagam essa carga.
+#
+# Cada insumo é uma série (trace). Com uma classe inteira selecionada seriam
+# centenas: montar a figura, serializá-la e desenhá-la no navegador (ou no
+# kaleido) passa a custar segundos. Por isso só os maiores insumos têm série
+# própria e o restante é somado em "Outros" (oculto de início); linhas com muitos pontos usam WebGL.
+import pandas as pd
+
+from consumo.pipeline import MESES_PT_ORDENADOS
+
+LIMITE_SERIES = 15  # insumos com série própria em cada gráfico
+LIMITE_PONTOS_SVG = 1000  # acima disso as linhas são desenhadas em WebGL (scattergl)
+ROTULO_OUTROS = "Outros"
+
+
+def cap_series(df, y, x=None, limite=LIMITE_SERIES):
+    # Mantém os `limite` insumos de maior total em `y`; os demais viram uma série
+    # "Outros (n insumos)", somada por `x` (ou um valor só, sem `x`). limite=None não corta.
+    totais = df.groupby('Desc. Insumo', observed=True)[y].sum()
+    if limite is None or len(totais) <= limite: return df
+    principais = df['Desc. Insumo'].isin(totais.nlargest(limite).index)
+    resto = df[~principais]
+    outros = resto.groupby(x, observed=True)[y].sum().reset_index() if x else pd.DataFrame({y: [resto[y].sum()]})
+    outros['Desc. Insumo'] = f"{ROTULO_OUTROS} ({len(totais) - limite} insumos)"; outros['Cód. Insumo'] = ''
+    return pd.concat([df[principais].astype({'Desc. Insumo': object, 'Cód. Insumo': object}), outros], ignore_index=True)
+
+
+def _hide_others(fig):
+    # "Outros" soma muitos insumos e achataria a escala dos demais: começa oculto (um clique na legenda o mostra)
+    return fig.update_traces(visible='legendonly', selector=lambda trace: str(trace.name).startswith(ROTULO_OUTROS + " ("))
+
+
+def _render_mode(df):
+    return 'webgl' if len(df) > LIMITE_PONTOS_SVG else 'svg'
+
+
+def annual_trend_figure(consumo_anual, limite=LIMITE_SERIES):
+    import plotly.express as px
+    dados = cap_series(consumo_anual, 'Consumo Total Anual', 'Ano', limite)
+    fig = px.line(dados, x='Ano', y='Consumo Total Anual', color='Desc. Insumo', markers=True, title='Tendência de Consumo Total Anual por Insumo', labels={'Desc. Insumo': 'Insumo'}, hover_data=['Cód. Insumo'], render_mode=_render_mode(dados))
+    return _hide_others(fig.update_layout(xaxis_type='category'))
+
+
+def annual_average_figure(consumo_anual, limite=LIMITE_SERIES):
+    import plotly.express as px
+    dados = cap_series(consumo_anual, 'Consumo Médio Mensal (agregado)', 'Ano', limite)
+    fig = px.bar(dados, x='Ano', y='Consumo Médio Mensal (agregado)', color='Desc. Insumo', barmode='group', title='Comparativo de Consumo Médio Mensal (agregado por ano, calculado sobre meses com consumo)', labels={'Desc. Insumo': 'Insumo'}, hover_data=['Cód. Insumo'])
+    return _hide_others(fig.update_layout(xaxis_type='category'))
+
+
+def monthly_detail_figure(consumo_mensal_grafico, titulo, limite=LIMITE_SERIES):
+    import plotly.express as px
+    dados = cap_series(consumo_mensal_grafico, 'Quantidade', ['Mês Num', 'Mês Nome'], limite)
+    return _hide_others(px.line(
+        dados, x='Mês Nome', y='Quantidade', color='Desc. Insumo', markers=True, title=titulo,
+        labels={'Desc. Insumo': 'Insumo', 'Quantidade': 'Consumo Mensal', 'Mês Nome': 'Mês'},
+        hover_data=['Cód. Insumo'], category_orders={"Mês Nome": MESES_PT_ORDENADOS}, render_mode=_render_mode(dados)
+    ))
+
+
+def overall_average_figure(media_geral, coluna, limite=LIMITE_SERIES):
+    import plotly.express as px
+    dados = cap_series(media_geral, coluna, limite=limite)
+    return _hide_others(px.bar(dados, x='Desc. Insumo', y=coluna, color='Desc. Insumo', title='Média Geral do Consumo Mensal por Insumo (calculado sobre meses com consumo)', labels={'Desc. Insumo': 'Insumo', coluna: 'Média Mensal'}, hover_data=['Cód. Insumo']))
+
+
+def unit_average_figure(media_unidade, insumo, top=15):
+    import plotly.express as px
+    return px.bar(media_unidade.head(top), x='Descricao Requisitante', y='Média Mensal por Unidade', color='Descricao Requisitante', title=f'Top {top} Unidades por Média Mensal de Consumo de "{insumo}" (calculado sobre meses com consumo)')
+
+
+def spend_figure(gasto, dimensao, titulo, top=LIMITE_SERIES):
+    # Uma série só (sem cor por categoria): os maiores valores de consumo/spend.spend_by
+    import plotly.express as px
+    fig = px.bar(gasto.head(top), x=dimensao, y='Valor Total', title=f'Top {top} {titulo}', hover_data=['Quantidade', 'Nº Insumos', '% do Valor'])
+    return fig.update_layout(xaxis_type='category')
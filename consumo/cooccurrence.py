@@ -0,0 +1,85 @@
+# Índice de co-ocorrência insumo x classe x ano x movimento, construído uma vez
+# por conjunto de dados para os filtros em cascata da barra lateral: cada widget
+# oferece só os valores que ainda produzem resultado com as outras seleções.
+#
+# A base é um tensor booleano itens x anos x movimentos, em que cada item é um
+# par (insumo, classe) distinto do cubo e o insumo é a posição dele no índice de
+# busca (consumo/search_index.py). As opções saem de reduções sobre esse tensor,
+# sem voltar às linhas do cubo; o custo não depende do tamanho dos dados.
+import numpy as np
+import pandas as pd
+
+
+def _codes(serie, valores):
+    return pd.Categorical(serie, categories=valores).codes.astype(np.int64)
+
+
+class CooccurrenceIndex:
+    def __init__(self, cubo, indice_busca):
+        self.anos = sorted(cubo['Ano'].dropna().unique())
+        self.movimentos = sorted(cubo['Descricao Movimento'].dropna().unique())
+        tem_classe = 'Descricao Classe' in cubo.columns
+        self.classes = sorted(cubo['Descricao Classe'].dropna().unique()) if tem_classe else []
+        self.n_insumos = len(indice_busca)
+
+        # Insumo de cada linha = posição do par (código, descrição) no índice de busca; -1 se nulo
+        posicao_par = {par: posicao for posicao, par in enumerate(zip(indice_busca.codigos, indice_busca.descricoes))}
+        pares = pd.MultiIndex.from_arrays([cubo['Cód. Insumo'].astype(str), cubo['Desc. Insumo'].astype(str)])
+        codigos_pares, pares_unicos = pd.factorize(pares)
+        insumo = np.array([posicao_par.get(par, -1) for par in pares_unicos], dtype=np.int64)[codigos_pares]
+        insumo[cubo['Cód. Insumo'].isna().to_numpy() | cubo['Desc. Insumo'].isna().to_numpy()] = -1
+        classe = _codes(cubo['Descricao Classe'], self.classes) if tem_classe else np.zeros(len(cubo), dtype=np.int64)
+        ano = _codes(cubo['Ano'], self.anos)
+        movimento = _codes(cubo['Descricao Movimento'], self.movimentos)
+
+        validas = (ano >= 0) & (movimento >= 0)
+        n_classes = max(len(self.classes), 1)
+        # Item = par (insumo, classe); classe nula vira a posição extra n_classes
+        par_item = (insumo[validas] + 1) * (n_classes + 1) + np.where(classe[validas] >= 0, classe[validas], n_classes)
+        itens, item_da_linha = np.unique(par_item, return_inverse=True)
+        self.insumo_item = itens // (n_classes + 1) - 1
+        self.classe_item = itens % (n_classes + 1)
+        self.presenca = np.zeros((len(itens), len(self.anos), len(self.movimentos)), dtype=bool)
+        self.presenca[item_da_linha, ano[validas], movimento[validas]] = True
+
+    def _item_mask(self, insumos=None, classes=None):
+        mascara = np.ones(len(self.insumo_item), dtype=bool)
+        if insumos is not None:
+            selecionados = np.zeros(self.n_insumos + 1, dtype=bool); selecionados[np.asarray(insumos, dtype=np.int64) + 1] = True
+            mascara &= selecionados[self.insumo_item + 1]
+        if classes is not None:
+            selecionadas = np.zeros(len(self.classes) + 2, dtype=bool)
+            selecionadas[[self.classes.index(c) for c in classes if c in self.classes]] = True
+            mascara &= selecionadas[self.classe_item]
+        return mascara
+
+    def _year_mask(self, anos):
+        if anos is None: return np.ones(len(self.anos), dtype=bool)
+        return np.isin(np.arange(len(self.anos)), [self.anos.index(a) for a in anos if a in self.anos])
+
+    def _movement_mask(self, movimento):
+        mascara = np.zeros(len(self.movimentos), dtype=bool)
+        if movimento is None: mascara[:] = True
+        elif movimento in self.movimentos: mascara[self.movimentos.index(movimento)] = True
+        return mascara
+
+    def options(self, insumos=None, classes=None, anos=None, movimento=None):
+        # Cada argumento None é "sem restrição" (widget vazio). `insumos`: posições no
+        # índice de busca. Retorna, para cada widget, o que casa com as OUTRAS seleções:
+        # 'insumos' (máscara sobre as posições do índice de busca), 'classes', 'anos', 'movimentos'.
+        itens_insumo_classe = self._item_mask(insumos, classes)
+        anos_sel, movimento_sel = self._year_mask(anos), self._movement_mask(movimento)
+        por_item = self.presenca[:, anos_sel][:, :, movimento_sel].any(axis=(1, 2))
+
+        mascara_insumos = np.zeros(self.n_insumos + 1, dtype=bool)
+        mascara_insumos[self.insumo_item[por_item & self._item_mask(classes=classes)] + 1] = True
+        classes_ok = np.zeros(len(self.classes) + 2, dtype=bool)
+        classes_ok[self.classe_item[por_item & self._item_mask(insumos=insumos)]] = True
+        anos_ok = self.presenca[itens_insumo_classe][:, :, movimento_sel].any(axis=(0, 2))
+        movimentos_ok = self.presenca[itens_insumo_classe][:, anos_sel].any(axis=(0, 1))
+        return {
+            'insumos': mascara_insumos[1:],
+            'classes': [c for c, ok in zip(self.classes, classes_ok) if ok],
+            'anos': [a for a, ok in zip(self.anos, anos_ok) if ok],
+            'movimentos': [m for m, ok in zip(self.movimentos, movimentos_ok) if ok],
+        }
@@ -0,0 +1,23 @@
+# Cubo mensal de consumo: soma de Quantidade e Valor e nº de linhas por
+# (insumo, requisitante, movimento, classe, ano, mês). Todas as seções do
+# dashboard se reduzem a somas e contagens de meses sobre essas células, então
+# são calculadas a partir do cubo (milhares de células) e não das linhas brutas.
+import pandas as pd
+
+from consumo.pipeline import MESES_PT_MAP
+
+DIMENSOES_CUBO = ['Cód. Insumo', 'Desc. Insumo', 'Descricao Requisitante', 'Descricao Movimento', 'Descricao Classe', 'Ano', 'Mês Num']
+MEDIDAS_CUBO = ['Quantidade', 'Valor']
+COLUNA_LINHAS = 'Linhas'
+
+
+def build_consumption_cube(df):
+    if df.empty: return pd.DataFrame()
+    # Acumula em float64: as colunas do esquema compacto são float32
+    base = df[DIMENSOES_CUBO].assign(**{medida: df[medida].astype('float64') for medida in MEDIDAS_CUBO})
+    cubo = base.groupby(DIMENSOES_CUBO, observed=True, dropna=False, sort=False).agg(
+        Quantidade=('Quantidade', 'sum'), Valor=('Valor', 'sum'), Linhas=('Quantidade', 'size')
+    ).reset_index()
+    cubo[COLUNA_LINHAS] = cubo[COLUNA_LINHAS].astype('int32')
+    cubo['Mês Nome'] = cubo['Mês Num'].map(MESES_PT_MAP).astype('category')
+    return cubo.sort_values(DIMENSOES_CUBO, ignore_index=True)
@@ -0,0 +1,145 @@
+# Versões do conjunto de dados do dashboard e recarga a quente. Uma versão reúne
+# tudo o que é derivado dos arquivos de origem (cubos, índices, backend de
+# consulta); as sessões pegam a versão atual uma vez por execução e a usam do
+# começo ao fim. Uma thread de fundo observa os arquivos e, quando mudam, monta
+# a versão nova enquanto as sessões seguem na antiga; a troca é a atribuição de
+# uma referência (atômica), e a versão antiga é liberada quando a última
+# execução que a usa termina. Se a recarga falhar, a versão atual é mantida.
+import datetime
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+
+INTERVALO_VERIFICACAO_PADRAO = 30  # segundos entre verificações dos arquivos de origem
+
+logger = logging.getLogger(__name__)
+
+
+def source_signature(caminho_csv=None, diretorio_mensal=None, padrao=None):
+    # Barata (só stat): caminho, tamanho e mtime de cada arquivo de origem
+    caminhos = sorted(glob.glob(os.path.join(diretorio_mensal, padrao))) if diretorio_mensal else [caminho_csv]
+    assinatura = []
+    for caminho in caminhos:
+        try: info = os.stat(caminho)
+        except OSError: continue
+        assinatura.append((os.path.abspath(caminho), info.st_size, info.st_mtime_ns))
+    return tuple(assinatura)
+
+
+class BuildLog:
+    # Mensagens e tempos da montagem de uma versão. A montagem também roda na thread
+    # de recarga, onde st.* não tem ScriptRunContext (a mensagem se perde) e o perfil
+    # de uma sessão não se aplica: as mensagens ficam na versão (DatasetVersion.avisos)
+    # e o script as mostra, e os tempos vão para um Profiler próprio da montagem.
+    def __init__(self, perfil):
+        self.perfil = perfil
+        self.mensagens = []
+
+    def stage(self, nome):
+        return self.perfil.stage(nome, 'carga')
+
+    def error(self, texto): self.mensagens.append(('erro', texto))
+
+    def warning(self, texto): self.mensagens.append(('aviso', texto))
+
+    def info(self, texto): self.mensagens.append(('info', texto))
+
+
+class DatasetVersion:
+    def __init__(self, assinatura, cubo, indice_filtros=None, indice_busca=None, indice_coocorrencia=None, backend=None,
+                 cubo_fornecedor=None, indice_validade=None, avisos=()):
+        self.assinatura = assinatura
+        self.cubo = cubo
+        self.indice_filtros = indice_filtros
+        self.indice_busca = indice_busca
+        self.indice_coocorrencia = indice_coocorrencia
+        self.backend = backend
+        self.cubo_fornecedor = cubo_fornecedor
+        self.indice_validade = indice_validade
+        # (nível, texto) da montagem: 'erro', 'aviso' ou 'info' (ver BuildLog)
+        self.avisos = list(avisos)
+        # Identificador estável entre reinícios (mesmos arquivos, mesma versão): entra nas
+        # chaves de memo e de exportação, para nada de uma versão servir a outra
+        self.versao = hashlib.sha1(repr(assinatura).encode('utf-8')).hexdigest()[:10]
+        self.carregado_em = datetime.datetime.now()
+        self.modificado_em = datetime.datetime.fromtimestamp(max(mtime for _, _, mtime in assinatura) / 1e9) if assinatura else None
+
+    @property
+    def vazia(self):
+        return self.cubo is None or self.cubo.empty
+
+
+class DatasetReloader:
+    def __init__(self, construir, assinatura, intervalo=INTERVALO_VERIFICACAO_PADRAO):
+        # `construir()` monta uma DatasetVersion dos arquivos atuais; `assinatura()` é a
+        # assinatura atual dos arquivos (source_signature), comparada com a da versão em uso
+        self._construir = construir
+        self._assinatura = assinatura
+        self.intervalo = intervalo
+        self._atual = None
+        self._lock = threading.Lock()
+        self._ao_trocar = []
+        self._thread = None
+        self.recarregando = False
+        self.erro = None
+        self._assinatura_falha = None
+
+    def current(self):
+        # A primeira chamada monta a versão inicial; depois, só lê a referência
+        if self._atual is None:
+            with self._lock:
+                if self._atual is None: self._atual = self._construir()
+        return self._atual
+
+    def on_swap(self, funcao):
+        # Chamado com a versão nova após cada troca (ex.: limpar o memo das seções)
+        self._ao_trocar.append(funcao)
+
+    def reload(self):
+        # Monta a versão nova (fora do lock: as sessões continuam lendo a atual) e troca.
+        # Retorna True se trocou.
+        assinatura = self._assinatura()
+        self.recarregando = True
+        try:
+            nova = self._construir()
+            if nova.vazia and self._atual is not None and not self._atual.vazia:
+                erros = [texto for nivel, texto in nova.avisos if nivel == 'erro']
+                raise ValueError("; ".join(erros) or "os arquivos novos não produziram dados")
+        except Exception as e:
+            self.erro = str(e) or type(e).__name__
+            self._assinatura_falha = assinatura
+            logger.exception("Falha ao recarregar o conjunto de dados; mantida a versão atual")
+            return False
+        finally:
+            self.recarregando = False
+        with self._lock:
+            self._atual = nova
+        self.erro = None; self._assinatura_falha = None
+        for funcao in self._ao_trocar:
+            funcao(nova)
+        return True
+
+    def check(self):
+        # Recarrega quando a assinatura mudou e ficou estável por um intervalo (o arquivo
+        # pode estar sendo copiado); não insiste em uma assinatura que já falhou.
+        atual = self.current()
+        assinatura = self._assinatura()
+        if assinatura == atual.assinatura or assinatura == self._assinatura_falha: return False
+        time.sleep(self.intervalo)
+        if self._assinatura() != assinatura: return False
+        return self.reload()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.intervalo)
+            try: self.check()
+            except Exception: logger.exception("Falha na verificação dos arquivos de origem")
+
+    def start(self):
+        if self._thread is None and self.intervalo > 0:
+            self._thread = threading.Thread(target=self._watch, name="recarga-dados", daemon=True)
+            self._thread.start()
+        return self
@@ -0,0 +1,260 @@
+# Backend de consulta alternativo (CONSUMO_BACKEND=duckdb): os dados
+# pré-processados ficam em arquivos Parquet locais e os filtros (insumo, classe,
+# ano, movimento) e agregações (cubo, consumo anual, mensal, por unidade, gasto
+# por fornecedor, lotes por validade) rodam no DuckDB, um motor SQL embarcado,
+# multi-thread e que processa fora da memória.
+# As linhas brutas nunca viram um DataFrame: só os resultados agregados voltam
+# para o pandas, e a formatação das seções continua em consumo/engine.py.
+#
+# O Parquet é gerado a partir do CSV um bloco por vez (memória limitada pelo
+# bloco) ou a partir das partes do store de ingestão mensal, e refeito quando a
+# origem muda (mesmo critério do snapshot). Paridade com o caminho pandas:
+# benchmarks/paridade_duckdb.py.
+import glob
+import json
+import os
+import shutil
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import compute as pc
+from pyarrow import feather
+from pyarrow import parquet as pq
+
+from consumo import ingest, snapshot
+from consumo.cube import COLUNA_LINHAS, DIMENSOES_CUBO
+from consumo.engine import COLUNA_REQUISITANTE, COLUNAS_INSUMO
+from consumo.expiry_index import CHAVES_LOTE, COLUNAS_LOTES, empty_lot_table
+from consumo.pipeline import MESES_PT_MAP, TAMANHO_BLOCO_PADRAO, detect_encoding, iter_material_csv, preprocess_frame, _is_utf8_error
+from consumo.spend import COLUNA_FORNECEDOR, DIMENSOES_FORNECEDOR
+
+DIRETORIO_PARQUET = ".parquet"
+TIPOS_DIMENSOES = {'Ano': 'int16', 'Mês Num': 'int8'}  # as demais dimensões são texto (Categorical)
+
+
+def _q(coluna):
+    return '"' + coluna.replace('"', '""') + '"'
+
+
+def _categorical(coluna):
+    # Texto do Arrow direto para Categorical com categorias em ordem alfabética (como no
+    # pré-processamento), sem materializar uma string Python por célula
+    categorias = coluna.unique().drop_null()
+    categorias = categorias.take(pc.sort_indices(categorias))
+    codigos = pc.fill_null(pc.index_in(coluna, value_set=categorias), -1).to_numpy()
+    return pd.Categorical.from_codes(codigos, categories=categorias.to_pandas())
+
+
+def parquet_store_paths(caminho_csv):
+    pasta = os.path.join(os.path.dirname(os.path.abspath(caminho_csv)), DIRETORIO_PARQUET)
+    base = os.path.join(pasta, os.path.basename(caminho_csv))
+    return base, base + '.json'
+
+
+def _current_parquet_dir(caminho_meta):
+    try:
+        with open(caminho_meta, encoding='utf-8') as f: return json.load(f).get('pasta')
+    except (OSError, ValueError):
+        return None
+
+
+def _write_csv_parts(caminho_csv, destino, tamanho_bloco, avisar, encoding):
+    colunas_categoricas = None; n_partes = 0
+    for bruto in iter_material_csv(caminho_csv, tamanho_bloco, encoding):
+        parte = preprocess_frame(bruto, avisar=avisar if not n_partes else None, colunas_categoricas=colunas_categoricas)
+        del bruto
+        if parte.empty: continue
+        if colunas_categoricas is None:
+            colunas_categoricas = [col for col in parte.columns if isinstance(parte[col].dtype, pd.CategoricalDtype)]
+        pq.write_table(pa.Table.from_pandas(parte, preserve_index=False), os.path.join(destino, f"parte-{n_partes:05d}.parquet"))
+        n_partes += 1
+
+
+def parquet_from_csv(caminho_csv, tamanho_bloco=TAMANHO_BLOCO_PADRAO, avisar=None):
+    # Retorna o padrão glob das partes Parquet do CSV, regerando-as se a origem mudou.
+    # Cada conteúdo do CSV ganha a sua pasta: um backend ainda em uso (recarga a quente)
+    # continua lendo a pasta anterior, que só é apagada na troca seguinte.
+    base, caminho_meta = parquet_store_paths(caminho_csv)
+    anterior = _current_parquet_dir(caminho_meta)
+    if anterior and os.path.isdir(anterior) and snapshot.meta_is_fresh(caminho_csv, caminho_meta):
+        return os.path.join(anterior, '*.parquet')
+    fingerprint = snapshot.source_fingerprint(caminho_csv)
+    pasta = f"{base}.{fingerprint['sha256'][:16]}"
+    if not os.path.isdir(pasta):
+        temporaria = f"{pasta}.{os.getpid()}.tmp"
+        shutil.rmtree(temporaria, ignore_errors=True); os.makedirs(temporaria)
+        try:
+            encoding = detect_encoding(caminho_csv)
+            try:
+                _write_csv_parts(caminho_csv, temporaria, tamanho_bloco, avisar, encoding)
+            except (UnicodeDecodeError, pa.ArrowInvalid) as e:
+                if encoding == 'latin1' or not _is_utf8_error(e): raise ValueError(f"Erro ao ler CSV '{caminho_csv}': {e}") from e
+                shutil.rmtree(temporaria); os.makedirs(temporaria)
+                _write_csv_parts(caminho_csv, temporaria, tamanho_bloco, avisar, 'latin1')
+            os.replace(temporaria, pasta)
+        finally:
+            shutil.rmtree(temporaria, ignore_errors=True)
+    snapshot.write_json(caminho_meta, dict(fingerprint, versao=snapshot.VERSAO_PIPELINE, pasta=pasta))
+    for antiga in glob.glob(f"{glob.escape(base)}.*"):
+        if os.path.isdir(antiga) and antiga not in (pasta, anterior) and not antiga.endswith('.tmp'): shutil.rmtree(antiga, ignore_errors=True)
+    return os.path.join(pasta, '*.parquet')
+
+
+def parquet_from_store(diretorio):
+    # Uma parte Parquet por parte Arrow do store de ingestão (convertida se for mais nova)
+    pasta = os.path.join(diretorio, DIRETORIO_PARQUET, 'ingestao')
+    os.makedirs(pasta, exist_ok=True)
+    arquivos = []
+    for parte in ingest.store_parts(diretorio):
+        destino = os.path.join(pasta, os.path.splitext(os.path.basename(parte))[0] + '.parquet')
+        if not os.path.exists(destino) or os.path.getmtime(destino) < os.path.getmtime(parte):
+            tabela = feather.read_table(parte, memory_map=True)
+            tabela = tabela.drop_columns([ingest.COLUNA_CHAVE_HASH]) if ingest.COLUNA_CHAVE_HASH in tabela.column_names else tabela
+            snapshot.atomic_write(destino, lambda caminho: pq.write_table(tabela, caminho))
+        arquivos.append(destino)
+    return arquivos
+
+
+class DuckDBBackend:
+    def __init__(self, arquivos, threads=None, limite_memoria=None, diretorio_temporario=None):
+        # `arquivos`: caminho, glob ou lista de arquivos Parquet já pré-processados.
+        # `limite_memoria` (ex.: "1GB"): acima dele as agregações transbordam para
+        # `diretorio_temporario` em disco, em vez de falhar.
+        arquivos = [arquivos] if isinstance(arquivos, str) else list(arquivos)
+        self._con = duckdb.connect()
+        if threads: self._con.execute(f"SET threads = {int(threads)}")
+        if limite_memoria: self._con.execute("SET memory_limit = ?", [str(limite_memoria)])
+        if diretorio_temporario: self._con.execute("SET temp_directory = ?", [str(diretorio_temporario)])
+        lista = ', '.join("'" + caminho.replace("'", "''") + "'" for caminho in arquivos)
+        self._con.execute(f"CREATE VIEW material AS SELECT * FROM read_parquet([{lista}], union_by_name = true)")
+
+    def _query(self, sql, parametros=()):
+        # Um cursor por consulta: a conexão é compartilhada entre sessões/threads
+        return self._con.cursor().execute(sql, list(parametros)).df()
+
+    def _where(self, desc=(), cod=(), classes=(), anos=(), movimento=None):
+        # Mesma semântica de engine.select_insumos/select_analysis: (descrição OU código) E classe E ano E movimento
+        condicoes, parametros = [], []
+        insumo = []
+        if len(desc): insumo.append(f"list_contains(?::VARCHAR[], {_q('Desc. Insumo')})"); parametros.append([str(d) for d in desc])
+        if len(cod): insumo.append(f"list_contains(?::VARCHAR[], {_q('Cód. Insumo')}::VARCHAR)"); parametros.append([str(c) for c in cod])
+        if insumo: condicoes.append('(' + ' OR '.join(insumo) + ')')
+        if len(classes): condicoes.append(f"list_contains(?::VARCHAR[], {_q('Descricao Classe')})"); parametros.append([str(c) for c in classes])
+        if len(anos): condicoes.append(f"list_contains(?::INTEGER[], {_q('Ano')}::INTEGER)"); parametros.append([int(a) for a in anos])
+        if movimento is not None: condicoes.append(f"{_q('Descricao Movimento')} = ?"); parametros.append(str(movimento))
+        return ('WHERE ' + ' AND '.join(condicoes)) if condicoes else '', parametros
+
+    def _cells_sql(self, **filtros):
+        # Células do cubo (mesmas somas de consumo/cube.py) para os filtros
+        where, parametros = self._where(**filtros)
+        dimensoes = ', '.join(map(_q, DIMENSOES_CUBO))
+        sql = (f"SELECT {dimensoes}, COALESCE(SUM({_q('Quantidade')}::DOUBLE), 0) AS {_q('Quantidade')}, "
+               f"COALESCE(SUM({_q('Valor')}::DOUBLE), 0) AS {_q('Valor')}, COUNT(*)::INTEGER AS {_q(COLUNA_LINHAS)} "
+               f"FROM material {where} GROUP BY {dimensoes}")
+        return sql, parametros
+
+    def cube(self, **filtros):
+        # Sem filtros, o cubo completo (como build_consumption_cube); com filtros, as
+        # células que engine.select_analysis selecionaria
+        sql, parametros = self._cells_sql(**filtros)
+        sql = f"{sql} ORDER BY {', '.join(_q(d) + ' NULLS LAST' for d in DIMENSOES_CUBO)}"
+        tabela = self._con.cursor().execute(sql, list(parametros)).to_arrow_table()
+        if not tabela.num_rows: return pd.DataFrame()
+        cubo = pd.DataFrame({
+            coluna: _categorical(tabela.column(coluna)) if coluna not in TIPOS_DIMENSOES else tabela.column(coluna).to_numpy().astype(TIPOS_DIMENSOES[coluna])
+            for coluna in DIMENSOES_CUBO
+        })
+        for coluna in ('Quantidade', 'Valor', COLUNA_LINHAS): cubo[coluna] = tabela.column(coluna).to_numpy()
+        cubo['Mês Nome'] = cubo['Mês Num'].map(MESES_PT_MAP).astype('category')
+        return cubo
+
+    def analysis(self, desc=(), cod=(), classes=(), anos=(), movimento=None):
+        return self.cube(desc=desc, cod=cod, classes=classes, anos=anos, movimento=movimento)
+
+    def _not_null(self, colunas):
+        return ' AND '.join(f"{_q(coluna)} IS NOT NULL" for coluna in colunas)
+
+    def annual_consumption(self, **filtros):
+        # engine.annual_consumption: total por insumo/ano e nº de meses em que a soma de
+        # alguma célula do cubo foi > 0; média = total / meses (0 sem meses com consumo)
+        sql, parametros = self._cells_sql(**filtros)
+        chaves = COLUNAS_INSUMO + ['Ano']
+        lista = ', '.join(map(_q, chaves))
+        consumo = self._query(
+            f"SELECT {lista}, SUM({_q('Quantidade')}) AS total, "
+            f"COUNT(DISTINCT {_q('Mês Num')}) FILTER (WHERE {_q('Quantidade')} > 0) AS meses "
+            f"FROM ({sql}) AS celulas WHERE {self._not_null(chaves)} GROUP BY {lista} ORDER BY {lista}", parametros)
+        meses = consumo['meses'].to_numpy(dtype='int64')
+        total = consumo['total'].to_numpy(dtype='float64')
+        return pd.DataFrame({
+            **{coluna: consumo[coluna] for coluna in COLUNAS_INSUMO}, 'Ano': consumo['Ano'].astype('int16'),
+            'Consumo Total Anual': total, 'Nº Meses com Consumo': meses,
+            'Consumo Médio Mensal (agregado)': np.divide(total, meses, out=np.zeros(len(total)), where=meses > 0),
+        })
+
+    def monthly_consumption(self, **filtros):
+        # Primeiro passo de engine.monthly_detail: consumo por insumo/ano/mês
+        where, parametros = self._where(**filtros)
+        chaves = COLUNAS_INSUMO + ['Ano', 'Mês Num']
+        lista = ', '.join(map(_q, chaves))
+        condicao = f"{where} AND {self._not_null(chaves)}" if where else f"WHERE {self._not_null(chaves)}"
+        mensal = self._query(f"SELECT {lista}, COALESCE(SUM({_q('Quantidade')}::DOUBLE), 0) AS {_q('Quantidade')} "
+                             f"FROM material {condicao} GROUP BY {lista} ORDER BY {lista}", parametros)
+        mensal['Ano'] = mensal['Ano'].astype('int16'); mensal['Mês Num'] = mensal['Mês Num'].astype('int8')
+        mensal.insert(4, 'Mês Nome', mensal['Mês Num'].map(MESES_PT_MAP))
+        return mensal
+
+    def unit_cells(self, **filtros):
+        # Células insumo x unidade de engine.unit_overview (sem unidades vazias/N/A),
+        # como Série indexada por (descrição, unidade)
+        where, parametros = self._where(**filtros)
+        unidade = _q(COLUNA_REQUISITANTE)
+        filtro_unidade = f"{self._not_null(['Desc. Insumo', COLUNA_REQUISITANTE])} AND {unidade} <> 'N/A' AND trim({unidade}) <> ''"
+        condicao = f"{where} AND {filtro_unidade}" if where else f"WHERE {filtro_unidade}"
+        lista = ', '.join(map(_q, ['Desc. Insumo', COLUNA_REQUISITANTE]))
+        celulas = self._query(f"SELECT {lista}, COALESCE(SUM({_q('Quantidade')}::DOUBLE), 0) AS {_q('Quantidade')} "
+                              f"FROM material {condicao} GROUP BY {lista} ORDER BY {lista}", parametros)
+        return celulas.set_index(['Desc. Insumo', COLUNA_REQUISITANTE])['Quantidade']
+
+    def _columns(self):
+        return set(self._query("SELECT * FROM material LIMIT 0").columns)
+
+    def supplier_cube(self):
+        # spend.build_supplier_cube: Valor e Quantidade por insumo/fornecedor/classe/movimento/ano
+        if COLUNA_FORNECEDOR not in self._columns(): return pd.DataFrame()
+        dimensoes = ', '.join(map(_q, DIMENSOES_FORNECEDOR))
+        tabela = self._con.cursor().execute(
+            f"SELECT {dimensoes}, COALESCE(SUM({_q('Quantidade')}::DOUBLE), 0) AS {_q('Quantidade')}, "
+            f"COALESCE(SUM({_q('Valor')}::DOUBLE), 0) AS {_q('Valor')} FROM material GROUP BY {dimensoes} "
+            f"ORDER BY {', '.join(_q(d) + ' NULLS LAST' for d in DIMENSOES_FORNECEDOR)}").to_arrow_table()
+        if not tabela.num_rows: return pd.DataFrame()
+        cubo = pd.DataFrame({
+            coluna: _categorical(tabela.column(coluna)) if coluna != 'Ano' else tabela.column(coluna).to_numpy().astype('int16')
+            for coluna in DIMENSOES_FORNECEDOR
+        })
+        for coluna in ('Quantidade', 'Valor'): cubo[coluna] = tabela.column(coluna).to_numpy()
+        return cubo
+
+    def lot_table(self):
+        # expiry_index.build_lot_table: uma linha por lote com validade, ordenada pela validade
+        colunas = self._columns()
+        if not {'Lote', 'DT Validade'} <= colunas: return empty_lot_table()
+        chaves = ', '.join(map(_q, CHAVES_LOTE))
+        tipo = f"upper(trim({_q('T')}::VARCHAR))" if 'T' in colunas else "''"
+        fornecedor = f"arg_min({_q(COLUNA_FORNECEDOR)}, {_q('Dt Movimento')})" if COLUNA_FORNECEDOR in colunas else "'N/A'"
+        quantidade = f"{_q('Quantidade')}::DOUBLE"
+        tabela = self._con.cursor().execute(
+            f"SELECT {chaves}, {fornecedor}::VARCHAR AS {_q(COLUNA_FORNECEDOR)}, "
+            f"COALESCE(SUM(CASE WHEN {tipo} = 'E' THEN {quantidade} END), 0) AS {_q('Entradas')}, "
+            f"COALESCE(SUM(CASE WHEN {tipo} = 'S' THEN {quantidade} END), 0) AS {_q('Saídas')}, "
+            f"MAX({_q('Dt Movimento')}) AS {_q('Último Movimento')} "
+            f"FROM material WHERE {_q('DT Validade')} IS NOT NULL GROUP BY {chaves} "
+            f"ORDER BY {_q('DT Validade')}, {_q('Cód. Insumo')}, {_q('Lote')}").to_arrow_table()
+        if not tabela.num_rows: return empty_lot_table()
+        lotes = pd.DataFrame({coluna: _categorical(tabela.column(coluna)) for coluna in ['Cód. Insumo', 'Desc. Insumo', 'Lote', COLUNA_FORNECEDOR]})
+        for coluna in ('DT Validade', 'Último Movimento'): lotes[coluna] = tabela.column(coluna).to_pandas()
+        for coluna in ('Entradas', 'Saídas'): lotes[coluna] = tabela.column(coluna).to_numpy()
+        lotes['Saldo no Período'] = lotes['Entradas'] - lotes['Saídas']
+        return lotes[COLUNAS_LOTES]
@@ -0,0 +1,231 @@
+# Motor de análise sem dependência do Streamlit: as mesmas seções do dashboard
+# (consumo anual, detalhe mensal, média geral mensal e análise por unidade),
+# calculadas a partir do cubo mensal. O dashboard e a geração em lote
+# (consumo/batch.py) usam estas funções, então os números são idênticos.
+import numpy as np
+import pandas as pd
+
+from consumo import ingest, snapshot
+from consumo.metrics import COLUNA_MEDIA, COLUNA_MESES, COLUNA_TOTAL, monthly_average
+from consumo.pipeline import MESES_PT_ORDENADOS, TAMANHO_BLOCO_PADRAO, load_material_csv_chunked, preprocess_frame, read_material_csv
+
+COLUNAS_INSUMO = ['Cód. Insumo', 'Desc. Insumo']
+COLUNA_REQUISITANTE = 'Descricao Requisitante'
+ROTULO_OUTROS = 'Outros'
+
+
+def load_material_frame(caminho_csv=None, diretorio_mensal=None, tamanho_bloco=TAMANHO_BLOCO_PADRAO, avisar=None):
+    # Mesma ordem de preferência do dashboard: diretório mensal, snapshot, leitura em blocos.
+    if diretorio_mensal:
+        ingest.ingest_directory(diretorio_mensal, avisar=avisar)
+        return ingest.load_store(diretorio_mensal)
+    df = snapshot.load_snapshot(caminho_csv)
+    if df is not None: return df
+    fingerprint = snapshot.source_fingerprint(caminho_csv)
+    if fingerprint['size'] > tamanho_bloco: df = load_material_csv_chunked(caminho_csv, tamanho_bloco, avisar=avisar)
+    else: df = preprocess_frame(read_material_csv(caminho_csv), avisar=avisar)
+    if not df.empty:
+        try: snapshot.save_snapshot(caminho_csv, df, fingerprint)
+        except OSError as e:
+            if avisar: avisar(f"Não foi possível gravar o snapshot dos dados: {e}")
+    return df
+
+
+def movement_options(cubo):
+    return sorted(cubo['Descricao Movimento'].dropna().unique())
+
+
+def default_movement_index(opcoes):
+    # Padrão da caixa de seleção do dashboard: o 7º tipo de movimento, quando existe
+    return 6 if len(opcoes) > 6 else 0
+
+
+def select_insumos(indice, desc=(), cod=(), classes=(), requisitantes=()):
+    # Posições do cubo para os filtros de insumo (descrição OU código) E classe E requisitante.
+    return indice.select([
+        {'Desc. Insumo': list(desc), 'Cód. Insumo': list(cod)},
+        {'Descricao Classe': list(classes)},
+        {COLUNA_REQUISITANTE: list(requisitantes)},
+    ])
+
+
+def select_analysis(cubo, indice, posicoes_base, anos, movimento):
+    return cubo.iloc[indice.select([{'Ano': list(anos)}, {'Descricao Movimento': [movimento]}], posicoes=posicoes_base)]
+
+
+def insumo_code(cubo, indice, insumo):
+    posicoes = indice.positions('Desc. Insumo', [insumo])
+    return str(cubo['Cód. Insumo'].iloc[posicoes[0]]) if len(posicoes) else ""
+
+
+def annual_consumption(analysis_df):
+    consumo_anual = monthly_average(analysis_df, COLUNAS_INSUMO + ['Ano']).rename(columns={
+        COLUNA_TOTAL: 'Consumo Total Anual', COLUNA_MESES: 'Nº Meses com Consumo', COLUNA_MEDIA: 'Consumo Médio Mensal (agregado)'
+    }).reset_index()
+    return consumo_anual.sort_values(by=COLUNAS_INSUMO + ['Ano'])
+
+
+def annual_pivot(consumo_anual, coluna):
+    return consumo_anual.pivot_table(index=COLUNAS_INSUMO, columns='Ano', values=coluna, fill_value=0, observed=True).reset_index()
+
+
+def monthly_detail_title(anos):
+    if len(anos) > 1: return f"Consumo Mensal Efetivo por Insumo (Média entre Anos: {', '.join(map(str, anos))})"
+    return f"Consumo Mensal Efetivo por Insumo (Ano: {anos[0] if anos else 'N/A'})"
+
+
+def monthly_detail(analysis_df, consumo_anual, anos, consumo_mensal=None):
+    # Retorna (série mensal do gráfico, tabela pivotada CODIGO/DESCRICAO x meses + CONSUMO MEDIO, colunas de mês).
+    # Com mais de um ano, cada mês é a média entre os anos. `consumo_mensal`: soma por
+    # insumo/ano/mês já calculada (ex.: pelo backend DuckDB), no lugar do groupby.
+    if consumo_mensal is None: consumo_mensal = analysis_df.groupby(COLUNAS_INSUMO + ['Ano', 'Mês Num', 'Mês Nome'], observed=True)['Quantidade'].sum().reset_index()
+    if len(anos) > 1:
+        consumo_mensal = consumo_mensal.groupby(COLUNAS_INSUMO + ['Mês Num', 'Mês Nome'], observed=True)['Quantidade'].mean().reset_index()
+    consumo_mensal_grafico = consumo_mensal.sort_values(by=COLUNAS_INSUMO + ['Mês Num'])
+
+    if consumo_mensal_grafico.empty:
+        if len(anos) == 1: colunas_meses = [f"{m[:3].lower()}/{str(anos[0])[-2:]}" for m in MESES_PT_ORDENADOS]
+        else: colunas_meses = list(MESES_PT_ORDENADOS)
+        pivot_vazio = pd.DataFrame(columns=['CODIGO', 'DESCRICAO'] + colunas_meses + ['CONSUMO MEDIO'])
+        for col in colunas_meses + ['CONSUMO MEDIO']:
+            pivot_vazio[col] = pd.Series(dtype='float64')
+        return consumo_mensal_grafico, pivot_vazio, colunas_meses
+
+    pivot_df = consumo_mensal_grafico.pivot_table(index=COLUNAS_INSUMO, columns='Mês Nome', values='Quantidade', fill_value=0, observed=True).reset_index()
+    pivot_df.rename(columns={'Cód. Insumo': 'CODIGO', 'Desc. Insumo': 'DESCRICAO'}, inplace=True)
+    colunas_meses = [mes for mes in MESES_PT_ORDENADOS if mes in pivot_df.columns]
+    if len(anos) == 1:
+        # Um ano só: colunas "jan/25", "fev/25", ...
+        nomes_curtos = {mes: f"{mes[:3].lower()}/{str(anos[0])[-2:]}" for mes in colunas_meses}
+        pivot_df.rename(columns=nomes_curtos, inplace=True)
+        colunas_meses = [nomes_curtos[mes] for mes in colunas_meses]
+    pivot_df = pivot_df[['CODIGO', 'DESCRICAO'] + colunas_meses]
+
+    if len(anos) == 1:
+        media_ref = consumo_anual[consumo_anual['Ano'] == anos[0]][COLUNAS_INSUMO + ['Consumo Médio Mensal (agregado)']].rename(columns={
+            'Cód. Insumo': 'CODIGO', 'Desc. Insumo': 'DESCRICAO', 'Consumo Médio Mensal (agregado)': 'CONSUMO MEDIO'
+        })
+        pivot_df = pd.merge(pivot_df, media_ref, on=['CODIGO', 'DESCRICAO'], how='left')
+        pivot_df['CONSUMO MEDIO'] = pivot_df['CONSUMO MEDIO'].fillna(0.0)
+    elif colunas_meses:
+        # Mesma métrica, sobre as médias mensais entre anos (uma linha por insumo/mês)
+        medias_insumo = monthly_average(consumo_mensal_grafico, COLUNAS_INSUMO)
+        pivot_df['CONSUMO MEDIO'] = medias_insumo[COLUNA_MEDIA].reindex(
+            pd.MultiIndex.from_frame(pivot_df[['CODIGO', 'DESCRICAO']])
+        ).fillna(0.0).to_numpy()
+    else:
+        pivot_df['CONSUMO MEDIO'] = 0.0
+    return consumo_mensal_grafico, pivot_df, colunas_meses
+
+
+def overall_average_column(n_anos):
+    return f'Média Geral Mensal ({n_anos}a)'
+
+
+def overall_monthly_average(consumo_anual, n_anos):
+    media_geral = consumo_anual.groupby(COLUNAS_INSUMO, observed=True)['Consumo Médio Mensal (agregado)'].mean().reset_index()
+    return media_geral.rename(columns={'Consumo Médio Mensal (agregado)': overall_average_column(n_anos)})
+
+
+def has_units(cubo):
+    # A análise por unidade só faz sentido com mais de um requisitante nos dados
+    return COLUNA_REQUISITANTE in cubo.columns and cubo[COLUNA_REQUISITANTE].notna().any() and cubo[COLUNA_REQUISITANTE].nunique() > 1
+
+
+def _with_unit(df):
+    unidade = df[COLUNA_REQUISITANTE]
+    return df[unidade.notna() & (unidade != 'N/A') & (unidade.str.strip() != '')]
+
+
+def unit_overview(analysis_df, top_unidades=None, top_insumos=None, celulas=None):
+    # Tabela insumo x unidade (unidades ordenadas pelo total consumido), com coluna e linha de Total.
+    # Montada a partir das células com consumo (forma longa), não de um pivot denso: com
+    # `top_unidades`/`top_insumos` só as maiores unidades/insumos ganham coluna/linha e o
+    # restante soma em "Outros", e o custo acompanha o nº de células não nulas.
+    # `celulas`: soma por (descrição, unidade) já calculada (ex.: pelo backend DuckDB).
+    # Vazia quando não há unidade com consumo.
+    if celulas is None:
+        origem = _with_unit(analysis_df)
+        if origem.empty: return pd.DataFrame()
+        celulas = origem.groupby(['Desc. Insumo', COLUNA_REQUISITANTE], observed=True)['Quantidade'].sum()
+    if celulas.empty: return pd.DataFrame()
+    indice = celulas.index.remove_unused_levels()
+    cod_insumo, cod_unidade = (np.asarray(codigos, dtype=np.int64) for codigos in indice.codes)
+    insumos, unidades = indice.levels
+    valores = celulas.to_numpy(dtype='float64')
+
+    total_por_unidade = pd.Series(np.bincount(cod_unidade, weights=valores, minlength=len(unidades)), index=range(len(unidades)))
+    total_por_unidade = total_por_unidade[total_por_unidade > 0].sort_values(ascending=False)
+    if total_por_unidade.empty: return pd.DataFrame()
+    mantidas = total_por_unidade.index[:top_unidades] if top_unidades else total_por_unidade.index
+    # Coluna de cada unidade: -1 fora da tabela (total <= 0), a última posição é "Outros"
+    coluna = np.full(len(unidades), -1, dtype=np.int64)
+    coluna[total_por_unidade.index] = len(mantidas)
+    coluna[mantidas] = np.arange(len(mantidas))
+    n_colunas = len(mantidas) + (len(mantidas) < len(total_por_unidade))
+
+    coluna_celula = coluna[cod_unidade]
+    validas = coluna_celula >= 0
+    cod_insumo, coluna_celula, valores = cod_insumo[validas], coluna_celula[validas], valores[validas]
+    total_por_insumo = np.bincount(cod_insumo, weights=valores, minlength=len(insumos))
+    if top_insumos and top_insumos < len(insumos):
+        maiores = np.sort(np.argsort(-total_por_insumo, kind='stable')[:top_insumos])
+        linha = np.full(len(insumos), len(maiores), dtype=np.int64); linha[maiores] = np.arange(len(maiores))
+        rotulos = insumos[maiores].tolist() + [f"{ROTULO_OUTROS} ({len(insumos) - len(maiores)} insumos)"]
+    else:
+        linha = np.arange(len(insumos)); rotulos = insumos.tolist()
+
+    # Só a parte exibida vira matriz densa (linhas x colunas mantidas)
+    densa = np.bincount(linha[cod_insumo] * n_colunas + coluna_celula, weights=valores, minlength=len(rotulos) * n_colunas).reshape(len(rotulos), n_colunas)
+    nomes_colunas = unidades[mantidas].tolist()
+    if n_colunas > len(mantidas): nomes_colunas.append(f"{ROTULO_OUTROS} ({len(total_por_unidade) - len(mantidas)} unidades)")
+    tabela = pd.DataFrame(densa, columns=pd.Index(nomes_colunas, name=COLUNA_REQUISITANTE))
+    tabela['Total'] = densa.sum(axis=1)
+    linha_total = tabela.sum(axis=0)
+    tabela.insert(0, 'Descricao', rotulos)
+    linha_total['Descricao'] = 'Total'
+    return pd.concat([tabela, linha_total.to_frame().T[tabela.columns]], ignore_index=True)
+
+
+def unit_analysis(analysis_df, insumo):
+    # Retorna (média mensal por unidade, pivot unidade x ano da média mensal); vazios sem dados.
+    origem = _with_unit(analysis_df[analysis_df['Desc. Insumo'] == insumo])
+    if origem.empty: return pd.DataFrame(), pd.DataFrame()
+    consumo_unidade_ano = monthly_average(origem, [COLUNA_REQUISITANTE, 'Ano']).rename(columns={
+        COLUNA_TOTAL: 'Quantidade', COLUNA_MESES: 'Nº Meses com Consumo Unidade', COLUNA_MEDIA: 'Média Mensal por Unidade'
+    }).reset_index()
+    media_por_unidade = consumo_unidade_ano.groupby(COLUNA_REQUISITANTE, observed=True)['Média Mensal por Unidade'].mean().reset_index().sort_values(by='Média Mensal por Unidade', ascending=False)
+    pivot_unidade_ano = consumo_unidade_ano.pivot_table(index=COLUNA_REQUISITANTE, columns='Ano', values='Média Mensal por Unidade', fill_value=0, observed=True).reset_index()
+    return media_por_unidade, pivot_unidade_ano
+
+
+def build_report(cubo, indice, anos, movimento, desc=(), cod=(), classes=(), requisitantes=(), insumo_unidade=None):
+    # Todas as seções de uma combinação de filtros, como o dashboard as exibe. Sem
+    # `insumo_unidade`, a análise por unidade usa o primeiro insumo selecionado
+    # (o padrão da caixa de seleção do dashboard). Retorna None se nada casar.
+    anos = sorted(anos)
+    posicoes_base = select_insumos(indice, desc, cod, classes, requisitantes)
+    insumos = sorted(cubo['Desc. Insumo'].iloc[posicoes_base].unique())
+    analysis_df = select_analysis(cubo, indice, posicoes_base, anos, movimento)
+    if not insumos or analysis_df.empty: return None
+
+    consumo_anual = annual_consumption(analysis_df)
+    consumo_mensal_grafico, consumo_mensal_pivot, colunas_meses = monthly_detail(analysis_df, consumo_anual, anos)
+    relatorio = dict(
+        filtros=dict(desc=insumos, cod=list(cod), classes=list(classes), requisitantes=list(requisitantes), anos=anos, movimento=movimento),
+        consumo_anual=consumo_anual,
+        consumo_anual_pivot=annual_pivot(consumo_anual, 'Consumo Total Anual'),
+        consumo_medio_pivot=annual_pivot(consumo_anual, 'Consumo Médio Mensal (agregado)'),
+        consumo_mensal_grafico=consumo_mensal_grafico, consumo_mensal_pivot=consumo_mensal_pivot, colunas_meses=colunas_meses,
+        titulo_mensal=monthly_detail_title(anos),
+        media_geral=overall_monthly_average(consumo_anual, len(anos)),
+        unidades=pd.DataFrame(), insumo_unidade=None, codigo_insumo_unidade="",
+        media_unidade=pd.DataFrame(), pivot_unidade_ano=pd.DataFrame(),
+    )
+    if has_units(cubo):
+        insumo_unidade = insumo_unidade or insumos[0]
+        relatorio['unidades'] = unit_overview(analysis_df)
+        relatorio['insumo_unidade'] = insumo_unidade
+        relatorio['codigo_insumo_unidade'] = insumo_code(cubo, indice, insumo_unidade)
+        relatorio['media_unidade'], relatorio['pivot_unidade_ano'] = unit_analysis(analysis_df, insumo_unidade)
+    return relatorio
@@ -0,0 +1,68 @@
+# Índice de lotes por data de validade. Na carga, as linhas viram uma linha por
+# lote (insumo, lote, validade) com entradas, saídas e último movimento, ordenada
+# pela validade; a consulta "lotes que vencem entre duas datas" é uma busca
+# binária nesse vetor ordenado (searchsorted) e devolve uma fatia, sem varrer os
+# lotes nem as linhas brutas.
+#
+# O saldo é o das movimentações presentes nos arquivos (entradas - saídas no
+# período exportado), não o estoque físico: lotes recebidos antes do período
+# aparecem só com saídas.
+import numpy as np
+import pandas as pd
+
+CHAVES_LOTE = ['Cód. Insumo', 'Desc. Insumo', 'Lote', 'DT Validade']
+COLUNAS_LOTES = CHAVES_LOTE + ['Nome Fornecedor', 'Entradas', 'Saídas', 'Saldo no Período', 'Último Movimento']
+
+
+def _type_mask(df, tipo):
+    # Coluna "T" da exportação: E (entrada) ou S (saída), às vezes em minúscula
+    if 'T' not in df.columns: return np.zeros(len(df), dtype=bool)
+    serie = df['T'].astype('category')
+    return np.isin(serie.cat.codes.to_numpy(), np.flatnonzero(serie.cat.categories.astype(str).str.strip().str.upper() == tipo))
+
+
+def empty_lot_table():
+    # Com os tipos certos: a consulta por validade funciona também sem lotes
+    tipos = {'DT Validade': 'datetime64[ns]', 'Último Movimento': 'datetime64[ns]', 'Entradas': 'float64', 'Saídas': 'float64', 'Saldo no Período': 'float64'}
+    return pd.DataFrame({coluna: pd.Series(dtype=tipos.get(coluna, object)) for coluna in COLUNAS_LOTES})
+
+
+def build_lot_table(df):
+    # Uma linha por lote com validade, ordenada pela validade
+    if df.empty or 'Lote' not in df.columns or 'DT Validade' not in df.columns: return empty_lot_table()
+    quantidade = df['Quantidade'].astype('float64')
+    base = df[CHAVES_LOTE].assign(
+        Entradas=quantidade.where(_type_mask(df, 'E'), 0.0), Saídas=quantidade.where(_type_mask(df, 'S'), 0.0),
+        **{'Nome Fornecedor': df['Nome Fornecedor'] if 'Nome Fornecedor' in df.columns else 'N/A', 'Último Movimento': df['Dt Movimento']}
+    )
+    # Em ordem de movimento: o fornecedor do lote é o da primeira movimentação
+    base = base[base['DT Validade'].notna()].sort_values('Último Movimento', kind='stable')
+    lotes = base.groupby(CHAVES_LOTE, observed=True, dropna=False, sort=False).agg(
+        **{'Nome Fornecedor': ('Nome Fornecedor', 'first'), 'Entradas': ('Entradas', 'sum'), 'Saídas': ('Saídas', 'sum'), 'Último Movimento': ('Último Movimento', 'max')}
+    ).reset_index()
+    lotes['Saldo no Período'] = lotes['Entradas'] - lotes['Saídas']
+    return lotes.sort_values(['DT Validade', 'Cód. Insumo', 'Lote'], ignore_index=True)[COLUNAS_LOTES]
+
+
+class LotExpiryIndex:
+    def __init__(self, lotes):
+        # `lotes`: build_lot_table (ou o equivalente do backend DuckDB), já ordenado pela validade
+        self.lotes = lotes
+        self.validades = lotes['DT Validade'].to_numpy(dtype='datetime64[ns]') if len(lotes) else np.empty(0, dtype='datetime64[ns]')
+        self.validades.flags.writeable = False
+
+    def __len__(self):
+        return len(self.lotes)
+
+    def expiring(self, referencia, dias, dias_vencidos=0, codigos=None, somente_com_saldo=False):
+        # Lotes que vencem até `dias` após a data de referência (e, com `dias_vencidos`, os
+        # vencidos há até tantos dias), com os dias que faltam (negativos: já vencido)
+        referencia = pd.Timestamp(referencia).normalize()
+        inicio = np.datetime64(referencia - pd.Timedelta(days=dias_vencidos), 'ns')
+        fim = np.datetime64(referencia + pd.Timedelta(days=dias), 'ns')
+        fatia = self.lotes.iloc[np.searchsorted(self.validades, inicio, side='left'):np.searchsorted(self.validades, fim, side='right')]
+        if codigos is not None: fatia = fatia[fatia['Cód. Insumo'].isin(list(codigos))]
+        if somente_com_saldo: fatia = fatia[fatia['Saldo no Período'] > 0]
+        fatia = fatia.copy()
+        fatia.insert(4, 'Dias para Vencer', (fatia['DT Validade'] - referencia).dt.days.astype('int64'))
+        return fatia.reset_index(drop=True)
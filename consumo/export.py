@@ -0,0 +1,162 @@
+# Exportação das tabelas de análise: Excel (xlsxwriter), CSV e Parquet.
+# O Excel é gravado linha a linha no modo constant_memory do xlsxwriter, em lotes
+# de linhas do DataFrame, com formatos numéricos de célula (os números continuam
+# números na planilha). CSV e Parquet (um arquivo por tabela, em um .zip) servem
+# para tabelas grandes demais para o Excel. Tudo é gravado em arquivo temporário;
+# só o resultado final (compactado) volta como bytes.
+import os
+import tempfile
+import zipfile
+
+import pandas as pd
+
+# Limites do Excel para nomes de planilha e linhas por planilha
+TAMANHO_MAXIMO_NOME_ABA = 31
+LIMITE_LINHAS_EXCEL = 1_048_576
+LINHAS_POR_LOTE = 10_000
+FORMATO_INTEIRO = '#,##0'
+FORMATO_DECIMAL = '#,##0.0'
+FORMATO_MOEDA = '#,##0.00'
+FORMATO_DATA = 'dd/mm/yyyy'
+# Formatos de exibição do dashboard (Styler.format) -> formato de célula do Excel
+FORMATOS_EXCEL = {"{:,.0f}": FORMATO_INTEIRO, "{:,.1f}": FORMATO_DECIMAL, "{:,.2f}": FORMATO_MOEDA, "{:%d/%m/%Y}": FORMATO_DATA}
+
+
+def excel_formats(formatos_exibicao):
+    # {coluna: "{:,.0f}"} (como no st.dataframe) -> {coluna: '#,##0'}; um formato só vale para todas as colunas numéricas
+    if isinstance(formatos_exibicao, str): return FORMATOS_EXCEL.get(formatos_exibicao, formatos_exibicao)
+    return {coluna: FORMATOS_EXCEL.get(formato, formato) for coluna, formato in (formatos_exibicao or {}).items()}
+
+
+def _row_batches(df):
+    # Lotes de linhas como listas Python (NaN/NaT -> célula vazia), sem copiar a tabela inteira
+    for inicio in range(0, len(df), LINHAS_POR_LOTE):
+        lote = df.iloc[inicio:inicio + LINHAS_POR_LOTE].astype(object)
+        yield lote.where(lote.notna(), None).to_numpy().tolist()
+
+
+def _sheet_name(nome, usados):
+    base = str(nome)[:TAMANHO_MAXIMO_NOME_ABA]; nome_aba = base; n = 2
+    while nome_aba.lower() in usados:
+        sufixo = f" ({n})"; nome_aba = base[:TAMANHO_MAXIMO_NOME_ABA - len(sufixo)] + sufixo; n += 1
+    usados.add(nome_aba.lower())
+    return nome_aba
+
+
+def _write_sheets(workbook, nome, df, formatos, estilos, usados):
+    # `formatos`: formato de todas as colunas numéricas (str) ou {coluna: formato}, em que a
+    # chave None vale para as colunas numéricas não listadas.
+    # Tabelas com mais linhas que o limite do Excel continuam em abas "Nome (2)", ...
+    formatos = {None: formatos} if isinstance(formatos, str) else dict(formatos or {})
+    for coluna in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[coluna]): formatos.setdefault(coluna, FORMATO_DATA)
+        elif pd.api.types.is_numeric_dtype(df[coluna]) and formatos.get(None): formatos.setdefault(coluna, formatos[None])
+    linhas_por_aba = LIMITE_LINHAS_EXCEL - 1
+    cabecalho = [coluna if isinstance(coluna, (int, float)) else str(coluna) for coluna in df.columns]
+    for inicio in range(0, max(len(df), 1), linhas_por_aba):
+        planilha = workbook.add_worksheet(_sheet_name(nome, usados))
+        # No modo constant_memory as colunas são configuradas antes da primeira linha
+        for indice, coluna in enumerate(df.columns):
+            formato = formatos.get(coluna)
+            if formato is not None: planilha.set_column(indice, indice, None, estilos.setdefault(formato, workbook.add_format({'num_format': formato})))
+        planilha.write_row(0, 0, cabecalho, estilos['cabecalho'])
+        linha = 1
+        for lote in _row_batches(df.iloc[inicio:inicio + linhas_por_aba]):
+            for valores in lote:
+                planilha.write_row(linha, 0, valores); linha += 1
+        planilha.freeze_panes(1, 0)
+
+
+def frames_to_excel_bytes(abas, formatos=None):
+    # Um workbook com uma planilha por tabela; `abas` é {nome da aba: DataFrame}
+    # e `formatos`, {nome da aba: formato numérico ou {coluna: formato}}.
+    import xlsxwriter
+    formatos = formatos or {}
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'exportacao.xlsx')
+        workbook = xlsxwriter.Workbook(caminho, {'constant_memory': True, 'tmpdir': pasta})
+        estilos = {'cabecalho': workbook.add_format({'bold': True})}; usados = set()
+        for nome, df in abas.items():
+            _write_sheets(workbook, nome, df, formatos.get(nome), estilos, usados)
+        workbook.close()
+        with open(caminho, 'rb') as f:
+            return f.read()
+
+
+def df_to_excel_bytes(df_to_export, formatos=None):
+    return frames_to_excel_bytes({'Dados': df_to_export}, {'Dados': formatos})
+
+
+def _zip_bytes(abas, extensao, gravar):
+    # Um arquivo por tabela dentro de um .zip; cada tabela é gravada em disco e
+    # copiada para o zip em blocos
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_zip = os.path.join(pasta, 'exportacao.zip')
+        with zipfile.ZipFile(caminho_zip, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            usados = set()
+            for nome, df in abas.items():
+                caminho = os.path.join(pasta, 'tabela' + extensao)
+                gravar(df, caminho)
+                zf.write(caminho, _sheet_name(nome, usados) + extensao)
+                os.remove(caminho)
+        with open(caminho_zip, 'rb') as f:
+            return f.read()
+
+
+def _write_csv(df, caminho):
+    # Mesmo formato das exportações de origem: ';' e vírgula decimal, UTF-8 com BOM (abre no Excel)
+    with open(caminho, 'w', encoding='utf-8-sig', newline='') as f:
+        for inicio in range(0, max(len(df), 1), LINHAS_POR_LOTE):
+            df.iloc[inicio:inicio + LINHAS_POR_LOTE].to_csv(f, sep=';', decimal=',', index=False, header=inicio == 0)
+
+
+def _write_parquet(df, caminho):
+    import pyarrow as pa
+    from pyarrow import parquet as pq
+    df = df.rename(columns=str)
+    escritor = None
+    try:
+        for inicio in range(0, max(len(df), 1), LINHAS_POR_LOTE):
+            tabela = pa.Table.from_pandas(df.iloc[inicio:inicio + LINHAS_POR_LOTE], preserve_index=False)
+            if escritor is None: escritor = pq.ParquetWriter(caminho, tabela.schema)
+            escritor.write_table(tabela.cast(escritor.schema))
+    finally:
+        if escritor is not None: escritor.close()
+
+
+def frames_to_csv_zip_bytes(abas):
+    return _zip_bytes(abas, '.csv', _write_csv)
+
+
+def frames_to_parquet_zip_bytes(abas):
+    return _zip_bytes(abas, '.parquet', _write_parquet)
+
+
+# Formatos das abas do pacote completo, os mesmos da exibição no dashboard
+REPORT_FORMATS = {
+    'Consumo Total Anual': FORMATO_INTEIRO,
+    'Consumo Médio Mensal': FORMATO_DECIMAL,
+    'Consumo Mensal Detalhado': {None: FORMATO_INTEIRO, 'CONSUMO MEDIO': FORMATO_DECIMAL},
+    'Média Geral Mensal': FORMATO_DECIMAL,
+    'Consumo por Unidade': FORMATO_INTEIRO,
+    'Média Mensal por Unidade': FORMATO_DECIMAL,
+    'Unidade por Ano': FORMATO_DECIMAL,
+    'Gasto por Fornecedor': {None: FORMATO_INTEIRO, 'Valor Total': FORMATO_MOEDA, '% do Valor': FORMATO_DECIMAL},
+    'Gasto por Classe': {None: FORMATO_INTEIRO, 'Valor Total': FORMATO_MOEDA, '% do Valor': FORMATO_DECIMAL},
+    'Gasto por Unidade': {None: FORMATO_INTEIRO, 'Valor Total': FORMATO_MOEDA, '% do Valor': FORMATO_DECIMAL},
+    'Lotes a Vencer': FORMATO_INTEIRO,
+}
+
+
+def report_excel_bytes(relatorio):
+    # Pacote Excel de um relatório de consumo/engine.build_report: uma aba por seção não vazia
+    abas = {
+        'Consumo Total Anual': relatorio['consumo_anual_pivot'],
+        'Consumo Médio Mensal': relatorio['consumo_medio_pivot'],
+        'Consumo Mensal Detalhado': relatorio['consumo_mensal_pivot'],
+        'Média Geral Mensal': relatorio['media_geral'],
+        'Consumo por Unidade': relatorio['unidades'],
+        'Média Mensal por Unidade': relatorio['media_unidade'],
+        'Unidade por Ano': relatorio['pivot_unidade_ano'],
+    }
+    return frames_to_excel_bytes({nome: df for nome, df in abas.items() if not df.empty}, REPORT_FORMATS)
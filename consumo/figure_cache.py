@@ -0,0 +1,83 @@
+# Cache em disco das imagens PNG dos gráficos do relatório, endereçado pelo
+# conteúdo: a chave é o hash da especificação da figura + tamanho de renderização.
+# Figuras iguais (mesma visão, outro rerun ou outro usuário) não voltam ao kaleido.
+import hashlib
+import json
+import os
+import threading
+
+DIRETORIO_FIGURAS = ".figuras"
+LIMITE_BYTES_FIGURAS = 256 * 1024 * 1024
+
+
+def figure_key(fig, largura, altura, escala):
+    from plotly.utils import PlotlyJSONEncoder
+    spec = json.dumps(fig.to_plotly_json(), cls=PlotlyJSONEncoder, sort_keys=True)
+    h = hashlib.sha256(spec.encode('utf-8'))
+    h.update(f"|png|{largura}x{altura}@{escala}".encode('utf-8'))
+    return h.hexdigest()
+
+
+def _ler_se_existir(caminho):
+    try:
+        with open(caminho, 'rb') as f:
+            dados = f.read()
+    except OSError:
+        return None
+    try:
+        os.utime(caminho)  # mtime marca o último uso (ordem do LRU)
+    except OSError:
+        pass
+    return dados
+
+
+def evict_lru(diretorio=DIRETORIO_FIGURAS, limite_bytes=LIMITE_BYTES_FIGURAS):
+    # Remove os PNGs usados há mais tempo até o total caber no limite.
+    try:
+        entradas = [e for e in os.scandir(diretorio) if e.name.endswith('.png') and '.tmp' not in e.name]
+    except OSError:
+        return
+    arquivos = sorted(((e.stat().st_mtime_ns, e.stat().st_size, e.path) for e in entradas))
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    for _, tamanho, caminho in arquivos:
+        if total <= limite_bytes: break
+        try:
+            os.remove(caminho)
+        except OSError:
+            continue
+        total -= tamanho
+
+
+def render_pngs(figs, largura, altura, escala, diretorio=DIRETORIO_FIGURAS, limite_bytes=LIMITE_BYTES_FIGURAS):
+    # Retorna os PNGs na ordem de `figs`. As figuras ausentes do cache são
+    # renderizadas juntas em uma única chamada ao kaleido (um só navegador).
+    import plotly.io as pio
+    chaves = [figure_key(fig, largura, altura, escala) for fig in figs]
+    caminhos = [os.path.join(diretorio, f"{chave}.png") for chave in chaves]
+    imagens = [_ler_se_existir(caminho) for caminho in caminhos]
+    faltantes = {}
+    for i, imagem in enumerate(imagens):
+        if imagem is None: faltantes.setdefault(caminhos[i], figs[i])
+    if not faltantes:
+        return imagens
+
+    os.makedirs(diretorio, exist_ok=True)
+    sufixo = f".{os.getpid()}.{threading.get_ident()}.tmp.png"
+    temporarios = [caminho + sufixo for caminho in faltantes]
+    try:
+        pio.write_images(list(faltantes.values()), temporarios, format="png", width=largura, height=altura, scale=escala)
+        # Os bytes são lidos antes de ir para o cache: uma remoção do LRU (deste ou de
+        # outro processo) logo depois não afeta o retorno
+        renderizadas = {}
+        for temporario, caminho in zip(temporarios, faltantes):
+            with open(temporario, 'rb') as f:
+                renderizadas[caminho] = f.read()
+            os.replace(temporario, caminho)
+    finally:
+        for temporario in temporarios:
+            if os.path.exists(temporario): os.remove(temporario)
+
+    for i, imagem in enumerate(imagens):
+        if imagem is None: imagens[i] = renderizadas[caminhos[i]]
+    evict_lru(diretorio, limite_bytes)
+    return imagens
@@ -0,0 +1,72 @@
+# Índice invertido valor -> posições de linha para os filtros da barra lateral.
+# Construído uma vez por conjunto de dados; a filtragem parte da condição mais
+# seletiva e verifica as demais só nas posições candidatas, de modo que o custo
+# acompanha o nº de linhas que casam e não o tamanho do conjunto de dados.
+import numpy as np
+import pandas as pd
+
+COLUNAS_INDEXADAS = ['Desc. Insumo', 'Cód. Insumo', 'Descricao Classe', 'Ano', 'Descricao Movimento', 'Descricao Requisitante']
+
+
+class _IndiceColuna:
+    def __init__(self, serie):
+        codigos, valores = pd.factorize(serie, sort=False)
+        self.codigos = codigos.astype(np.int32)
+        self.codigo_por_valor = {valor: codigo for codigo, valor in enumerate(valores.tolist())}
+        # Posições agrupadas por código; o argsort estável mantém cada grupo ordenado
+        self.ordem = np.argsort(self.codigos, kind='stable').astype(np.int64)
+        self.limites = np.searchsorted(self.codigos[self.ordem], np.arange(len(valores) + 1))
+        # positions() devolve fatias de `ordem`: o índice é compartilhado entre sessões
+        self.ordem.flags.writeable = False
+
+    def codes_for(self, valores):
+        return np.array([self.codigo_por_valor[valor] for valor in valores if valor in self.codigo_por_valor], dtype=np.int32)
+
+    def count(self, codigos):
+        return int(sum(self.limites[c + 1] - self.limites[c] for c in codigos))
+
+    def positions(self, codigos):
+        partes = [self.ordem[self.limites[c]:self.limites[c + 1]] for c in codigos]
+        if not partes: return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(partes)) if len(partes) > 1 else partes[0]
+
+    def contains(self, posicoes, codigos):
+        return np.isin(self.codigos[posicoes], codigos)
+
+
+class FilterIndex:
+    def __init__(self, df, colunas=COLUNAS_INDEXADAS):
+        self.n_linhas = len(df)
+        self.colunas = {col: _IndiceColuna(df[col]) for col in colunas if col in df.columns}
+
+    def positions(self, coluna, valores):
+        indice = self.colunas[coluna]
+        return indice.positions(indice.codes_for(valores))
+
+    def select(self, condicoes, posicoes=None):
+        # `condicoes`: lista de dicts {coluna: valores}. Dentro de um dict as colunas se
+        # combinam por OU; entre dicts, por E. Colunas sem valores são ignoradas, como
+        # um multiselect vazio. Retorna as posições (ordenadas) que satisfazem tudo.
+        ativas = []
+        for condicao in condicoes:
+            termos = [(self.colunas[col], self.colunas[col].codes_for(valores)) for col, valores in condicao.items() if len(valores)]
+            if termos: ativas.append(termos)
+        if posicoes is None and not ativas:
+            return np.arange(self.n_linhas)
+
+        def tamanho(termos):
+            return sum(indice.count(codigos) for indice, codigos in termos)
+
+        if posicoes is None:
+            ativas.sort(key=tamanho)
+            inicial = ativas.pop(0)
+            posicoes = inicial[0][0].positions(inicial[0][1])
+            for indice, codigos in inicial[1:]:
+                posicoes = np.union1d(posicoes, indice.positions(codigos))
+        for termos in ativas:
+            if not len(posicoes): break
+            mascara = np.zeros(len(posicoes), dtype=bool)
+            for indice, codigos in termos:
+                mascara |= indice.contains(posicoes, codigos)
+            posicoes = posicoes[mascara]
+        return posicoes
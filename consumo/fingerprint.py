@@ -0,0 +1,13 @@
+# Impressão digital estável do estado dos filtros, usada como chave de cache
+# para artefatos derivados de uma visão (exportações, relatórios, gráficos).
+import hashlib
+import json
+
+
+def filter_fingerprint(**estado):
+    # Listas de seleção são normalizadas (ordem dos cliques não muda a visão)
+    normalizado = {
+        chave: sorted(map(str, valor)) if isinstance(valor, (list, tuple, set)) else str(valor)
+        for chave, valor in estado.items()
+    }
+    return hashlib.sha1(json.dumps(normalizado, sort_keys=True).encode('utf-8')).hexdigest()
@@ -0,0 +1,150 @@
+# Ingestão incremental das exportações mensais (Material-RELA<MES>.csv).
+# Cada arquivo vira uma "parte" Arrow já pré-processada em <diretorio>/.ingestao;
+# só arquivos novos ou alterados são lidos de novo, e linhas que já existem em
+# outras partes (mês reexportado com outro nome, anual sobreposto) são descartadas.
+# O manifest guarda contra quais partes cada arquivo descartou linhas; quando uma
+# delas é substituída, o arquivo é relido para recuperar o que ela não tem mais.
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from pyarrow import feather
+
+from consumo.pipeline import concat_compact, preprocess_frame, read_material_csv
+from consumo.snapshot import VERSAO_PIPELINE, atomic_write, content_hash, source_fingerprint, write_json
+
+PADRAO_MENSAL = "Material-RELA*.csv"
+DIRETORIO_STORE = ".ingestao"
+COLUNAS_CHAVE = ['Requisicao', 'Cód. Insumo', 'Lote', 'Dt Movimento']
+COLUNA_CHAVE_HASH = '_chave'
+
+
+def list_monthly_files(diretorio, padrao=PADRAO_MENSAL):
+    return sorted(glob.glob(os.path.join(diretorio, padrao)))
+
+
+def _store_paths(diretorio):
+    pasta = os.path.join(diretorio, DIRETORIO_STORE)
+    return pasta, os.path.join(pasta, 'manifest.json')
+
+
+def _carrega_manifest(caminho_manifest):
+    try:
+        with open(caminho_manifest, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'versao': VERSAO_PIPELINE, 'arquivos': {}}
+    if manifest.get('versao') != VERSAO_PIPELINE:
+        # Regras de pré-processamento mudaram: todas as partes precisam ser refeitas.
+        return {'versao': VERSAO_PIPELINE, 'arquivos': {}}
+    return manifest
+
+
+def row_keys(df):
+    # Hash de (Requisicao, Insumo, Lote, Dt Movimento, nº da ocorrência).
+    # A ocorrência preserva linhas legítimas repetidas dentro do mesmo arquivo
+    # (a Requisicao chega truncada em notação científica, ex. "2,03E+11").
+    colunas = [col for col in COLUNAS_CHAVE if col in df.columns]
+    chave = pd.DataFrame({col: df[col].astype(str).str.strip() for col in colunas}, index=df.index)
+    chave['_ocorrencia'] = chave.groupby(colunas, sort=False, dropna=False).cumcount()
+    return pd.util.hash_pandas_object(chave, index=False).to_numpy(dtype=np.uint64)
+
+
+def _chaves_da_parte(caminho_parte):
+    return feather.read_table(caminho_parte, columns=[COLUNA_CHAVE_HASH], memory_map=True).column(0).to_numpy()
+
+
+def _arquivo_mudou(caminho, registro):
+    if registro is None:
+        return True
+    atual = source_fingerprint(caminho, com_hash=False)
+    if atual['size'] != registro['size']:
+        return True
+    if atual['mtime_ns'] != registro['mtime_ns']:
+        if content_hash(caminho) != registro['sha256']:
+            return True
+        registro['mtime_ns'] = atual['mtime_ns']
+    return False
+
+
+def ingest_directory(diretorio, padrao=PADRAO_MENSAL, avisar=None):
+    # Retorna um resumo da ingestão; o custo é proporcional aos arquivos novos/alterados.
+    pasta_store, caminho_manifest = _store_paths(diretorio)
+    manifest = _carrega_manifest(caminho_manifest)
+    registros = manifest['arquivos']
+    resumo = {'arquivos_lidos': [], 'linhas_adicionadas': 0, 'linhas_duplicadas': 0}
+
+    arquivos = list_monthly_files(diretorio, padrao)
+    pendentes = {os.path.basename(caminho) for caminho in arquivos
+                 if _arquivo_mudou(caminho, registros.get(os.path.basename(caminho)))}
+    if not pendentes:
+        write_json(caminho_manifest, manifest)
+        return resumo
+    # Uma parte que descartou linhas repetidas de outra é refeita quando a outra é substituída:
+    # as linhas podem não estar mais lá. Só para arquivos ainda presentes (partes de arquivos
+    # removidos ficam como estão).
+    dependentes = True
+    while dependentes:
+        dependentes = {os.path.basename(caminho) for caminho in arquivos
+                       if os.path.basename(caminho) not in pendentes
+                       and pendentes.intersection(registros.get(os.path.basename(caminho), {}).get('descartadas_contra', ()))}
+        pendentes |= dependentes
+
+    # Chaves das partes que permanecem (as dos arquivos pendentes serão substituídas).
+    chaves_partes = {
+        nome: _chaves_da_parte(os.path.join(pasta_store, registro['parte']))
+        for nome, registro in registros.items() if nome not in pendentes
+    }
+    chaves_existentes = np.concatenate(list(chaves_partes.values())) if chaves_partes else np.empty(0, dtype=np.uint64)
+
+    for caminho in arquivos:
+        nome = os.path.basename(caminho)
+        if nome not in pendentes: continue
+        fingerprint = source_fingerprint(caminho)
+        df = preprocess_frame(read_material_csv(caminho), avisar=avisar)
+        chaves = row_keys(df) if not df.empty else np.empty(0, dtype=np.uint64)
+        novas = ~np.isin(chaves, chaves_existentes)
+        # Partes com que as linhas descartadas colidiram (ver dependentes acima)
+        repetidas = chaves[~novas]
+        descartadas_contra = sorted(outro for outro, chaves_outro in chaves_partes.items()
+                                    if len(repetidas) and np.isin(repetidas, chaves_outro).any())
+        df = df[novas].copy()
+        df[COLUNA_CHAVE_HASH] = chaves[novas]
+
+        parte = nome + '.arrow'
+        atomic_write(os.path.join(pasta_store, parte),
+                       lambda destino: feather.write_feather(df.reset_index(drop=True), destino, compression='uncompressed'))
+        registros[nome] = dict(fingerprint, parte=parte, linhas=int(novas.sum()), descartadas_contra=descartadas_contra)
+        write_json(caminho_manifest, manifest)
+
+        chaves_partes[nome] = chaves[novas]
+        chaves_existentes = np.concatenate([chaves_existentes, chaves[novas]])
+        resumo['arquivos_lidos'].append(nome)
+        resumo['linhas_adicionadas'] += int(novas.sum())
+        resumo['linhas_duplicadas'] += int((~novas).sum())
+    return resumo
+
+
+def store_parts(diretorio):
+    # Caminhos das partes Arrow do store, na ordem de load_store
+    pasta_store, caminho_manifest = _store_paths(diretorio)
+    manifest = _carrega_manifest(caminho_manifest)
+    return [os.path.join(pasta_store, registro['parte']) for _, registro in sorted(manifest['arquivos'].items())]
+
+
+def load_store(diretorio):
+    # Partes de arquivos de origem removidos continuam no store (histórico persistente).
+    partes = [feather.read_feather(caminho, memory_map=True) for caminho in store_parts(diretorio)]
+    df = concat_compact(partes)
+    return df.drop(columns=[COLUNA_CHAVE_HASH]) if not df.empty else df
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Ingestão incremental das exportações mensais de materiais.")
+    parser.add_argument('diretorio', nargs='?', default='.')
+    parser.add_argument('--padrao', default=PADRAO_MENSAL)
+    args = parser.parse_args()
+    print(json.dumps(ingest_directory(args.diretorio, args.padrao, avisar=print), ensure_ascii=False))
@@ -0,0 +1,39 @@
+# Memoização por seção do dashboard: o resultado de cada seção (tabela ou
+# gráfico) fica em um LRU próprio, chaveado só pelas entradas que a seção usa.
+# Mudar um widget recalcula apenas as seções que dependem dele; as demais voltam
+# do cache. Os resultados são compartilhados entre sessões, sem cópia: quem os
+# recebe não deve alterá-los.
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def dependency_key(dependencias):
+    # Diferente de filter_fingerprint, a ordem das listas conta: a ordem dos anos
+    # selecionados define a ordem das colunas das tabelas.
+    return hashlib.sha1(json.dumps(dependencias, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class SectionMemo:
+    def __init__(self, max_por_secao=16):
+        self._max_por_secao = max_por_secao
+        self._secoes = {}
+        self._lock = threading.Lock()
+
+    def compute(self, secao, dependencias, funcao, *args, **kwargs):
+        chave = dependency_key(dependencias)
+        with self._lock:
+            entradas = self._secoes.setdefault(secao, OrderedDict())
+            if chave in entradas:
+                entradas.move_to_end(chave)
+                return entradas[chave]
+        # Calculado fora do lock: seções diferentes (e sessões) não se bloqueiam
+        resultado = funcao(*args, **kwargs)
+        with self._lock:
+            entradas[chave] = resultado
+            while len(entradas) > self._max_por_secao: entradas.popitem(last=False)
+        return resultado
+
+    def clear(self):
+        with self._lock: self._secoes.clear()
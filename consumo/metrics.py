@@ -0,0 +1,83 @@
+# Núcleo vetorizado da métrica "consumo médio mensal sobre meses com consumo":
+# total por grupo, nº de meses distintos com quantidade > 0 e a média (total /
+# meses, 0 quando não há mês com consumo), em uma única passada sobre as linhas.
+#
+# Os grupos saem direto dos códigos das colunas categóricas (combinação em base
+# mista + bincount), sem o hash de um groupby; o resultado tem as mesmas linhas
+# e a mesma ordem de df.groupby(chaves, observed=True, sort=True).
+import numpy as np
+import pandas as pd
+
+COLUNA_TOTAL = 'Total'
+COLUNA_MESES = 'Meses com Consumo'
+COLUNA_MEDIA = 'Média Mensal'
+
+# Acima deste nº de combinações possíveis, os grupos observados saem de
+# np.unique (ordenação) em vez de um bincount denso.
+LIMITE_ESPACO_DENSO = 1 << 22
+
+
+def _codes(serie):
+    # Códigos ordenados (-1 para nulos) e os valores correspondentes.
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(dtype='int64'), serie.cat.categories
+    codigos, valores = pd.factorize(serie, sort=True)
+    return codigos.astype('int64', copy=False), valores
+
+
+def _compact(combinado, espaco):
+    # Numera as combinações presentes em ordem crescente: (observadas, código do grupo por linha)
+    if espaco <= LIMITE_ESPACO_DENSO:
+        observadas = np.flatnonzero(np.bincount(combinado, minlength=espaco))
+        posicao = np.empty(espaco, dtype='int64')
+        posicao[observadas] = np.arange(len(observadas))
+        return observadas, posicao[combinado]
+    return np.unique(combinado, return_inverse=True)
+
+
+def group_codes(df, chaves):
+    # Equivalente a groupby(chaves, observed=True, sort=True).ngroup(), com -1
+    # para linhas de chave nula; retorna também o índice dos grupos.
+    colunas = [_codes(df[chave]) for chave in chaves]
+    tamanhos = [max(len(valores), 1) for _, valores in colunas]
+    validos = np.ones(len(df), dtype=bool)
+    combinado = np.zeros(len(df), dtype='int64')
+    for (codigos, _), tamanho in zip(colunas, tamanhos):
+        validos &= codigos >= 0
+        combinado = combinado * tamanho + codigos
+    observadas, grupos = _compact(combinado[validos], int(np.prod(tamanhos, dtype='float64')))
+
+    niveis, resto = [], observadas
+    for (_, valores), tamanho, chave in zip(reversed(colunas), reversed(tamanhos), reversed(chaves)):
+        resto, codigos_nivel = np.divmod(resto, tamanho)
+        if isinstance(df[chave].dtype, pd.CategoricalDtype):
+            niveis.append(pd.Categorical.from_codes(codigos_nivel, dtype=df[chave].dtype))
+        else:
+            niveis.append(np.asarray(valores)[codigos_nivel])
+    niveis.reverse()
+    indice = pd.MultiIndex.from_arrays(niveis, names=chaves) if len(chaves) > 1 else pd.Index(niveis[0], name=chaves[0])
+
+    codigos_grupo = np.full(len(df), -1, dtype='int64')
+    codigos_grupo[validos] = grupos
+    return codigos_grupo, indice
+
+
+def monthly_average(df, chaves, valor='Quantidade', meses=('Mês Num',)):
+    # Retorna um DataFrame indexado por `chaves` (ordenado, como um groupby),
+    # com as colunas COLUNA_TOTAL, COLUNA_MESES e COLUNA_MEDIA.
+    chaves, meses = list(chaves), list(meses)
+    grupos, indice = group_codes(df, chaves)
+    n_grupos = len(indice)
+    valores = df[valor].to_numpy(dtype='float64', na_value=np.nan)
+    somaveis = (grupos >= 0) & ~np.isnan(valores)
+    total = np.bincount(grupos[somaveis], weights=valores[somaveis], minlength=n_grupos)
+
+    codigos_mes, indice_meses = group_codes(df, meses)
+    n_meses = max(len(indice_meses), 1)
+    positivos = (grupos >= 0) & (codigos_mes >= 0) & (valores > 0)
+    # Cada par (grupo, mês) com consumo conta uma vez
+    pares, _ = _compact(grupos[positivos] * n_meses + codigos_mes[positivos], n_grupos * n_meses)
+    meses_com_consumo = np.bincount(pares // n_meses, minlength=n_grupos)
+
+    media = np.divide(total, meses_com_consumo, out=np.zeros(n_grupos), where=meses_com_consumo > 0)
+    return pd.DataFrame({COLUNA_TOTAL: total, COLUNA_MESES: meses_com_consumo, COLUNA_MEDIA: media}, index=indice)
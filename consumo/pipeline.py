@@ -0,0 +1,240 @@
+# Leitura e pré-processamento do CSV de materiais, sem dependência do Streamlit.
+# O dashboard e a ingestão incremental usam exatamente as mesmas regras.
+import codecs
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
+
+MESES_PT_ORDENADOS = [
+    "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
+    "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"
+]
+MESES_PT_MAP = {i+1: mes for i, mes in enumerate(MESES_PT_ORDENADOS)}
+
+COLUMN_MAPPING = {
+    'Insumo': 'Cód. Insumo', 'Descricao': 'Desc. Insumo', 'Dt Movimento': 'Dt Movimento',
+    'Quantidade': 'Quantidade', 'Descricao Movimento': 'Descricao Movimento',
+    'Descricao Requisitante': 'Descricao Requisitante', 'Valor ': 'Valor',
+    'Descricao da Classe': 'Descricao Classe',
+    'Fornecedor': 'Nome Fornecedor'
+}
+ESSENTIAL_COLS = ['Desc. Insumo', 'Cód. Insumo', 'Descricao Movimento', 'Quantidade', 'Ano', 'Dt Movimento', 'Mês Num', 'Mês Nome']
+OPTIONAL_COLS = ['Descricao Requisitante', 'Valor', 'Descricao Classe', 'Nome Fornecedor']
+# Números em pt-BR ("1.234,5") e datas dd/mm/aaaa são convertidos já na leitura; as
+# demais colunas são lidas como texto para que identificadores exportados em notação
+# científica ("2,03E+11" em Requisicao e CGC) não virem floats com precisão perdida.
+COLUNAS_NUMERICAS_CSV = ['Quantidade', 'Valor ']
+COLUNAS_DATA = ['Dt Movimento', 'DT Validade']
+FORMATO_DATA = '%d/%m/%Y'
+FORNECEDORES_EXCLUIDOS = ["AJUSTE DE INVENTARIO", "AJUSTE INVENTARIO", "AJUSTE MATERIAL"]
+
+# Esquema compacto: a exportação preenche os textos com espaços até largura fixa e
+# repete poucas centenas de valores distintos em milhões de linhas.
+COLUNAS_CATEGORICAS = ['Cód. Insumo', 'Desc. Insumo', 'Descricao Movimento', 'Descricao Requisitante', 'Descricao Classe', 'Nome Fornecedor', 'Mês Nome']
+TIPOS_COMPACTOS = {'Ano': 'int16', 'Mês Num': 'int8', 'Quantidade': 'float32', 'Valor': 'float32'}
+# Demais colunas de texto viram category quando a razão distintos/linhas fica abaixo disto.
+LIMITE_CARDINALIDADE_CATEGORIA = 0.5
+
+TAMANHO_BLOCO_PADRAO = 64 * 1024 * 1024  # bytes de CSV por bloco na leitura em blocos
+TAMANHO_AMOSTRA_ENCODING = 4 * 1024 * 1024
+
+
+def _number_ptbr_arrow(coluna):
+    texto = pc.utf8_trim_whitespace(coluna)
+    texto = pc.replace_substring(pc.replace_substring(texto, '.', ''), ',', '.')
+    try:
+        return pc.cast(texto, pa.float64())
+    except pa.ArrowInvalid:
+        # Algum valor inválido: converte com coerção para NaN, como o caminho por texto
+        return pa.array(pd.to_numeric(texto.to_pandas(), errors='coerce'), type=pa.float64())
+
+
+def detect_encoding(caminho, tamanho_amostra=TAMANHO_AMOSTRA_ENCODING):
+    # Decide o encoding uma única vez, pelo BOM ou por uma amostra do início do arquivo.
+    with open(caminho, 'rb') as f:
+        amostra = f.read(tamanho_amostra)
+    if amostra.startswith(codecs.BOM_UTF8): return 'utf-8'  # o BOM é descartado pelos leitores
+    if amostra.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)): return 'utf-16'
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(amostra, final=False)
+    except UnicodeDecodeError:
+        return 'latin1'
+    return 'utf-8'
+
+
+def _read_options(caminho, encoding, tamanho_bloco=None):
+    # Nomes das colunas seguem o pandas (ex. "Unnamed: 28" para o ';' final da exportação).
+    cabecalho = list(pd.read_csv(caminho, sep=';', encoding=encoding, nrows=0).columns)
+    leitura = dict(encoding=encoding, column_names=cabecalho, skip_rows=1)
+    if tamanho_bloco: leitura['block_size'] = tamanho_bloco
+    return dict(
+        read_options=pa_csv.ReadOptions(**leitura),
+        parse_options=pa_csv.ParseOptions(delimiter=';'),
+        convert_options=pa_csv.ConvertOptions(column_types={col: pa.string() for col in cabecalho}, strings_can_be_null=True),
+    )
+
+
+def _table_to_frame(tabela):
+    for col in COLUNAS_NUMERICAS_CSV:
+        if col in tabela.column_names:
+            tabela = tabela.set_column(tabela.column_names.index(col), col, _number_ptbr_arrow(tabela[col]))
+    df = tabela.to_pandas()
+    # Datas pelo pandas: o strptime do Arrow aceita dias inexistentes (31/02 vira 03/03)
+    for col in COLUNAS_DATA:
+        if col in df.columns: df[col] = pd.to_datetime(df[col], format=FORMATO_DATA, errors='coerce')
+    return df
+
+
+def _is_utf8_error(erro):
+    return isinstance(erro, UnicodeDecodeError) or 'UTF8' in str(erro)
+
+
+def read_material_csv(caminho, encoding=None):
+    encoding = encoding or detect_encoding(caminho)
+    try:
+        return _table_to_frame(pa_csv.read_csv(caminho, **_read_options(caminho, encoding)))
+    except (UnicodeDecodeError, pa.ArrowInvalid) as e:
+        # Byte inválido depois da amostra usada para detectar o encoding
+        if encoding != 'latin1' and _is_utf8_error(e): return read_material_csv(caminho, 'latin1')
+        raise ValueError(f"Erro ao ler CSV '{caminho}': {e}") from e
+
+
+def iter_material_csv(caminho, tamanho_bloco=TAMANHO_BLOCO_PADRAO, encoding=None):
+    # Lê o CSV em blocos de ~tamanho_bloco bytes; cada bloco vem como DataFrame bruto.
+    encoding = encoding or detect_encoding(caminho)
+    leitor = pa_csv.open_csv(caminho, **_read_options(caminho, encoding, tamanho_bloco))
+    for lote in leitor:
+        yield _table_to_frame(pa.Table.from_batches([lote]))
+
+
+def load_material_csv_chunked(caminho, tamanho_bloco=TAMANHO_BLOCO_PADRAO, avisar=None, encoding=None):
+    # Caminho de memória limitada: só um bloco bruto fica em memória por vez; o que se
+    # acumula são os blocos já pré-processados no esquema compacto.
+    encoding = encoding or detect_encoding(caminho)
+    partes = []; colunas_categoricas = None
+    try:
+        for bruto in iter_material_csv(caminho, tamanho_bloco, encoding):
+            parte = preprocess_frame(bruto, avisar=avisar if not partes else None, colunas_categoricas=colunas_categoricas)
+            del bruto
+            if colunas_categoricas is None and not parte.empty:
+                # A decisão de quais colunas viram category vale para todos os blocos
+                colunas_categoricas = [col for col in parte.columns if isinstance(parte[col].dtype, pd.CategoricalDtype)]
+            partes.append(parte)
+    except (UnicodeDecodeError, pa.ArrowInvalid) as e:
+        if encoding != 'latin1' and _is_utf8_error(e): return load_material_csv_chunked(caminho, tamanho_bloco, avisar, 'latin1')
+        raise ValueError(f"Erro ao ler CSV '{caminho}': {e}") from e
+    return concat_compact(partes)
+
+
+def concat_compact(partes):
+    # pd.concat de categoricals com categorias diferentes cai para object; unifica antes.
+    partes = [parte for parte in partes if not parte.empty]
+    if not partes: return pd.DataFrame()
+    if len(partes) == 1: return partes[0].reset_index(drop=True)
+    for col in partes[0].columns:
+        if not isinstance(partes[0][col].dtype, pd.CategoricalDtype): continue
+        categorias = partes[0][col].cat.categories.append([parte[col].cat.categories for parte in partes[1:]]).unique().sort_values()
+        for parte in partes:
+            parte[col] = parte[col].cat.set_categories(categorias)
+    return pd.concat(partes, ignore_index=True)
+
+
+def _to_number_ptbr(serie):
+    # Já numérica quando lida por read_material_csv; o caminho por texto só é usado
+    # quando a coluna tem valores inválidos ou veio de outra fonte.
+    if pd.api.types.is_numeric_dtype(serie): return serie
+    return pd.to_numeric(serie.astype(str).str.replace('.', '', regex=False).str.replace(',', '.', regex=False), errors='coerce')
+
+
+def preprocess_frame(df_original, avisar=None, colunas_categoricas=None):
+    # Colunas essenciais ausentes geram ValueError; avisos não fatais vão para `avisar`.
+    if df_original.empty: return pd.DataFrame()
+    df = df_original.copy()
+    actual_renames = {}
+    for original_name_csv, new_name_internal in COLUMN_MAPPING.items():
+        if original_name_csv in df.columns: actual_renames[original_name_csv] = new_name_internal
+        elif avisar: avisar(f"Coluna original '{original_name_csv}' do CSV não encontrada para mapeamento. Será ignorada.")
+    df.rename(columns=actual_renames, inplace=True)
+
+    if 'Quantidade' not in df.columns: raise ValueError("Coluna interna 'Quantidade' não encontrada.")
+    df['Quantidade'] = _to_number_ptbr(df['Quantidade']).abs()
+    if 'Dt Movimento' not in df.columns: raise ValueError("Coluna interna 'Dt Movimento' não encontrada.")
+    for col in COLUNAS_DATA:
+        if col in df.columns: df[col] = pd.to_datetime(df[col], format=FORMATO_DATA, errors='coerce')
+    df['Ano'] = df['Dt Movimento'].dt.year
+    df['Mês Num'] = df['Dt Movimento'].dt.month
+    df['Mês Nome'] = df['Mês Num'].map(MESES_PT_MAP)
+
+    df = df.dropna(subset=['Dt Movimento', 'Ano', 'Mês Num', 'Mês Nome'])
+    df['Ano'] = df['Ano'].astype(int)
+    df['Mês Num'] = df['Mês Num'].astype(int)
+
+    for col in ESSENTIAL_COLS:
+        if col not in df.columns: raise ValueError(f"Coluna interna essencial '{col}' não encontrada.")
+    for col in OPTIONAL_COLS:
+        if col not in df.columns:
+            df[col] = 0.0 if col == 'Valor' else 'N/A'
+
+    df = df.dropna(subset=['Desc. Insumo', 'Cód. Insumo', 'Descricao Movimento'])
+    df['Desc. Insumo'] = df['Desc. Insumo'].astype(str); df['Cód. Insumo'] = df['Cód. Insumo'].astype(str)
+    df['Descricao Requisitante'] = df['Descricao Requisitante'].astype(str).fillna('N/A')
+    df['Descricao Classe'] = df['Descricao Classe'].astype(str).fillna('N/A')
+    df['Valor'] = _to_number_ptbr(df['Valor']).abs().fillna(0)
+    df['Nome Fornecedor'] = df['Nome Fornecedor'].astype(str).fillna('N/A')
+
+    df = apply_compact_schema(df, colunas_categoricas)
+    # Comparação feita após remover o preenchimento com espaços da exportação
+    df = df[~df['Nome Fornecedor'].isin(FORNECEDORES_EXCLUIDOS)]
+    return df
+
+
+def _is_text(serie):
+    return pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)
+
+
+def apply_compact_schema(df, colunas_categoricas=None):
+    # Sem `colunas_categoricas`, decide pela lista fixa e pela cardinalidade de cada coluna.
+    df = df.copy()
+    for col in df.columns:
+        if not _is_text(df[col]) or isinstance(df[col].dtype, pd.CategoricalDtype): continue
+        df[col] = df[col].str.strip()
+        if colunas_categoricas is not None: vira_categoria = col in colunas_categoricas
+        else: vira_categoria = col in COLUNAS_CATEGORICAS or df[col].nunique() < LIMITE_CARDINALIDADE_CATEGORIA * len(df)
+        if vira_categoria:
+            df[col] = df[col].astype('category')
+    for col, tipo in TIPOS_COMPACTOS.items():
+        if col in df.columns: df[col] = df[col].astype(tipo)
+    return df
+
+
+def memory_report(df, df_referencia=None):
+    # Uso de memória por coluna (MB); com `df_referencia`, compara com o esquema anterior.
+    relatorio = pd.DataFrame({
+        'Coluna': df.columns,
+        'Tipo': [str(tipo) for tipo in df.dtypes],
+        'Memória (MB)': df.memory_usage(index=False, deep=True).to_numpy() / 2**20,
+    })
+    if df_referencia is not None:
+        memoria_referencia = df_referencia.memory_usage(index=False, deep=True) / 2**20
+        relatorio['Memória Anterior (MB)'] = relatorio['Coluna'].map(memoria_referencia).to_numpy()
+        relatorio['Redução (x)'] = relatorio['Memória Anterior (MB)'] / relatorio['Memória (MB)']
+    relatorio = relatorio.sort_values('Memória (MB)', ascending=False, ignore_index=True)
+    total = relatorio.select_dtypes('number').sum()
+    total['Coluna'] = 'Total'; total['Tipo'] = ''
+    if df_referencia is not None: total['Redução (x)'] = total['Memória Anterior (MB)'] / total['Memória (MB)']
+    return pd.concat([relatorio, total.to_frame().T], ignore_index=True)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Relatório de memória do esquema compacto para um CSV de materiais.")
+    parser.add_argument('arquivo')
+    args = parser.parse_args()
+    compacto = preprocess_frame(read_material_csv(args.arquivo), avisar=print)
+    # Referência: mesmas linhas com o texto como object, sem o esquema compacto
+    referencia = compacto.astype({col: object for col in compacto.columns if isinstance(compacto[col].dtype, pd.CategoricalDtype)})
+    referencia = referencia.astype({'Ano': 'int64', 'Mês Num': 'int64', 'Quantidade': 'float64', 'Valor': 'float64'})
+    with pd.option_context('display.width', 200, 'display.max_columns', 10):
+        print(memory_report(compacto, referencia).to_string(index=False, float_format=lambda x: f"{x:,.2f}"))
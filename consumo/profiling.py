@@ -0,0 +1,105 @@
+# Modo de perfil opcional: tempo e memória por etapa de cada execução do
+# dashboard (carga, pré-processamento, filtros, seções, gráficos, exportações).
+# Desligado, `stage` é um contexto vazio. Ligado, cada execução gera uma linha
+# JSON no logger "consumo.perfil" (stderr, ou o arquivo de CONSUMO_PERFIL_ARQUIVO).
+#
+# A memória é o RSS do processo antes/depois da etapa e o pico do processo
+# (getrusage): barato o bastante para produção, sem o custo do tracemalloc.
+import contextlib
+import datetime
+import json
+import logging
+import os
+import resource
+import sys
+import time
+
+VARIAVEL_AMBIENTE = "CONSUMO_PERFIL"
+VARIAVEL_ARQUIVO_LOG = "CONSUMO_PERFIL_ARQUIVO"
+NOME_LOGGER = "consumo.perfil"
+
+
+def rss_bytes():
+    # RSS atual (Linux); em outros sistemas, o pico do processo
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == 'darwin' else pico * 1024
+
+
+def enabled_from_env():
+    return os.environ.get(VARIAVEL_AMBIENTE, '').strip().lower() in ('1', 'true', 'sim', 'on')
+
+
+def profile_logger():
+    logger = logging.getLogger(NOME_LOGGER)
+    if not logger.handlers:
+        caminho = os.environ.get(VARIAVEL_ARQUIVO_LOG)
+        handler = logging.FileHandler(caminho, encoding='utf-8') if caminho else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class Profiler:
+    def __init__(self, habilitado=False, **contexto):
+        self.habilitado = habilitado
+        self.contexto = contexto
+        self.etapas = []
+        self.inicio = time.perf_counter()
+        self.emitido = False
+
+    def stage(self, nome, categoria='secao'):
+        if not self.habilitado: return contextlib.nullcontext()
+        return self._medir(nome, categoria)
+
+    @contextlib.contextmanager
+    def _medir(self, nome, categoria):
+        rss_inicial = rss_bytes(); inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(nome, categoria, time.perf_counter() - inicio, rss_inicial)
+
+    def record(self, nome, categoria, segundos, rss_inicial=None):
+        if not self.habilitado: return
+        rss_final = rss_bytes()
+        etapa = {'etapa': nome, 'categoria': categoria, 'segundos': round(segundos, 4),
+                 'rss_mb': round(rss_final / 2**20, 1),
+                 'delta_rss_mb': round((rss_final - rss_inicial) / 2**20, 1) if rss_inicial is not None else None,
+                 'pico_processo_mb': round(peak_rss_bytes() / 2**20, 1)}
+        self.etapas.append(etapa)
+        if self.emitido:
+            # Etapa fora da execução (ex.: exportação gerada no clique): sai em linha própria
+            self._emit([etapa], tardia=True)
+
+    def wrap(self, nome, categoria, funcao):
+        # Para trabalho que roda depois da execução (callable de download, job em segundo plano)
+        if not self.habilitado: return funcao
+        def medida(*args, **kwargs):
+            with self.stage(nome, categoria):
+                return funcao(*args, **kwargs)
+        return medida
+
+    def summary(self):
+        return {'total_segundos': round(time.perf_counter() - self.inicio, 4), 'etapas': list(self.etapas)}
+
+    def finish(self):
+        # Uma linha estruturada por execução
+        if not self.habilitado or self.emitido: return
+        self._emit(self.etapas)
+        self.emitido = True
+
+    def _emit(self, etapas, tardia=False):
+        linha = dict(self.contexto, data=datetime.datetime.now().isoformat(timespec='milliseconds'), tardia=tardia,
+                     pico_processo_mb=round(peak_rss_bytes() / 2**20, 1), etapas=etapas)
+        if not tardia: linha['total_segundos'] = round(time.perf_counter() - self.inicio, 4)
+        profile_logger().info(json.dumps(linha, ensure_ascii=False, default=str))
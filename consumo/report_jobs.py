@@ -0,0 +1,61 @@
+# Geração de relatórios em segundo plano: um pool de threads por processo, com os
+# resultados prontos guardados em um cache LRU pela chave da visão (filtros).
+# Pedidos repetidos da mesma chave reaproveitam o job em andamento ou o resultado.
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ReportJob:
+    def __init__(self):
+        self.progresso = 0.0
+        self.avisos = []
+        self.future = None
+
+    def set_progress(self, fracao):
+        self.progresso = max(0.0, min(1.0, fracao))
+
+    def warn(self, mensagem):
+        self.avisos.append(mensagem)
+
+    def done(self):
+        return self.future.done()
+
+    def error(self):
+        return self.future.exception() if self.done() else None
+
+    def result(self):
+        return self.future.result()
+
+
+class ReportJobs:
+    def __init__(self, max_workers=2, max_resultados=32):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='relatorio')
+        self._jobs = OrderedDict()
+        self._max_resultados = max_resultados
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            job = self._jobs.get(chave)
+            if job is not None: self._jobs.move_to_end(chave)
+            return job
+
+    def submit(self, chave, funcao, *args, **kwargs):
+        # `funcao` recebe os callbacks `progresso` e `avisar` do job.
+        with self._lock:
+            job = self._jobs.get(chave)
+            if job is not None and not (job.done() and job.error() is not None):
+                self._jobs.move_to_end(chave)
+                return job
+            job = ReportJob()
+            job.future = self._executor.submit(funcao, *args, progresso=job.set_progress, avisar=job.warn, **kwargs)
+            self._jobs[chave] = job
+            self._evict()
+            return job
+
+    def _evict(self):
+        # Descarta os resultados prontos mais antigos; jobs em andamento nunca saem.
+        excedente = len(self._jobs) - self._max_resultados
+        for chave in [chave for chave, job in self._jobs.items() if job.done()][:max(excedente, 0)]:
+            del self._jobs[chave]
@@ -0,0 +1,167 @@
+# Relatório PDF (reportlab) com as tabelas e gráficos das seções de análise.
+# Sem dependência do Streamlit: roda no pool de threads do dashboard
+# (consumo/report_jobs.py) e nos processos da geração em lote (consumo/batch.py).
+import io
+
+import pandas as pd
+
+from consumo import charts
+from consumo.figure_cache import render_pngs
+
+
+def generate_pdf_report(
+    selected_desc_insumos_pdf, selected_cod_insumos_pdf, selected_years_pdf,
+    selected_movimento_consumo_pdf, selected_classes_pdf,
+    consumo_anual_pivot_df, consumo_mensal_pivot_df, fig_consumo_anual_line_obj, fig_consumo_mensal_bar_obj,
+    media_geral_mensal_df,
+    consumo_mensal_detalhado_pdf_data, fig_consumo_mensal_detalhado_obj, 
+    material_analise_unidade_pdf=None, material_analise_unidade_cod_insumo_pdf=None,
+    media_mensal_unidade_df=None, fig_unidade_media_obj=None, pivot_unidade_media_mensal_df=None,
+    progresso=None, avisar=None
+    ):
+    # Roda em threads de fundo e em processos do lote: sem Streamlit aqui dentro.
+    # O reportlab só é importado no primeiro relatório pedido, não no início do worker.
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, PageBreak, KeepTogether
+    total_passos = 12; passos_concluidos = [0]
+    def avancar():
+        passos_concluidos[0] += 1
+        if progresso: progresso(passos_concluidos[0] / total_passos)
+
+    # Os gráficos vêm do cache em disco; os que faltarem são renderizados em um único lote no kaleido
+    figuras_relatorio = [fig for fig in (fig_consumo_anual_line_obj, fig_consumo_mensal_bar_obj, fig_consumo_mensal_detalhado_obj, fig_unidade_media_obj) if fig is not None]
+    try:
+        imagens_png = dict(zip(map(id, figuras_relatorio), render_pngs(figuras_relatorio, 700, 350, 1.5))); erro_renderizacao = None
+    except Exception as e:
+        imagens_png = {}; erro_renderizacao = e
+    avancar()
+
+    buffer = io.BytesIO(); doc = SimpleDocTemplate(buffer, pagesize=landscape(letter), margins=[inch/2]*4); styles = getSampleStyleSheet(); story = []
+    story.append(Paragraph("Relatório de Análise de Consumo de Materiais", styles['h1'])); story.append(Spacer(1, 0.2*inch))
+    if selected_desc_insumos_pdf: story.append(Paragraph(f"<b>Descrições de Insumos:</b> {', '.join(selected_desc_insumos_pdf)}", styles['Normal']))
+    if selected_cod_insumos_pdf: story.append(Paragraph(f"<b>Códigos de Insumos:</b> {', '.join(selected_cod_insumos_pdf)}", styles['Normal']))
+    if selected_classes_pdf: story.append(Paragraph(f"<b>Classes Selecionadas:</b> {', '.join(selected_classes_pdf)}", styles['Normal']))
+    if not selected_desc_insumos_pdf and not selected_cod_insumos_pdf and not selected_classes_pdf: story.append(Paragraph("<b>Filtros de Insumo/Classe:</b> Nenhum aplicado", styles['Normal']))
+    story.append(Paragraph(f"<b>Anos:</b> {', '.join(map(str, selected_years_pdf)) if selected_years_pdf else 'Nenhum'}", styles['Normal']))
+    story.append(Paragraph(f"<b>Tipo de Movimento:</b> {selected_movimento_consumo_pdf}", styles['Normal'])); story.append(Spacer(1, 0.2*inch))
+
+    def df_to_table(df, title=""):
+        elements_for_keeptogether = []
+        if title: elements_for_keeptogether.extend([Paragraph(f"<b>{title}</b>", styles['h3']), Spacer(1, 0.1*inch)])
+        if df.empty: elements_for_keeptogether.extend([Paragraph("Nenhum dado para exibir.", styles['Italic']), Spacer(1, 0.1*inch)]); story.append(KeepTogether(elements_for_keeptogether)); avancar(); return
+        
+        max_cols = 15 
+        df_display = df.copy()
+        if isinstance(df_display.columns, pd.MultiIndex):
+            df_display.columns = ['_'.join(map(str, col)).strip('_') for col in df_display.columns.values]
+
+        for col_name in df_display.columns:
+            if pd.api.types.is_numeric_dtype(df_display[col_name]):
+                if col_name == 'CONSUMO MEDIO': # Nome da coluna como string
+                    df_display[col_name] = df_display[col_name].apply(lambda x: f"{x:,.1f}" if pd.notnull(x) else '0.0')
+                elif col_name not in ['CODIGO', 'DESCRICAO']: 
+                    df_display[col_name] = df_display[col_name].apply(lambda x: f"{x:,.0f}" if pd.notnull(x) else '0')
+
+        if len(df_display.columns) > max_cols: 
+            df_display_subset = df_display.iloc[:, :max_cols].copy()
+            elements_for_keeptogether.append(Paragraph(f"(Exibindo as primeiras {max_cols} colunas de {len(df_display.columns)}.)", styles['Italic']))
+            data = [df_display_subset.columns.to_list()] + df_display_subset.astype(str).values.tolist()
+        else:
+            data = [df_display.columns.to_list()] + df_display.astype(str).values.tolist()
+
+        table = Table(data, repeatRows=1); table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),('FONTSIZE', (0,0), (-1,-1), 7), ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ]))
+        elements_for_keeptogether.append(table)
+        elements_for_keeptogether.append(Spacer(1, 0.2*inch))
+        story.append(KeepTogether(elements_for_keeptogether))
+        avancar()
+
+    def fig_to_image_reportlab(fig, title=""):
+        elements_for_keeptogether = []
+        if title: elements_for_keeptogether.extend([Paragraph(f"<b>{title}</b>", styles['h3']), Spacer(1, 0.1*inch)])
+        if fig is None: elements_for_keeptogether.extend([Paragraph("Gráfico não disponível.", styles['Italic']), Spacer(1, 0.1*inch)]); story.append(KeepTogether(elements_for_keeptogether)); avancar(); return
+        try:
+            img_bytes = imagens_png.get(id(fig))
+            if img_bytes is None: raise erro_renderizacao or RuntimeError("imagem não renderizada")
+            img = Image(io.BytesIO(img_bytes), width=6.8*inch, height=3.4*inch) 
+            img.hAlign = 'CENTER'
+            elements_for_keeptogether.append(img)
+        except Exception as e: 
+            error_msg = f"Erro renderizar gráfico '{title}' PDF: {str(e)}"
+            if avisar: avisar(error_msg)
+            elements_for_keeptogether.append(Paragraph(error_msg, styles['Italic']))
+        
+        elements_for_keeptogether.append(Spacer(1, 0.1*inch)) 
+        story.append(KeepTogether(elements_for_keeptogether))
+        avancar()
+    
+    story.append(Paragraph("Análise de Consumo por Insumo", styles['h2']))
+    df_to_table(consumo_anual_pivot_df, "Consumo Total Anual por Insumo")
+    df_to_table(consumo_mensal_pivot_df, "Consumo Médio Mensal Agregado por Ano (calculado sobre meses com consumo)") 
+    fig_to_image_reportlab(fig_consumo_anual_line_obj, "Tendência de Consumo Total Anual")
+    fig_to_image_reportlab(fig_consumo_mensal_bar_obj, "Comparativo de Consumo Médio Mensal Agregado por Ano (calculado sobre meses com consumo)")
+
+    story.append(PageBreak()) 
+    story.append(Paragraph("Análise Detalhada de Consumo Mensal", styles['h2']))
+    pdf_table_title = "Consumo Mensal Efetivo por Insumo"
+    if consumo_mensal_detalhado_pdf_data is not None and not consumo_mensal_detalhado_pdf_data.empty:
+        if len(selected_years_pdf) == 1:
+            pdf_table_title = f"Consumo Mensal Efetivo por Insumo (Ano: {selected_years_pdf[0]})"
+        elif len(selected_years_pdf) > 1:
+            pdf_table_title = f"Consumo Mensal Efetivo por Insumo (Média entre Anos: {', '.join(map(str,selected_years_pdf))})"
+        df_to_table(consumo_mensal_detalhado_pdf_data, pdf_table_title)
+    else:
+        story.append(Paragraph("Dados de consumo mensal detalhado não disponíveis.", styles['Normal']))
+    fig_to_image_reportlab(fig_consumo_mensal_detalhado_obj, "Gráfico de Consumo Mensal Efetivo por Insumo")
+
+    story.append(PageBreak()) 
+    story.append(Paragraph("Média Geral Mensal de Consumo por Insumo (sobre os anos selecionados)", styles['h2']))
+    df_to_table(media_geral_mensal_df, "Média Geral Mensal por Insumo (baseada na média do consumo anual / nº meses com consumo)") 
+
+    if material_analise_unidade_pdf and media_mensal_unidade_df is not None and not media_mensal_unidade_df.empty:
+        story.append(PageBreak())
+        titulo_unidade = f"Análise de Consumo por Unidade para o Insumo: {material_analise_unidade_pdf}"
+        if material_analise_unidade_cod_insumo_pdf:
+            titulo_unidade += f" (Cód: {material_analise_unidade_cod_insumo_pdf})"
+        story.append(Paragraph(titulo_unidade, styles['h2']))
+        
+        df_to_table(media_mensal_unidade_df, f"Média Mensal de Consumo por Unidade (calculado sobre meses com consumo)")
+        if fig_unidade_media_obj: fig_to_image_reportlab(fig_unidade_media_obj, f"Top Unidades por Média Mensal de Consumo (calculado sobre meses com consumo)")
+        if pivot_unidade_media_mensal_df is not None and not pivot_unidade_media_mensal_df.empty: df_to_table(pivot_unidade_media_mensal_df, "Detalhe: Média Mensal por Unidade/Ano (calculado sobre meses com consumo)")
+    doc.build(story); buffer.seek(0)
+    if progresso: progresso(1.0)
+    return buffer.getvalue()
+
+
+def report_figures(relatorio):
+    # Gráficos de um relatório de consumo/engine.build_report, na ordem do PDF
+    figuras = dict(
+        anual=charts.annual_trend_figure(relatorio['consumo_anual']),
+        medio=charts.annual_average_figure(relatorio['consumo_anual']),
+        mensal=None, unidade=None,
+    )
+    if not relatorio['consumo_mensal_grafico'].empty:
+        figuras['mensal'] = charts.monthly_detail_figure(relatorio['consumo_mensal_grafico'], relatorio['titulo_mensal'])
+    if not relatorio['media_unidade'].empty:
+        figuras['unidade'] = charts.unit_average_figure(relatorio['media_unidade'], relatorio['insumo_unidade'])
+    return figuras
+
+
+def report_pdf_bytes(relatorio, progresso=None, avisar=None):
+    filtros = relatorio['filtros']; figuras = report_figures(relatorio)
+    return generate_pdf_report(
+        filtros['desc'], filtros['cod'], filtros['anos'], filtros['movimento'], filtros['classes'],
+        relatorio['consumo_anual_pivot'], relatorio['consumo_medio_pivot'], figuras['anual'], figuras['medio'],
+        relatorio['media_geral'], relatorio['consumo_mensal_pivot'], figuras['mensal'],
+        material_analise_unidade_pdf=relatorio['insumo_unidade'], material_analise_unidade_cod_insumo_pdf=relatorio['codigo_insumo_unidade'],
+        media_mensal_unidade_df=relatorio['media_unidade'], fig_unidade_media_obj=figuras['unidade'],
+        pivot_unidade_media_mensal_df=relatorio['pivot_unidade_ano'],
+        progresso=progresso, avisar=avisar,
+    )
@@ -0,0 +1,100 @@
+# Índice de busca de insumos por descrição e código, construído uma vez por
+# conjunto de dados, para o seletor "busque enquanto digita" da barra lateral.
+# O texto é normalizado (sem acentos, minúsculas). A busca junta, nesta ordem:
+# código exato, descrições que começam com o termo (um intervalo contíguo, pois
+# os itens ficam em ordem alfabética normalizada), e itens que contêm todas as
+# palavras do termo, candidatos por prefixo de palavra (palavras curtas) ou por
+# trigramas, verificados por substring. Cada etapa para ao atingir o limite, e o
+# custo acompanha o nº de candidatos, não o tamanho do catálogo.
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+
+def normalize_text(texto):
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    return ' '.join(''.join(c for c in decomposto if not unicodedata.combining(c)).casefold().split())
+
+
+def _trigrams(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class InsumoSearchIndex:
+    def __init__(self, df, coluna_descricao='Desc. Insumo', coluna_codigo='Cód. Insumo'):
+        pares = df[[coluna_codigo, coluna_descricao]].dropna().drop_duplicates()
+        itens = sorted((normalize_text(desc), normalize_text(cod), str(desc), str(cod)) for cod, desc in pares.itertuples(index=False))
+        self.descricoes = [item[2] for item in itens]
+        self.codigos = [item[3] for item in itens]
+        self._descricoes_norm = np.array([item[0] for item in itens], dtype=str)
+        self._textos = [f"{item[0]} {item[1]}" for item in itens]
+        self._por_codigo = defaultdict(list)
+        self._por_descricao_original = defaultdict(list); self._por_codigo_original = defaultdict(list)
+        for posicao, item in enumerate(itens):
+            self._por_codigo[item[1]].append(posicao)
+            self._por_descricao_original[item[2]].append(posicao); self._por_codigo_original[item[3]].append(posicao)
+
+        # Palavras (da descrição e o código) ordenadas, para busca por prefixo de palavra
+        palavras = sorted((palavra, posicao) for posicao, texto in enumerate(self._textos) for palavra in set(texto.split()))
+        self._palavras = np.array([p for p, _ in palavras], dtype=str)
+        self._posicoes_palavras = np.array([posicao for _, posicao in palavras], dtype=np.int64)
+        postagens = defaultdict(list)
+        for posicao, texto in enumerate(self._textos):
+            for trigrama in _trigrams(texto): postagens[trigrama].append(posicao)
+        self._trigramas = {trigrama: np.array(posicoes, dtype=np.int64) for trigrama, posicoes in postagens.items()}
+
+    def __len__(self):
+        return len(self.descricoes)
+
+    def _word_prefix(self, termo):
+        inicio = np.searchsorted(self._palavras, termo, side='left')
+        fim = np.searchsorted(self._palavras, termo + '\uffff', side='left')
+        return np.unique(self._posicoes_palavras[inicio:fim])
+
+    def _candidates(self, termo):
+        if len(termo) < 3: return self._word_prefix(termo)
+        candidatos = None
+        for trigrama in sorted(_trigrams(termo), key=lambda t: len(self._trigramas.get(t, ()))):
+            postagem = self._trigramas.get(trigrama)
+            if postagem is None: return np.empty(0, dtype=np.int64)
+            candidatos = postagem if candidatos is None else np.intersect1d(candidatos, postagem, assume_unique=True)
+            if not len(candidatos): break
+        return candidatos
+
+    def positions(self, descricoes=(), codigos=()):
+        # Posições dos itens com as descrições OU códigos dados (valores como no cubo)
+        posicoes = {p for d in descricoes for p in self._por_descricao_original.get(str(d), ())}
+        posicoes.update(p for c in codigos for p in self._por_codigo_original.get(str(c), ()))
+        return sorted(posicoes)
+
+    def search(self, consulta, limite=50, permitidos=None):
+        # Posições dos itens encontrados, no máximo `limite`, das melhores para as piores.
+        # `permitidos`: máscara booleana opcional sobre as posições (ex.: filtros em cascata).
+        termo = normalize_text(consulta)
+        if permitidos is None: permitidos = np.ones(len(self), dtype=bool)
+        if not termo: return np.flatnonzero(permitidos)[:limite].tolist()
+        encontrados = dict.fromkeys(p for p in self._por_codigo.get(termo, ()) if permitidos[p])
+        if len(encontrados) < limite:
+            inicio = np.searchsorted(self._descricoes_norm, termo, side='left')
+            fim = np.searchsorted(self._descricoes_norm, termo + '\uffff', side='left')
+            encontrados.update(dict.fromkeys((inicio + np.flatnonzero(permitidos[inicio:fim])[:limite]).tolist()))
+        if len(encontrados) < limite:
+            palavras = termo.split()
+            candidatos = None
+            for palavra in sorted(palavras, key=len, reverse=True):
+                posicoes = self._candidates(palavra)
+                candidatos = posicoes if candidatos is None else np.intersect1d(candidatos, posicoes, assume_unique=True)
+                if not len(candidatos): break
+            for posicao in candidatos.tolist():
+                if len(encontrados) >= limite: break
+                if not permitidos[posicao]: continue
+                texto = self._textos[posicao]
+                if all(palavra in texto for palavra in palavras): encontrados[posicao] = None
+        return list(encontrados)[:limite]
+
+    def descriptions(self, posicoes):
+        return [self.descricoes[p] for p in posicoes]
+
+    def codes(self, posicoes):
+        return [self.codigos[p] for p in posicoes]
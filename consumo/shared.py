@@ -0,0 +1,71 @@
+# Conjunto de dados compartilhado, somente leitura, entre todas as sessões do
+# processo (st.cache_resource): sem hash dos argumentos e sem cópia por execução.
+# Como todas as sessões leem o mesmo objeto, ele é congelado: os arrays ficam
+# somente leitura e qualquer escrita levanta TypeError antes de tocar no frame
+# (colunas, células por loc/iloc/at/iat, df.coluna = ..., eixos e métodos com
+# inplace=True). Frames derivados (filtros, groupby, iloc...) são DataFrames
+# comuns, livres para alterar.
+import functools
+import inspect
+
+import numpy as np
+import pandas as pd
+from pandas.core import indexing
+
+
+def _somente_leitura(*args, **kwargs):
+    raise TypeError("Conjunto de dados compartilhado é somente leitura; trabalhe sobre uma cópia (df.copy()).")
+
+
+# Indexadores de leitura: a escrita de células troca blocos no gerenciador do frame
+# (os flags de somente leitura dos arrays não impedem isso), então é barrada aqui
+class _LocSomenteLeitura(indexing._LocIndexer): __setitem__ = _somente_leitura
+class _ILocSomenteLeitura(indexing._iLocIndexer): __setitem__ = _somente_leitura
+class _AtSomenteLeitura(indexing._AtIndexer): __setitem__ = _somente_leitura
+class _IAtSomenteLeitura(indexing._iAtIndexer): __setitem__ = _somente_leitura
+
+
+def _no_inplace(metodo):
+    @functools.wraps(metodo)
+    def protegido(self, *args, **kwargs):
+        # Antes do pandas: rename(inplace=True), por exemplo, altera os eixos antes de _update_inplace
+        if kwargs.get('inplace'): _somente_leitura()
+        return metodo(self, *args, **kwargs)
+    return protegido
+
+
+class SharedFrame(pd.DataFrame):
+    # Sem _constructor próprio: operações sobre o frame devolvem pd.DataFrame
+    __setitem__ = __delitem__ = insert = pop = isetitem = update = _somente_leitura
+    _update_inplace = _inplace_method = _set_item = _set_item_mgr = _iset_item = _iset_item_mgr = _set_value = _somente_leitura
+
+    loc = property(lambda self: _LocSomenteLeitura('loc', self))
+    iloc = property(lambda self: _ILocSomenteLeitura('iloc', self))
+    at = property(lambda self: _AtSomenteLeitura('at', self))
+    iat = property(lambda self: _IAtSomenteLeitura('iat', self))
+
+    def __setattr__(self, nome, valor):
+        # df.coluna = ..., eixos e o gerenciador de blocos (depois de construído); o resto passa
+        if '_mgr' in self.__dict__ and (nome in ('columns', 'index', '_mgr') or nome in self.columns): _somente_leitura()
+        super().__setattr__(nome, valor)
+
+
+# Todo método público com `inplace` (fillna, rename, drop, sort_values, ...)
+for _nome, _metodo in inspect.getmembers(pd.DataFrame, inspect.isfunction):
+    if not _nome.startswith('_') and 'inplace' in inspect.signature(_metodo).parameters:
+        setattr(SharedFrame, _nome, _no_inplace(_metodo))
+
+
+def _read_only_arrays(df):
+    # Blocos numpy (2D) e os arrays numpy de dentro das colunas de extensão
+    # (códigos de Categorical, datetimes); strings Arrow já são imutáveis.
+    for array in df._mgr.arrays:
+        base = array if isinstance(array, np.ndarray) else getattr(array, '_ndarray', None)
+        if isinstance(base, np.ndarray): base.flags.writeable = False
+
+
+def freeze_frame(df):
+    # Sem cópia: o SharedFrame usa os mesmos blocos de `df`
+    compartilhado = SharedFrame(df, copy=False)
+    _read_only_arrays(compartilhado)
+    return compartilhado
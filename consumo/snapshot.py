@@ -0,0 +1,99 @@
+# Snapshot colunar (Arrow IPC/Feather v2) do DataFrame já pré-processado.
+# Evita refazer o parse do CSV e o pré-processamento a cada partida a frio:
+# o snapshot é lido via memory-map enquanto o arquivo de origem não mudar.
+import hashlib
+import json
+import os
+
+from pyarrow import feather
+
+# Incrementar sempre que as regras de pré-processamento mudarem, para que
+# snapshots gerados por versões anteriores sejam descartados.
+VERSAO_PIPELINE = 3
+DIRETORIO_SNAPSHOTS = ".snapshots"
+
+
+def content_hash(caminho, tamanho_bloco=8 * 1024 * 1024):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def source_fingerprint(caminho, com_hash=True):
+    info = os.stat(caminho)
+    fingerprint = {'size': info.st_size, 'mtime_ns': info.st_mtime_ns}
+    if com_hash:
+        fingerprint['sha256'] = content_hash(caminho)
+    return fingerprint
+
+
+def snapshot_paths(caminho_csv):
+    pasta = os.path.join(os.path.dirname(os.path.abspath(caminho_csv)), DIRETORIO_SNAPSHOTS)
+    base = os.path.join(pasta, os.path.basename(caminho_csv))
+    return base + '.arrow', base + '.json'
+
+
+def atomic_write(caminho, escrever):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def write_json(caminho, dados):
+    def escrever(destino):
+        with open(destino, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, indent=1)
+    atomic_write(caminho, escrever)
+
+
+def snapshot_is_fresh(caminho_csv):
+    caminho_arrow, caminho_meta = snapshot_paths(caminho_csv)
+    return os.path.exists(caminho_arrow) and meta_is_fresh(caminho_csv, caminho_meta)
+
+
+def meta_is_fresh(caminho_csv, caminho_meta):
+    # Tamanho e mtime iguais bastam; se só o mtime mudou (cópia, touch),
+    # confere o hash do conteúdo antes de declarar o derivado obsoleto.
+    try:
+        with open(caminho_meta, encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if meta.get('versao') != VERSAO_PIPELINE:
+        return False
+    atual = source_fingerprint(caminho_csv, com_hash=False)
+    if atual['size'] != meta.get('size'):
+        return False
+    if atual['mtime_ns'] != meta.get('mtime_ns'):
+        if content_hash(caminho_csv) != meta.get('sha256'):
+            return False
+        meta['mtime_ns'] = atual['mtime_ns']
+        write_json(caminho_meta, meta)
+    return True
+
+
+def load_snapshot(caminho_csv):
+    # Retorna None quando não há snapshot válido para o arquivo de origem.
+    if not snapshot_is_fresh(caminho_csv):
+        return None
+    caminho_arrow, _ = snapshot_paths(caminho_csv)
+    try:
+        return feather.read_feather(caminho_arrow, memory_map=True)
+    except (OSError, ValueError):
+        return None
+
+
+def save_snapshot(caminho_csv, df, fingerprint):
+    # O fingerprint deve ser calculado ANTES da leitura do CSV, para que uma
+    # troca do arquivo durante o parse gere um snapshot já obsoleto.
+    caminho_arrow, caminho_meta = snapshot_paths(caminho_csv)
+    # Sem compressão: é o que permite o memory-map na leitura.
+    atomic_write(caminho_arrow, lambda destino: feather.write_feather(df, destino, compression='uncompressed'))
+    write_json(caminho_meta, dict(fingerprint, versao=VERSAO_PIPELINE))
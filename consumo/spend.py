@@ -0,0 +1,52 @@
+# Gasto (Valor) por fornecedor, classe e unidade. Classe e unidade já são
+# dimensões do cubo mensal (consumo/cube.py), que soma Valor: o gasto sai das
+# mesmas células da análise. O fornecedor não é dimensão do cubo; para ele há
+# um segundo agregado, montado uma vez por versão dos dados, com Valor e
+# Quantidade por (insumo, fornecedor, classe, movimento, ano). Nenhuma seção
+# de gasto percorre as linhas brutas.
+import numpy as np
+import pandas as pd
+
+COLUNA_FORNECEDOR = 'Nome Fornecedor'
+DIMENSOES_FORNECEDOR = ['Cód. Insumo', 'Desc. Insumo', COLUNA_FORNECEDOR, 'Descricao Classe', 'Descricao Movimento', 'Ano']
+
+
+def build_supplier_cube(df):
+    if df.empty or COLUNA_FORNECEDOR not in df.columns: return pd.DataFrame()
+    # Acumula em float64, como o cubo mensal
+    base = df[DIMENSOES_FORNECEDOR].assign(Quantidade=df['Quantidade'].astype('float64'), Valor=df['Valor'].astype('float64'))
+    cubo = base.groupby(DIMENSOES_FORNECEDOR, observed=True, dropna=False, sort=False).agg(
+        Quantidade=('Quantidade', 'sum'), Valor=('Valor', 'sum')
+    ).reset_index()
+    return cubo.sort_values(DIMENSOES_FORNECEDOR, ignore_index=True)
+
+
+def _contains(serie, valores):
+    # isin sobre os códigos do Categorical, sem comparar texto célula a célula
+    if not isinstance(serie.dtype, pd.CategoricalDtype): return serie.isin(valores).to_numpy()
+    return np.isin(serie.cat.codes.to_numpy(), np.flatnonzero(serie.cat.categories.isin(valores)))
+
+
+def select_supplier_cells(cubo_fornecedor, codigos=None, classes=(), anos=(), movimento=None):
+    # Mesma seleção da análise: insumos (códigos já resolvidos pelos filtros de
+    # descrição/código/classe; None = todos) E classe E ano E movimento
+    if cubo_fornecedor is None or cubo_fornecedor.empty: return pd.DataFrame(columns=DIMENSOES_FORNECEDOR + ['Quantidade', 'Valor'])
+    mascara = np.ones(len(cubo_fornecedor), dtype=bool)
+    if codigos is not None: mascara &= _contains(cubo_fornecedor['Cód. Insumo'], list(codigos))
+    if len(classes): mascara &= _contains(cubo_fornecedor['Descricao Classe'], list(classes))
+    if len(anos): mascara &= cubo_fornecedor['Ano'].isin(list(anos)).to_numpy()
+    if movimento is not None: mascara &= _contains(cubo_fornecedor['Descricao Movimento'], [movimento])
+    return cubo_fornecedor[mascara]
+
+
+def spend_by(celulas, dimensao):
+    # Valor, quantidade, nº de insumos e participação no valor por `dimensao`, do maior para o menor
+    colunas = [dimensao, 'Valor Total', 'Quantidade', 'Nº Insumos', '% do Valor']
+    if celulas.empty or dimensao not in celulas.columns: return pd.DataFrame(columns=colunas)
+    gasto = celulas.groupby(dimensao, observed=True).agg(
+        **{'Valor Total': ('Valor', 'sum'), 'Quantidade': ('Quantidade', 'sum'), 'Nº Insumos': ('Cód. Insumo', 'nunique')}
+    )
+    gasto = gasto[(gasto['Valor Total'] != 0) | (gasto['Quantidade'] != 0)]
+    total = gasto['Valor Total'].sum()
+    gasto['% do Valor'] = gasto['Valor Total'] / total * 100 if total else 0.0
+    return gasto.sort_values('Valor Total', ascending=False).reset_index()[colunas]
@@ -4,204 +4,250 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import io # Para manipulação de bytes em memória (usado para PDF e Excel)
-from reportlab.lib.pagesizes import letter, landscape
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, PageBreak, KeepTogether
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-import plotly.io as pio
+import datetime
+import os
+import uuid
+from consumo import charts, dataset, engine, ingest, profiling, snapshot
+from consumo.cooccurrence import CooccurrenceIndex
+from consumo.cube import build_consumption_cube
+from consumo import export, spend
+from consumo.expiry_index import LotExpiryIndex, build_lot_table
+from consumo.filter_index import FilterIndex
+from consumo.fingerprint import filter_fingerprint
+from consumo.memo import SectionMemo
+from consumo.report_jobs import ReportJobs
+from consumo.report_pdf import generate_pdf_report
+from consumo.search_index import InsumoSearchIndex
+from consumo.shared import freeze_frame
+from consumo.pipeline import load_material_csv_chunked, preprocess_frame, read_material_csv
 # import numpy as np # Não estritamente necessário com as modificações atuais
 
-MESES_PT_ORDENADOS = [
-    "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
-    "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"
-]
-MESES_PT_MAP = {i+1: mes for i, mes in enumerate(MESES_PT_ORDENADOS)}
-
-# Função para converter DataFrame para bytes de Excel
-def df_to_excel_bytes(df_to_export):
-    output = io.BytesIO()
-    # Usar um with statement garante que o writer seja fechado corretamente
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        # Escreve o DataFrame na Planilha1, sem o índice do pandas
-        df_to_export.to_excel(writer, index=False, sheet_name='Dados')
-    processed_data = output.getvalue()
-    return processed_data
+ARQUIVO_CSV = "Material-CSVANUAL.csv"
+# Modo de ingestão incremental: diretório com as exportações mensais Material-RELA<MES>.csv.
+# Sem a variável, é usado o diretório atual quando o arquivo anual não existe.
+DIRETORIO_MENSAL = os.environ.get("CONSUMO_DIRETORIO_MENSAL")
+# Arquivos maiores que um bloco são lidos em blocos, com pico de memória limitado pelo bloco.
+TAMANHO_BLOCO_BYTES = int(os.environ.get("CONSUMO_TAMANHO_BLOCO_MB", "64")) * 1024 * 1024
+# Backend de consulta: "pandas" (padrão, linhas em memória) ou "duckdb" (Parquet local + DuckDB,
+# para históricos maiores que a memória; ver consumo/duckdb_backend.py)
+BACKEND_CONSULTA = os.environ.get("CONSUMO_BACKEND", "pandas").strip().lower()
+# Memória do DuckDB (ex.: "2GB"); acima dela as agregações usam disco. Sem a variável, o padrão do DuckDB.
+LIMITE_MEMORIA_DUCKDB = os.environ.get("CONSUMO_DUCKDB_MEMORIA")
+# Intervalo (s) entre verificações dos arquivos de origem para a recarga a quente; 0 desliga
+INTERVALO_RECARGA_SEGUNDOS = int(os.environ.get("CONSUMO_INTERVALO_RECARGA", str(dataset.INTERVALO_VERIFICACAO_PADRAO)))
+# Tabela insumo x unidade: maiores unidades/insumos exibidos (o resto vai para "Outros") e linhas por página
+TOP_UNIDADES_PADRAO = 20
+TOP_INSUMOS_PADRAO = 200
+LINHAS_POR_PAGINA_UNIDADES = 50
+# Sugestões por busca no seletor de insumos (o catálogo inteiro nunca vai para o navegador)
+LIMITE_SUGESTOES_INSUMOS = 50
+# Lotes a vencer: janela padrão (dias a partir de hoje) da seção de validade
+DIAS_VENCIMENTO_PADRAO = 90
+# Formatos das tabelas de gasto (consumo/spend.py)
+FORMATOS_GASTO = {'Valor Total': "{:,.2f}", 'Quantidade': "{:,.0f}", '% do Valor': "{:,.1f}"}
+FORMATOS_LOTES = {'Entradas': "{:,.0f}", 'Saídas': "{:,.0f}", 'Saldo no Período': "{:,.0f}", 'DT Validade': "{:%d/%m/%Y}", 'Último Movimento': "{:%d/%m/%Y}"}
+
+# Pasta de trabalho completa: (extensão, MIME, função de export) por formato
+FORMATOS_EXPORTACAO_COMPLETA = {
+    "Excel (uma aba por tabela)": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", lambda abas: export.frames_to_excel_bytes(abas, export.REPORT_FORMATS)),
+    "CSV (.zip, um arquivo por tabela)": ("zip", "application/zip", export.frames_to_csv_zip_bytes),
+    "Parquet (.zip, um arquivo por tabela)": ("zip", "application/zip", export.frames_to_parquet_zip_bytes),
+}
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def cached_excel_bytes(chave, _df_to_export, _formatos=None):
+    # Só a chave (filtros + arquivo) entra no hash do cache; o DataFrame não é hasheado
+    with perfil.stage(f"excel: {chave[:8]}", 'exportacao'):
+        return export.df_to_excel_bytes(_df_to_export, export.excel_formats(_formatos))
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_complete_export_bytes(chave, formato, _abas):
+    # Tabelas que são funções (montadas só no clique) são resolvidas aqui; abas vazias ficam de fora
+    with perfil.stage(f"exportação completa: {chave[:8]}", 'exportacao'):
+        abas = {nome: tabela() if callable(tabela) else tabela for nome, tabela in _abas.items()}
+        return FORMATOS_EXPORTACAO_COMPLETA[formato][2]({nome: df for nome, df in abas.items() if not df.empty})
+
+def excel_download_button(label, df_to_export, file_name, estado, formatos=None):
+    # O workbook só é gerado quando o usuário clica (callable do download_button),
+    # e fica em cache para a mesma visão: downloads repetidos não custam nada.
+    # `df_to_export` pode ser uma função, para tabelas que só são montadas no clique.
+    # `formatos`: os mesmos da exibição ({coluna: "{:,.0f}"}), gravados como formato de célula.
+    chave = filter_fingerprint(arquivo=file_name, **estado)
+    st.download_button(
+        label=label,
+        data=lambda: cached_excel_bytes(chave, df_to_export() if callable(df_to_export) else df_to_export, formatos),
+        file_name=file_name,
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
 
 st.set_page_config(layout="wide", page_title="Dashboard de Consumo com PDF")
 
-@st.cache_data
-def load_data():
+# Modo de perfil (CONSUMO_PERFIL=1 ou ?perfil=1 na URL): tempo e memória de cada etapa
+# desta execução no painel lateral e uma linha JSON por execução no log (ver consumo/profiling.py)
+perfil = profiling.Profiler(
+    profiling.enabled_from_env() or st.query_params.get('perfil', '').lower() in ('1', 'true', 'sim'),
+    sessao=st.session_state.setdefault('id_sessao_perfil', uuid.uuid4().hex[:12])
+)
+
+# Os carregadores abaixo rodam dentro de build_dataset: uma vez por versão dos arquivos
+# de origem, na primeira execução do processo e depois na thread de recarga. Lá st.* não
+# funciona: erros e avisos vão para `carga` (dataset.BuildLog) e ficam na versão montada;
+# o script os mostra ao usar a versão.
+def load_data(carga):
     try:
-        df = pd.read_csv("Material-CSVANUAL.csv", sep=';', encoding='utf-8')
-    except UnicodeDecodeError:
-        df = pd.read_csv("Material-CSVANUAL.csv", sep=';', encoding='latin1')
-    except FileNotFoundError: st.error("Arquivo 'Material-CSVANUAL.csv' não encontrado."); return pd.DataFrame()
-    except pd.errors.EmptyDataError: st.error("Arquivo 'Material-CSVANUAL.csv' está vazio."); return pd.DataFrame()
-    except Exception as e: st.error(f"Erro ao ler CSV: {e}"); return pd.DataFrame()
+        with carga.stage('leitura do CSV'): df = read_material_csv(ARQUIVO_CSV)
+    except FileNotFoundError: carga.error(f"Arquivo '{ARQUIVO_CSV}' não encontrado."); return pd.DataFrame()
+    except pd.errors.EmptyDataError: carga.error(f"Arquivo '{ARQUIVO_CSV}' está vazio."); return pd.DataFrame()
+    except Exception as e: carga.error(f"Erro ao ler CSV: {e}"); return pd.DataFrame()
     return df
 
-@st.cache_data
-def preprocess_data(df_original):
-    if df_original.empty: return pd.DataFrame()
-    df = df_original.copy()
-    column_mapping = {
-        'Insumo': 'Cód. Insumo', 'Descricao': 'Desc. Insumo', 'Dt Movimento': 'Dt Movimento',
-        'Quantidade': 'Quantidade', 'Descricao Movimento': 'Descricao Movimento',
-        'Descricao Requisitante': 'Descricao Requisitante', 'Valor ': 'Valor',
-        'Descricao da Classe': 'Descricao Classe',
-        'Fornecedor': 'Nome Fornecedor'
-    }
-    actual_renames = {}
-    for original_name_csv, new_name_internal in column_mapping.items():
-        if original_name_csv in df.columns: actual_renames[original_name_csv] = new_name_internal
-        else: st.sidebar.warning(f"Coluna original '{original_name_csv}' do CSV não encontrada para mapeamento. Será ignorada.")
-    df.rename(columns=actual_renames, inplace=True)
-
-    if 'Quantidade' not in df.columns: st.error("Coluna interna 'Quantidade' não encontrada."); return pd.DataFrame()
-    df['Quantidade'] = pd.to_numeric(df['Quantidade'].astype(str).str.replace('.', '', regex=False).str.replace(',', '.', regex=False), errors='coerce').abs()
-    if 'Dt Movimento' not in df.columns: st.error("Coluna interna 'Dt Movimento' não encontrada."); return pd.DataFrame()
-    df['Dt Movimento'] = pd.to_datetime(df['Dt Movimento'], dayfirst=True, errors='coerce')
-    df['Ano'] = df['Dt Movimento'].dt.year
-    df['Mês Num'] = df['Dt Movimento'].dt.month
-    df['Mês Nome'] = df['Mês Num'].map(MESES_PT_MAP)
-    
-    df = df.dropna(subset=['Dt Movimento', 'Ano', 'Mês Num', 'Mês Nome']); 
-    df['Ano'] = df['Ano'].astype(int)
-    df['Mês Num'] = df['Mês Num'].astype(int)
-
-    essential_cols_internal = ['Desc. Insumo', 'Cód. Insumo', 'Descricao Movimento', 'Quantidade', 'Ano', 'Dt Movimento', 'Mês Num', 'Mês Nome']
-    optional_cols_internal = ['Descricao Requisitante', 'Valor', 'Descricao Classe', 'Nome Fornecedor'] 
-    
-    for col in essential_cols_internal:
-        if col not in df.columns: st.error(f"Coluna interna essencial '{col}' não encontrada."); return pd.DataFrame()
-    for col in optional_cols_internal:
-        if col not in df.columns: 
-            if col == 'Valor': df[col] = 0.0
-            elif col == 'Nome Fornecedor': df[col] = 'N/A' 
-            else: df[col] = 'N/A' 
-    
-    df = df.dropna(subset=['Desc. Insumo', 'Cód. Insumo', 'Descricao Movimento'])
-    df['Desc. Insumo'] = df['Desc. Insumo'].astype(str); df['Cód. Insumo'] = df['Cód. Insumo'].astype(str)
-    if 'Descricao Requisitante' in df.columns: df['Descricao Requisitante'] = df['Descricao Requisitante'].astype(str).fillna('N/A')
-    if 'Descricao Classe' in df.columns: df['Descricao Classe'] = df['Descricao Classe'].astype(str).fillna('N/A')
-    if 'Valor' in df.columns: df['Valor'] = pd.to_numeric(df['Valor'].astype(str).str.replace('.', '', regex=False).str.replace(',', '.', regex=False), errors='coerce').abs().fillna(0)
-    if 'Nome Fornecedor' in df.columns: df['Nome Fornecedor'] = df['Nome Fornecedor'].astype(str).fillna('N/A')
-
-    if 'Nome Fornecedor' in df.columns:
-        valores_fornecedor_a_remover = ["AJUSTE DE INVENTARIO", "AJUSTE INVENTARIO", "AJUSTE MATERIAL"]
-        df = df[~df['Nome Fornecedor'].isin(valores_fornecedor_a_remover)]
+def preprocess_data(carga, df_original):
+    try:
+        with carga.stage('pré-processamento'): return preprocess_frame(df_original, avisar=carga.warning)
+    except ValueError as e: carga.error(str(e)); return pd.DataFrame()
+
+def load_large_data(carga, tamanho_bloco):
+    try:
+        with carga.stage('leitura em blocos + pré-processamento'):
+            return load_material_csv_chunked(ARQUIVO_CSV, tamanho_bloco, avisar=carga.warning)
+    except ValueError as e: carga.error(str(e)); return pd.DataFrame()
+    except Exception as e: carga.error(f"Erro ao ler CSV: {e}"); return pd.DataFrame()
+
+def load_monthly_data(carga, diretorio):
+    try:
+        with carga.stage('ingestão mensal'):
+            resumo = ingest.ingest_directory(diretorio, avisar=carga.warning)
+            df = ingest.load_store(diretorio)
+    except ValueError as e: carga.error(str(e)); return pd.DataFrame()
+    except OSError as e: carga.error(f"Erro na ingestão dos arquivos mensais: {e}"); return pd.DataFrame()
+    if resumo['arquivos_lidos']:
+        carga.info(f"Ingeridos {len(resumo['arquivos_lidos'])} arquivo(s) mensal(is): {resumo['linhas_adicionadas']} linhas novas, {resumo['linhas_duplicadas']} duplicadas ignoradas.")
     return df
 
-def generate_pdf_report(
-    selected_desc_insumos_pdf, selected_cod_insumos_pdf, selected_years_pdf,
-    selected_movimento_consumo_pdf, selected_classes_pdf,
-    consumo_anual_pivot_df, consumo_mensal_pivot_df, fig_consumo_anual_line_obj, fig_consumo_mensal_bar_obj,
-    media_geral_mensal_df,
-    consumo_mensal_detalhado_pdf_data, fig_consumo_mensal_detalhado_obj, 
-    material_analise_unidade_pdf=None, material_analise_unidade_cod_insumo_pdf=None,
-    media_mensal_unidade_df=None, fig_unidade_media_obj=None, pivot_unidade_media_mensal_df=None
-    ):
-    buffer = io.BytesIO(); doc = SimpleDocTemplate(buffer, pagesize=landscape(letter), margins=[inch/2]*4); styles = getSampleStyleSheet(); story = []
-    story.append(Paragraph("Relatório de Análise de Consumo de Materiais", styles['h1'])); story.append(Spacer(1, 0.2*inch))
-    if selected_desc_insumos_pdf: story.append(Paragraph(f"<b>Descrições de Insumos:</b> {', '.join(selected_desc_insumos_pdf)}", styles['Normal']))
-    if selected_cod_insumos_pdf: story.append(Paragraph(f"<b>Códigos de Insumos:</b> {', '.join(selected_cod_insumos_pdf)}", styles['Normal']))
-    if selected_classes_pdf: story.append(Paragraph(f"<b>Classes Selecionadas:</b> {', '.join(selected_classes_pdf)}", styles['Normal']))
-    if not selected_desc_insumos_pdf and not selected_cod_insumos_pdf and not selected_classes_pdf: story.append(Paragraph("<b>Filtros de Insumo/Classe:</b> Nenhum aplicado", styles['Normal']))
-    story.append(Paragraph(f"<b>Anos:</b> {', '.join(map(str, selected_years_pdf)) if selected_years_pdf else 'Nenhum'}", styles['Normal']))
-    story.append(Paragraph(f"<b>Tipo de Movimento:</b> {selected_movimento_consumo_pdf}", styles['Normal'])); story.append(Spacer(1, 0.2*inch))
-
-    def df_to_table(df, title=""):
-        elements_for_keeptogether = []
-        if title: elements_for_keeptogether.extend([Paragraph(f"<b>{title}</b>", styles['h3']), Spacer(1, 0.1*inch)])
-        if df.empty: elements_for_keeptogether.extend([Paragraph("Nenhum dado para exibir.", styles['Italic']), Spacer(1, 0.1*inch)]); story.append(KeepTogether(elements_for_keeptogether)); return
-        
-        max_cols = 15 
-        df_display = df.copy()
-        if isinstance(df_display.columns, pd.MultiIndex):
-            df_display.columns = ['_'.join(map(str, col)).strip('_') for col in df_display.columns.values]
-
-        for col_name in df_display.columns:
-            if pd.api.types.is_numeric_dtype(df_display[col_name]):
-                if col_name == 'CONSUMO MEDIO': # Nome da coluna como string
-                    df_display[col_name] = df_display[col_name].apply(lambda x: f"{x:,.1f}" if pd.notnull(x) else '0.0')
-                elif col_name not in ['CODIGO', 'DESCRICAO']: 
-                    df_display[col_name] = df_display[col_name].apply(lambda x: f"{x:,.0f}" if pd.notnull(x) else '0')
-
-        if len(df_display.columns) > max_cols: 
-            df_display_subset = df_display.iloc[:, :max_cols].copy()
-            elements_for_keeptogether.append(Paragraph(f"(Exibindo as primeiras {max_cols} colunas de {len(df_display.columns)}.)", styles['Italic']))
-            data = [df_display_subset.columns.to_list()] + df_display_subset.astype(str).values.tolist()
-        else:
-            data = [df_display.columns.to_list()] + df_display.astype(str).values.tolist()
-
-        table = Table(data, repeatRows=1); table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),('FONTSIZE', (0,0), (-1,-1), 7), ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ]))
-        elements_for_keeptogether.append(table)
-        elements_for_keeptogether.append(Spacer(1, 0.2*inch))
-        story.append(KeepTogether(elements_for_keeptogether))
-
-    def fig_to_image_reportlab(fig, title=""):
-        elements_for_keeptogether = []
-        if title: elements_for_keeptogether.extend([Paragraph(f"<b>{title}</b>", styles['h3']), Spacer(1, 0.1*inch)])
-        if fig is None: elements_for_keeptogether.extend([Paragraph("Gráfico não disponível.", styles['Italic']), Spacer(1, 0.1*inch)]); story.append(KeepTogether(elements_for_keeptogether)); return
-        try:
-            img_bytes = pio.to_image(fig, format="png", width=700, height=350, scale=1.5) 
-            img = Image(io.BytesIO(img_bytes), width=6.8*inch, height=3.4*inch) 
-            img.hAlign = 'CENTER'
-            elements_for_keeptogether.append(img)
-        except Exception as e: 
-            error_msg = f"Erro renderizar gráfico '{title}' PDF: {str(e)}"
-            st.sidebar.error(error_msg)
-            elements_for_keeptogether.append(Paragraph(error_msg, styles['Italic']))
-        
-        elements_for_keeptogether.append(Spacer(1, 0.1*inch)) 
-        story.append(KeepTogether(elements_for_keeptogether))
-    
-    story.append(Paragraph("Análise de Consumo por Insumo", styles['h2']))
-    df_to_table(consumo_anual_pivot_df, "Consumo Total Anual por Insumo")
-    df_to_table(consumo_mensal_pivot_df, "Consumo Médio Mensal Agregado por Ano (calculado sobre meses com consumo)") 
-    fig_to_image_reportlab(fig_consumo_anual_line_obj, "Tendência de Consumo Total Anual")
-    fig_to_image_reportlab(fig_consumo_mensal_bar_obj, "Comparativo de Consumo Médio Mensal Agregado por Ano (calculado sobre meses com consumo)")
-
-    story.append(PageBreak()) 
-    story.append(Paragraph("Análise Detalhada de Consumo Mensal", styles['h2']))
-    pdf_table_title = "Consumo Mensal Efetivo por Insumo"
-    if consumo_mensal_detalhado_pdf_data is not None and not consumo_mensal_detalhado_pdf_data.empty:
-        if len(selected_years_pdf) == 1:
-            pdf_table_title = f"Consumo Mensal Efetivo por Insumo (Ano: {selected_years_pdf[0]})"
-        elif len(selected_years_pdf) > 1:
-            pdf_table_title = f"Consumo Mensal Efetivo por Insumo (Média entre Anos: {', '.join(map(str,selected_years_pdf))})"
-        df_to_table(consumo_mensal_detalhado_pdf_data, pdf_table_title)
+def load_material_frame(carga):
+    diretorio_mensal = _monthly_directory()
+    if diretorio_mensal: return load_monthly_data(carga, diretorio_mensal)
+
+    # Usa o snapshot colunar quando o CSV não mudou; senão refaz o parse e o regrava
+    fingerprint = None
+    if os.path.exists(ARQUIVO_CSV):
+        with carga.stage('leitura do snapshot'): df_snapshot = snapshot.load_snapshot(ARQUIVO_CSV)
+        if df_snapshot is not None: return df_snapshot
+        fingerprint = snapshot.source_fingerprint(ARQUIVO_CSV)
+    if fingerprint is not None and fingerprint['size'] > TAMANHO_BLOCO_BYTES: df = load_large_data(carga, TAMANHO_BLOCO_BYTES)
+    else: df = preprocess_data(carga, load_data(carga))
+    if fingerprint is not None and not df.empty:
+        try: snapshot.save_snapshot(ARQUIVO_CSV, df, fingerprint)
+        except OSError as e: carga.warning(f"Não foi possível gravar o snapshot dos dados: {e}")
+    return df
+
+def _monthly_directory():
+    if DIRETORIO_MENSAL: return DIRETORIO_MENSAL
+    if not os.path.exists(ARQUIVO_CSV) and ingest.list_monthly_files('.'): return '.'
+    return None
+
+def load_query_backend(carga):
+    # None no modo pandas. No modo duckdb as linhas ficam em Parquet e nunca entram na memória do processo.
+    if BACKEND_CONSULTA != 'duckdb': return None
+    from consumo import duckdb_backend  # dependência opcional, só neste modo
+    diretorio_mensal = _monthly_directory()
+    try:
+        with carga.stage('Parquet para o DuckDB'):
+            if diretorio_mensal:
+                ingest.ingest_directory(diretorio_mensal, avisar=carga.warning)
+                arquivos = duckdb_backend.parquet_from_store(diretorio_mensal)
+            else: arquivos = duckdb_backend.parquet_from_csv(ARQUIVO_CSV, TAMANHO_BLOCO_BYTES, avisar=carga.warning)
+    except FileNotFoundError: carga.error(f"Arquivo '{ARQUIVO_CSV}' não encontrado."); return None
+    except (ValueError, OSError) as e: carga.error(f"Erro ao preparar os dados para o DuckDB: {e}"); return None
+    return duckdb_backend.DuckDBBackend(arquivos, limite_memoria=LIMITE_MEMORIA_DUCKDB) if arquivos else None
+
+def data_signature():
+    return dataset.source_signature(ARQUIVO_CSV, _monthly_directory(), ingest.PADRAO_MENSAL)
+
+def build_dataset():
+    # Uma versão completa dos dados: cubo mensal e índices (e o backend DuckDB, se ativo),
+    # todos compartilhados (somente leitura) pelas sessões que usam esta versão.
+    # As seções leem do cubo pré-agregado (ver consumo/cube.py), não das linhas brutas.
+    # Gasto por fornecedor e lotes por validade também saem de agregados montados aqui.
+    # Os tempos vão para um perfil próprio da montagem (uma linha no log com CONSUMO_PERFIL=1):
+    # o `perfil` do módulo é o de uma sessão, e aqui pode ser o da primeira execução do processo
+    carga = dataset.BuildLog(profiling.Profiler(profiling.enabled_from_env(), origem='carga de dados'))
+    assinatura = data_signature()
+    backend = load_query_backend(carga)
+    cubo_fornecedor = lotes = None
+    if backend is not None:
+        with carga.stage('cubo mensal (DuckDB)'): cubo = freeze_frame(backend.cube())
+        with carga.stage('gasto por fornecedor (DuckDB)'): cubo_fornecedor = backend.supplier_cube()
+        with carga.stage('lotes por validade (DuckDB)'): lotes = backend.lot_table()
+    elif BACKEND_CONSULTA == 'duckdb': cubo = pd.DataFrame()
     else:
-        story.append(Paragraph("Dados de consumo mensal detalhado não disponíveis.", styles['Normal']))
-    fig_to_image_reportlab(fig_consumo_mensal_detalhado_obj, "Gráfico de Consumo Mensal Efetivo por Insumo")
-
-    story.append(PageBreak()) 
-    story.append(Paragraph("Média Geral Mensal de Consumo por Insumo (sobre os anos selecionados)", styles['h2']))
-    df_to_table(media_geral_mensal_df, "Média Geral Mensal por Insumo (baseada na média do consumo anual / nº meses com consumo)") 
-
-    if material_analise_unidade_pdf and media_mensal_unidade_df is not None and not media_mensal_unidade_df.empty:
-        story.append(PageBreak())
-        titulo_unidade = f"Análise de Consumo por Unidade para o Insumo: {material_analise_unidade_pdf}"
-        if material_analise_unidade_cod_insumo_pdf:
-            titulo_unidade += f" (Cód: {material_analise_unidade_cod_insumo_pdf})"
-        story.append(Paragraph(titulo_unidade, styles['h2']))
-        
-        df_to_table(media_mensal_unidade_df, f"Média Mensal de Consumo por Unidade (calculado sobre meses com consumo)")
-        if fig_unidade_media_obj: fig_to_image_reportlab(fig_unidade_media_obj, f"Top Unidades por Média Mensal de Consumo (calculado sobre meses com consumo)")
-        if pivot_unidade_media_mensal_df is not None and not pivot_unidade_media_mensal_df.empty: df_to_table(pivot_unidade_media_mensal_df, "Detalhe: Média Mensal por Unidade/Ano (calculado sobre meses com consumo)")
-    doc.build(story); buffer.seek(0); return buffer.getvalue()
+        df = load_material_frame(carga)
+        with carga.stage('cubo mensal'): cubo = freeze_frame(build_consumption_cube(df))
+        with carga.stage('gasto por fornecedor'): cubo_fornecedor = spend.build_supplier_cube(df)
+        with carga.stage('lotes por validade'): lotes = build_lot_table(df)
+        del df
+    if cubo.empty:
+        carga.perfil.finish()
+        return dataset.DatasetVersion(assinatura, cubo, avisos=carga.mensagens)
+    # Índice de filtros: as posições se referem às linhas do cubo
+    with carga.stage('índice de filtros'): indice_filtros = FilterIndex(cubo)
+    with carga.stage('índice de busca de insumos'): indice_busca = InsumoSearchIndex(cubo)
+    # Combinações insumo x classe x ano x movimento presentes, para os filtros em cascata
+    with carga.stage('índice de co-ocorrência'): indice_coocorrencia = CooccurrenceIndex(cubo, indice_busca)
+    carga.perfil.finish()
+    return dataset.DatasetVersion(assinatura, cubo, indice_filtros, indice_busca, indice_coocorrencia, backend,
+                                  cubo_fornecedor=freeze_frame(cubo_fornecedor), indice_validade=LotExpiryIndex(freeze_frame(lotes)),
+                                  avisos=carga.mensagens)
+
+@st.cache_resource
+def get_dataset_reloader():
+    # Um por processo: monta a primeira versão e observa os arquivos de origem. Uma versão
+    # nova é montada em segundo plano e trocada atomicamente (ver consumo/dataset.py); o
+    # memo das seções é esvaziado na troca (as chaves já incluem a versão).
+    recarga = dataset.DatasetReloader(build_dataset, data_signature, intervalo=INTERVALO_RECARGA_SEGUNDOS)
+    recarga.on_swap(lambda nova: get_section_memo().clear())
+    recarga.current()
+    return recarga.start()
+
+@st.cache_resource
+def get_section_memo():
+    # Resultados das seções por entradas usadas, compartilhados entre sessões (ver consumo/memo.py)
+    return SectionMemo(max_por_secao=16)
+
+@st.cache_resource
+def get_report_jobs():
+    # Um pool por processo, compartilhado entre sessões: o PDF pronto de uma visão serve a todos
+    return ReportJobs(max_workers=2)
+
+@st.fragment(run_every=1)
+def pdf_job_progress(chave_pdf):
+    job = get_report_jobs().get(chave_pdf)
+    if job is None or job.done(): st.rerun()
+    st.progress(job.progresso, text=f"Gerando relatório PDF... {job.progresso:.0%}")
+
+def pdf_report_panel(chave_pdf, file_name, argumentos_relatorio):
+    # O PDF só é gerado quando pedido, em segundo plano; a página continua interativa
+    jobs = get_report_jobs()
+    job = jobs.get(chave_pdf)
+    # Um job com erro mostra o erro e o botão de novo: submit substitui o job que falhou
+    falhou = job is not None and job.done() and job.error() is not None
+    if falhou: st.error(f"Erro ao gerar o relatório PDF: {job.error()}")
+    if job is None or falhou:
+        if not st.button("📄 Gerar Relatório PDF", key="gerar_relatorio_pdf"): return
+        job = jobs.submit(chave_pdf, perfil.wrap('relatório PDF (segundo plano)', 'exportacao', generate_pdf_report), **argumentos_relatorio)
+    if not job.done(): pdf_job_progress(chave_pdf); return
+    if job.error() is not None: st.error(f"Erro ao gerar o relatório PDF: {job.error()}"); return
+    for aviso in job.avisos: st.error(aviso)
+    st.download_button(label="📥 Exportar Relatório para PDF", data=job.result(), file_name=file_name, mime="application/pdf")
 
 # --- Carregar e pré-processar os dados ---
-raw_df = load_data()
-material_df = preprocess_data(raw_df) 
+# A versão atual dos dados é lida uma vez e usada na execução inteira, mesmo que uma
+# recarga em segundo plano troque a versão no meio dela.
+with perfil.stage('dados (cache)', 'carga'):
+    recarga_dados = get_dataset_reloader()
+    dados = recarga_dados.current()
+cubo_df = dados.cubo
+perfil.contexto['versao_dados'] = dados.versao
 
 # --- Interface do Dashboard ---
 st.title("📊 Dashboard Avançado de Análise de Consumo")
@@ -215,36 +261,66 @@ material_para_analise_unidade_global = None
 codigo_insumo_para_unidade_global = "" 
 media_mensal_por_unidade_pdf = pd.DataFrame(); pivot_unidade_ano_media_mensal_pdf = pd.DataFrame()
 
-if material_df.empty: st.warning("Dados não carregados/processados adequadamente. Verifique o CSV e o mapeamento de colunas."); st.stop()
+# Mensagens da montagem desta versão (coletadas em build_dataset, possivelmente em outra thread)
+for nivel, texto in dados.avisos:
+    if nivel == 'erro': st.error(texto)
+    elif nivel == 'aviso': st.sidebar.warning(texto)
+    else: st.sidebar.info(texto)
+if recarga_dados.recarregando: st.sidebar.info("🔄 Nova versão dos dados em preparação; a atual continua em uso até a troca.")
+if recarga_dados.erro: st.sidebar.warning(f"Falha ao recarregar os dados ({recarga_dados.erro}); mantida a versão atual.")
+if cubo_df.empty: st.warning("Dados não carregados/processados adequadamente. Verifique o CSV e o mapeamento de colunas."); st.stop()
+st.sidebar.caption(f"🗂️ Dados: versão {dados.versao} · carregados em {dados.carregado_em:%d/%m/%Y %H:%M:%S}"
+                   + (f" · arquivos de {dados.modificado_em:%d/%m/%Y %H:%M}" if dados.modificado_em else ""))
+
+# No modo duckdb, seleção e agregações (análise, consumo anual, mensal e por unidade) rodam no DuckDB
+backend_consulta = dados.backend
+
+# Cada seção abaixo passa pelo memo com as entradas de que depende: trocar o insumo
+# da análise por unidade, por exemplo, não refaz as tabelas e gráficos por insumo.
+memo = get_section_memo()
 
 st.sidebar.header("⚙️ Filtros de Análise")
-all_desc_insumos = sorted(material_df['Desc. Insumo'].dropna().unique())
-selected_desc_insumos = st.sidebar.multiselect("💊 Selecione Insumos por Descrição:", options=all_desc_insumos, default=[])
-all_cod_insumos = sorted(material_df['Cód. Insumo'].dropna().unique())
-selected_cod_insumos = st.sidebar.multiselect("🔢 Selecione Insumos por Código:", options=all_cod_insumos, default=[])
-all_classes = [];
-if 'Descricao Classe' in material_df.columns: all_classes = sorted(material_df['Descricao Classe'].dropna().unique())
-selected_classes = st.sidebar.multiselect("🏷️ Selecione Classes:", options=all_classes, default=[])
-all_years = sorted(material_df['Ano'].dropna().unique())
-selected_years = st.sidebar.multiselect("📅 Selecione os Anos:", options=all_years, default=[])
-
-movimento_options = sorted(material_df['Descricao Movimento'].dropna().unique()) 
-default_movimento_index = 0 
-if len(movimento_options) > 6: default_movimento_index = 6
-elif movimento_options: default_movimento_index = 0
-selected_movimento_consumo = st.sidebar.selectbox("📉 Tipo de Movimento para Consumo:", options=movimento_options, index=default_movimento_index if movimento_options else 0)
+# Filtros em cascata: cada widget oferece só os valores que ainda dão resultado com as
+# seleções dos outros (lidas do session_state, já atualizado no início da execução).
+# O que já está selecionado continua nas opções, para poder ser removido.
+indice_busca = dados.indice_busca
+indice_coocorrencia = dados.indice_coocorrencia
+movimento_padrao = indice_coocorrencia.movimentos[engine.default_movement_index(indice_coocorrencia.movimentos)] if indice_coocorrencia.movimentos else None
+estado_sidebar = {chave: st.session_state.get(chave) or None for chave in ('filtro_desc_insumos', 'filtro_cod_insumos', 'filtro_classes', 'filtro_anos')}
+insumos_sidebar = None
+if estado_sidebar['filtro_desc_insumos'] or estado_sidebar['filtro_cod_insumos']:
+    insumos_sidebar = indice_busca.positions(estado_sidebar['filtro_desc_insumos'] or (), estado_sidebar['filtro_cod_insumos'] or ())
+opcoes_cascata = indice_coocorrencia.options(insumos_sidebar, estado_sidebar['filtro_classes'], estado_sidebar['filtro_anos'], st.session_state.get('filtro_movimento', movimento_padrao))
+
+def with_selected(opcoes, chave):
+    return list(dict.fromkeys(list(st.session_state.get(chave) or []) + list(opcoes)))
+
+# Busca enquanto digita: as opções são só as melhores sugestões para o termo, mais o que já está selecionado
+termo_busca_insumo = st.sidebar.text_input("🔎 Buscar insumo (descrição ou código):", key="busca_insumo", placeholder="ex.: luva esteril, 1164")
+sugestoes_insumos = indice_busca.search(termo_busca_insumo, LIMITE_SUGESTOES_INSUMOS, permitidos=opcoes_cascata['insumos'])
+all_desc_insumos = with_selected(dict.fromkeys(indice_busca.descriptions(sugestoes_insumos)), 'filtro_desc_insumos')
+selected_desc_insumos = st.sidebar.multiselect("💊 Selecione Insumos por Descrição:", options=all_desc_insumos, default=[], key="filtro_desc_insumos")
+all_cod_insumos = with_selected(dict.fromkeys(indice_busca.codes(sugestoes_insumos)), 'filtro_cod_insumos')
+selected_cod_insumos = st.sidebar.multiselect("🔢 Selecione Insumos por Código:", options=all_cod_insumos, default=[], key="filtro_cod_insumos")
+all_classes = with_selected(opcoes_cascata['classes'], 'filtro_classes')
+selected_classes = st.sidebar.multiselect("🏷️ Selecione Classes:", options=all_classes, default=[], key="filtro_classes")
+all_years = sorted(with_selected(opcoes_cascata['anos'], 'filtro_anos'))
+selected_years = st.sidebar.multiselect("📅 Selecione os Anos:", options=all_years, default=[], key="filtro_anos")
+
+movimento_options = sorted(set(opcoes_cascata['movimentos']) | ({st.session_state['filtro_movimento']} if st.session_state.get('filtro_movimento') else set()))
+default_movimento_index = movimento_options.index(movimento_padrao) if movimento_padrao in movimento_options else 0
+selected_movimento_consumo = st.sidebar.selectbox("📉 Tipo de Movimento para Consumo:", options=movimento_options, index=default_movimento_index if movimento_options else 0, key="filtro_movimento")
 pdf_download_button_placeholder = st.sidebar.empty()
 
-condition_desc = material_df['Desc. Insumo'].isin(selected_desc_insumos) if selected_desc_insumos else pd.Series(True, index=material_df.index)
-condition_cod = material_df['Cód. Insumo'].isin(selected_cod_insumos) if selected_cod_insumos else pd.Series(True, index=material_df.index)
-if selected_desc_insumos and selected_cod_insumos: combined_insumo_condition = condition_desc | condition_cod
-elif selected_desc_insumos: combined_insumo_condition = condition_desc
-elif selected_cod_insumos: combined_insumo_condition = condition_cod
-else: combined_insumo_condition = pd.Series(True, index=material_df.index)
-condition_classe = pd.Series(True, index=material_df.index)
-if selected_classes and 'Descricao Classe' in material_df.columns: condition_classe = material_df['Descricao Classe'].isin(selected_classes)
-df_insumos_selecionados_base = material_df[combined_insumo_condition & condition_classe]
-actual_selected_insumo_descriptions = sorted(df_insumos_selecionados_base['Desc. Insumo'].unique()) if not df_insumos_selecionados_base.empty else []
+with perfil.stage('bloco de filtros', 'filtros'):
+    indice_filtros = dados.indice_filtros
+    posicoes_insumos_base = engine.select_insumos(indice_filtros, selected_desc_insumos, selected_cod_insumos, selected_classes)
+    df_insumos_selecionados_base = cubo_df.iloc[posicoes_insumos_base]
+    filtros_consulta = dict(desc=selected_desc_insumos, cod=selected_cod_insumos, classes=selected_classes, anos=selected_years, movimento=selected_movimento_consumo)
+    # A versão dos dados entra em todas as chaves (memo, Excel, PDF): nada de uma versão serve a outra
+    estado_filtros = dict(filtros_consulta, versao=dados.versao)
+    actual_selected_insumo_descriptions = sorted(df_insumos_selecionados_base['Desc. Insumo'].unique()) if not df_insumos_selecionados_base.empty else []
+perfil.contexto['filtros'] = filter_fingerprint(**estado_filtros)
 
 proceed_with_analysis = True
 if not selected_years: st.info("👈 Por favor, selecione pelo menos um ano."); proceed_with_analysis = False
@@ -255,173 +331,59 @@ if not actual_selected_insumo_descriptions and (selected_desc_insumos or selecte
     proceed_with_analysis = False
 
 if proceed_with_analysis:
-    analysis_df_materiais = df_insumos_selecionados_base[
-        (df_insumos_selecionados_base['Ano'].isin(selected_years)) &
-        (df_insumos_selecionados_base['Descricao Movimento'] == selected_movimento_consumo)]
+    with perfil.stage('seleção da análise', 'filtros'):
+        if backend_consulta is not None: analysis_df_materiais = memo.compute('análise', estado_filtros, backend_consulta.analysis, **filtros_consulta)
+        else: analysis_df_materiais = memo.compute('análise', estado_filtros, engine.select_analysis, cubo_df, indice_filtros, posicoes_insumos_base, selected_years, selected_movimento_consumo)
     if analysis_df_materiais.empty: st.warning(f"Nenhum dado encontrado para os critérios finais de filtro.")
     else:
         st.header("🔬 Análise de Consumo por Insumo")
         
-        consumo_total_anual_df = analysis_df_materiais.groupby(
-            ['Cód. Insumo', 'Desc. Insumo', 'Ano']
-        )['Quantidade'].sum().reset_index()
-        consumo_total_anual_df.rename(columns={'Quantidade': 'Consumo Total Anual'}, inplace=True)
-
-        meses_com_consumo_df = analysis_df_materiais[analysis_df_materiais['Quantidade'] > 0].groupby(
-            ['Cód. Insumo', 'Desc. Insumo', 'Ano']
-        )['Mês Num'].nunique().reset_index()
-        meses_com_consumo_df.rename(columns={'Mês Num': 'Nº Meses com Consumo'}, inplace=True)
-
-        consumo_anual_por_material = pd.merge(
-            consumo_total_anual_df,
-            meses_com_consumo_df,
-            on=['Cód. Insumo', 'Desc. Insumo', 'Ano'],
-            how='left'
-        )
-        consumo_anual_por_material['Nº Meses com Consumo'] = consumo_anual_por_material['Nº Meses com Consumo'].fillna(0)
-        
-        consumo_anual_por_material['Consumo Médio Mensal (agregado)'] = consumo_anual_por_material.apply(
-            lambda row: row['Consumo Total Anual'] / row['Nº Meses com Consumo'] if row['Nº Meses com Consumo'] > 0 else 0,
-            axis=1
-        )
-        consumo_anual_por_material = consumo_anual_por_material.sort_values(by=['Cód. Insumo', 'Desc. Insumo', 'Ano'])
+        with perfil.stage('seção consumo anual'):
+            if backend_consulta is not None: consumo_anual_por_material = memo.compute('consumo anual', estado_filtros, backend_consulta.annual_consumption, **filtros_consulta)
+            else: consumo_anual_por_material = memo.compute('consumo anual', estado_filtros, engine.annual_consumption, analysis_df_materiais)
         
         st.subheader("Consumo Total Anual")
         try:
-            consumo_anual_pivot_pdf = consumo_anual_por_material.pivot_table(index=['Cód. Insumo', 'Desc. Insumo'], columns='Ano', values='Consumo Total Anual', fill_value=0).reset_index()
+            with perfil.stage('seção consumo total anual'): consumo_anual_pivot_pdf = memo.compute('consumo total anual', estado_filtros, engine.annual_pivot, consumo_anual_por_material, 'Consumo Total Anual')
             st.dataframe(consumo_anual_pivot_pdf.style.format({year: "{:,.0f}" for year in selected_years}), use_container_width=True)
             if not consumo_anual_pivot_pdf.empty:
-                excel_data_cta = df_to_excel_bytes(consumo_anual_pivot_pdf)
-                st.download_button(
+                excel_download_button(
                     label="📥 Exportar Consumo Total Anual para Excel",
-                    data=excel_data_cta,
+                    df_to_export=consumo_anual_pivot_pdf,
                     file_name="consumo_total_anual.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    estado=estado_filtros,
+                    formatos={year: "{:,.0f}" for year in selected_years}
                 )
         except Exception as e: st.error(f"Erro ao criar tabela de consumo anual: {str(e)}"); consumo_anual_pivot_pdf = pd.DataFrame()
 
         st.subheader("Consumo Médio Mensal (agregado por ano, calculado sobre meses com consumo)")
         try:
-            consumo_mensal_pivot_pdf = consumo_anual_por_material.pivot_table(index=['Cód. Insumo', 'Desc. Insumo'], columns='Ano', values='Consumo Médio Mensal (agregado)', fill_value=0).reset_index()
+            with perfil.stage('seção consumo médio mensal'): consumo_mensal_pivot_pdf = memo.compute('consumo médio mensal', estado_filtros, engine.annual_pivot, consumo_anual_por_material, 'Consumo Médio Mensal (agregado)')
             st.dataframe(consumo_mensal_pivot_pdf.style.format({year: "{:,.1f}" for year in selected_years}), use_container_width=True)
             if not consumo_mensal_pivot_pdf.empty:
-                excel_data_cma = df_to_excel_bytes(consumo_mensal_pivot_pdf)
-                st.download_button(
+                excel_download_button(
                     label="📥 Exportar Consumo Médio Mensal (agregado) para Excel",
-                    data=excel_data_cma,
+                    df_to_export=consumo_mensal_pivot_pdf,
                     file_name="consumo_medio_mensal_agregado.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    estado=estado_filtros,
+                    formatos={year: "{:,.1f}" for year in selected_years}
                 )
         except Exception as e: st.error(f"Erro ao criar tabela de consumo mensal agregada: {str(e)}"); consumo_mensal_pivot_pdf = pd.DataFrame()
 
         if not consumo_anual_por_material.empty:
-            fig_consumo_anual_line = px.line(consumo_anual_por_material, x='Ano', y='Consumo Total Anual', color='Desc. Insumo', markers=True, title='Tendência de Consumo Total Anual por Insumo', labels={'Desc. Insumo': 'Insumo'}, hover_data=['Cód. Insumo']); st.plotly_chart(fig_consumo_anual_line.update_layout(xaxis_type='category'), use_container_width=True)
-            fig_consumo_mensal_bar = px.bar(consumo_anual_por_material, x='Ano', y='Consumo Médio Mensal (agregado)', color='Desc. Insumo', barmode='group', title='Comparativo de Consumo Médio Mensal (agregado por ano, calculado sobre meses com consumo)', labels={'Desc. Insumo': 'Insumo'}, hover_data=['Cód. Insumo']); st.plotly_chart(fig_consumo_mensal_bar.update_layout(xaxis_type='category'), use_container_width=True)
+            with perfil.stage('gráfico tendência anual', 'grafico'):
+                fig_consumo_anual_line = memo.compute('gráfico tendência anual', estado_filtros, charts.annual_trend_figure, consumo_anual_por_material); st.plotly_chart(fig_consumo_anual_line, use_container_width=True)
+            with perfil.stage('gráfico média mensal anual', 'grafico'):
+                fig_consumo_mensal_bar = memo.compute('gráfico média mensal anual', estado_filtros, charts.annual_average_figure, consumo_anual_por_material); st.plotly_chart(fig_consumo_mensal_bar, use_container_width=True)
 
         st.markdown("---")
         st.header("📈 Análise Detalhada de Consumo Mensal")
         
-        consumo_mensal_detalhado_calculado = analysis_df_materiais.groupby(
-            ['Cód. Insumo', 'Desc. Insumo', 'Ano', 'Mês Num', 'Mês Nome']
-        )['Quantidade'].sum().reset_index()
-
-        if len(selected_years) > 1:
-            consumo_mensal_grafico_df = consumo_mensal_detalhado_calculado.groupby(
-                ['Cód. Insumo', 'Desc. Insumo', 'Mês Num', 'Mês Nome']
-            )['Quantidade'].mean().reset_index()
-            titulo_detalhado = f"Consumo Mensal Efetivo por Insumo (Média entre Anos: {', '.join(map(str,selected_years))})"
-        else:
-            consumo_mensal_grafico_df = consumo_mensal_detalhado_calculado.copy()
-            titulo_detalhado = f"Consumo Mensal Efetivo por Insumo (Ano: {selected_years[0] if selected_years else 'N/A'})"
-        
-        consumo_mensal_grafico_df = consumo_mensal_grafico_df.sort_values(by=['Cód. Insumo', 'Desc. Insumo', 'Mês Num'])
-        
-        df_para_exibir_pivotado = pd.DataFrame()
-        final_month_col_names = [] 
-
-        if not consumo_mensal_grafico_df.empty:
-            pivot_df = consumo_mensal_grafico_df.pivot_table(
-                index=['Cód. Insumo', 'Desc. Insumo'],
-                columns='Mês Nome',
-                values='Quantidade',
-                fill_value=0
-            ).reset_index()
-
-            pivot_df.rename(columns={'Cód. Insumo': 'CODIGO', 'Desc. Insumo': 'DESCRICAO'}, inplace=True)
-            ordered_month_cols_orig = [mes for mes in MESES_PT_ORDENADOS if mes in pivot_df.columns]
-            mapa_nomes_meses_novo = {}
-            current_month_column_names = list(ordered_month_cols_orig)
-
-            if len(selected_years) == 1:
-                ano_selecionado_str = str(selected_years[0])
-                ano_curto = ano_selecionado_str[-2:]
-                temp_final_month_col_names = []
-                for mes_longo in ordered_month_cols_orig:
-                    mes_curto = mes_longo[:3].lower()
-                    novo_nome = f"{mes_curto}/{ano_curto}"
-                    mapa_nomes_meses_novo[mes_longo] = novo_nome
-                    temp_final_month_col_names.append(novo_nome)
-                pivot_df.rename(columns=mapa_nomes_meses_novo, inplace=True)
-                current_month_column_names = temp_final_month_col_names
-            
-            final_month_col_names = current_month_column_names
-            static_cols = ['CODIGO', 'DESCRICAO']
-            cols_para_reordenar = static_cols + [col for col in final_month_col_names if col in pivot_df.columns]
-            pivot_df = pivot_df[cols_para_reordenar]
-
-            if len(selected_years) == 1:
-                ano_selecionado = selected_years[0]
-                media_ref = consumo_anual_por_material[
-                    consumo_anual_por_material['Ano'] == ano_selecionado
-                ][['Cód. Insumo', 'Desc. Insumo', 'Consumo Médio Mensal (agregado)']].copy()
-                media_ref.rename(columns={
-                    'Cód. Insumo': 'CODIGO', 
-                    'Desc. Insumo': 'DESCRICAO',
-                    'Consumo Médio Mensal (agregado)': 'CONSUMO MEDIO'
-                    }, inplace=True)
-                df_para_exibir_pivotado = pd.merge(pivot_df, media_ref, on=['CODIGO', 'DESCRICAO'], how='left')
-                if 'CONSUMO MEDIO' in df_para_exibir_pivotado.columns:
-                    df_para_exibir_pivotado['CONSUMO MEDIO'] = df_para_exibir_pivotado['CONSUMO MEDIO'].fillna(0.0)
-                else: 
-                    df_para_exibir_pivotado['CONSUMO MEDIO'] = 0.0
-            else: 
-                if final_month_col_names: 
-                    # Garante que estamos somando apenas colunas que realmente existem e são numéricas (meses)
-                    colunas_meses_existentes_no_pivot = [col for col in final_month_col_names if col in pivot_df.columns]
-                    if colunas_meses_existentes_no_pivot:
-                        pivot_df['Total Efetivo Agregado'] = pivot_df[colunas_meses_existentes_no_pivot].sum(axis=1)
-                        pivot_df['Nº Meses com Consumo Efetivo Agregado'] = (pivot_df[colunas_meses_existentes_no_pivot] > 0).sum(axis=1)
-                        pivot_df['CONSUMO MEDIO'] = pivot_df.apply(
-                            lambda row: row['Total Efetivo Agregado'] / row['Nº Meses com Consumo Efetivo Agregado'] 
-                                        if row['Nº Meses com Consumo Efetivo Agregado'] > 0 else 0,
-                            axis=1
-                        )
-                    else: # Caso não haja colunas de meses válidas para somar
-                         pivot_df['CONSUMO MEDIO'] = 0.0
-                    cols_to_drop = [col for col in ['Total Efetivo Agregado', 'Nº Meses com Consumo Efetivo Agregado'] if col in pivot_df.columns]
-                    df_para_exibir_pivotado = pivot_df.drop(columns=cols_to_drop) if cols_to_drop else pivot_df.copy()
-                else: 
-                    pivot_df['CONSUMO MEDIO'] = 0.0
-                    df_para_exibir_pivotado = pivot_df.copy()
-            
-            if 'CONSUMO MEDIO' not in df_para_exibir_pivotado.columns:
-                df_para_exibir_pivotado['CONSUMO MEDIO'] = 0.0
-        
-        else: 
-            base_cols = ['CODIGO', 'DESCRICAO']
-            month_cols_for_empty_df = []
-            if len(selected_years) == 1:
-                ano_s = str(selected_years[0])[-2:]
-                month_cols_for_empty_df = [f"{m[:3].lower()}/{ano_s}" for m in MESES_PT_ORDENADOS]
-            else:
-                month_cols_for_empty_df = list(MESES_PT_ORDENADOS)
-            
-            final_month_col_names = month_cols_for_empty_df
-            df_para_exibir_pivotado = pd.DataFrame(columns=base_cols + month_cols_for_empty_df + ['CONSUMO MEDIO'])
-            for col in df_para_exibir_pivotado.columns:
-                if col not in base_cols:
-                    df_para_exibir_pivotado[col] = pd.Series(dtype='float64')
-        
+        with perfil.stage('seção detalhe mensal'):
+            consumo_mensal_grafico_df, df_para_exibir_pivotado, final_month_col_names = memo.compute('detalhe mensal', estado_filtros, lambda: engine.monthly_detail(
+                analysis_df_materiais, consumo_anual_por_material, selected_years,
+                consumo_mensal=backend_consulta.monthly_consumption(**filtros_consulta) if backend_consulta is not None else None))
+        titulo_detalhado = engine.monthly_detail_title(selected_years)
         consumo_mensal_detalhado_pdf_display = df_para_exibir_pivotado
         
         format_dict = {'CONSUMO MEDIO': "{:,.1f}"}
@@ -432,42 +394,32 @@ if proceed_with_analysis:
         st.subheader("Tabela: " + titulo_detalhado)
         if not df_para_exibir_pivotado.empty:
             st.dataframe(df_para_exibir_pivotado.style.format(format_dict, na_rep='0'), use_container_width=True)
-            excel_data_cmd = df_to_excel_bytes(df_para_exibir_pivotado)
-            st.download_button(
+            excel_download_button(
                 label="📥 Exportar Consumo Mensal Detalhado para Excel",
-                data=excel_data_cmd,
+                df_to_export=df_para_exibir_pivotado,
                 file_name="consumo_mensal_detalhado.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                estado=estado_filtros,
+                formatos=format_dict
             )
         else:
             st.info("Nenhum dado detalhado de consumo mensal para exibir no formato pivotado.")
 
         if not consumo_mensal_grafico_df.empty:
-            fig_consumo_mensal_detalhado = px.line( 
-                consumo_mensal_grafico_df,
-                x='Mês Nome', 
-                y='Quantidade',
-                color='Desc. Insumo',
-                markers=True,
-                title=titulo_detalhado,
-                labels={'Desc. Insumo': 'Insumo', 'Quantidade': 'Consumo Mensal', 'Mês Nome': 'Mês'},
-                hover_data=['Cód. Insumo'],
-                category_orders={"Mês Nome": MESES_PT_ORDENADOS} 
-            )
-            st.plotly_chart(fig_consumo_mensal_detalhado, use_container_width=True)
+            with perfil.stage('gráfico detalhe mensal', 'grafico'):
+                fig_consumo_mensal_detalhado = memo.compute('gráfico detalhe mensal', estado_filtros, charts.monthly_detail_figure, consumo_mensal_grafico_df, titulo_detalhado)
+                st.plotly_chart(fig_consumo_mensal_detalhado, use_container_width=True)
         else:
             fig_consumo_mensal_detalhado = None 
         
         st.markdown("---")
         if len(selected_years) > 0 and not consumo_anual_por_material.empty :
-            media_geral_mensal_pdf = consumo_anual_por_material.groupby(['Cód. Insumo', 'Desc. Insumo'])['Consumo Médio Mensal (agregado)'].mean().reset_index()
-            media_geral_mensal_pdf.rename(columns={'Consumo Médio Mensal (agregado)': f'Média Geral Mensal ({len(selected_years)}a)'}, inplace=True)
+            with perfil.stage('seção média geral mensal'): media_geral_mensal_pdf = memo.compute('média geral mensal', estado_filtros, engine.overall_monthly_average, consumo_anual_por_material, len(selected_years))
             
             st.subheader(f"⚖️ Média Geral Mensal de Consumo por Insumo (sobre Anos Selecionados)")
             st.caption("Média Geral Mensal (baseada na média do consumo anual / nº meses com consumo)")
 
             if not media_geral_mensal_pdf.empty:
-                col_name_to_format = f'Média Geral Mensal ({len(selected_years)}a)'
+                col_name_to_format = engine.overall_average_column(len(selected_years))
                 dynamic_height = (len(media_geral_mensal_pdf) + 1) * 35 + 3 
                 
                 style_applied = False
@@ -489,98 +441,67 @@ if proceed_with_analysis:
                         height=dynamic_height
                     )
                 
-                excel_data_mgm = df_to_excel_bytes(media_geral_mensal_pdf)
-                st.download_button(
+                excel_download_button(
                     label="📥 Exportar Média Geral Mensal para Excel",
-                    data=excel_data_mgm,
+                    df_to_export=media_geral_mensal_pdf,
                     file_name="media_geral_mensal.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    estado=estado_filtros,
+                    formatos={engine.overall_average_column(len(selected_years)): "{:,.1f}"}
                 )
             else:
                 st.info("Não há dados de média geral mensal para exibir.")
 
             if not media_geral_mensal_pdf.empty:
-                col_valor_media_mensal_nome = f'Média Geral Mensal ({len(selected_years)}a)'
+                col_valor_media_mensal_nome = engine.overall_average_column(len(selected_years))
                 if col_valor_media_mensal_nome in media_geral_mensal_pdf.columns:
-                    fig_media_geral_mensal_grafico = px.bar(media_geral_mensal_pdf, 
-                                                            x='Desc. Insumo', 
-                                                            y=col_valor_media_mensal_nome, 
-                                                            color='Desc. Insumo', 
-                                                            title='Média Geral do Consumo Mensal por Insumo (calculado sobre meses com consumo)', 
-                                                            labels={'Desc. Insumo': 'Insumo', col_valor_media_mensal_nome: 'Média Mensal'}, 
-                                                            hover_data=['Cód. Insumo'])
-                    st.plotly_chart(fig_media_geral_mensal_grafico, use_container_width=True)
+                    with perfil.stage('gráfico média geral mensal', 'grafico'):
+                        fig_media_geral_mensal_grafico = memo.compute('gráfico média geral mensal', estado_filtros, charts.overall_average_figure, media_geral_mensal_pdf, col_valor_media_mensal_nome)
+                        st.plotly_chart(fig_media_geral_mensal_grafico, use_container_width=True)
                 else:
                     st.warning(f"Coluna '{col_valor_media_mensal_nome}' não encontrada para o gráfico de Média Geral Mensal.")
         
         st.markdown("---")
-        if 'Descricao Requisitante' in material_df.columns and \
-           material_df['Descricao Requisitante'].notna().any() and \
-           material_df['Descricao Requisitante'].nunique() > 1:
+        if engine.has_units(cubo_df):
             
             st.header("🏥 Análise de Consumo por Unidade Requisitante")
 
             st.subheader("Quantidade Total de Consumo por Ano (Agregado por Unidade e Insumo)")
-            st.caption("Esta tabela mostra o consumo total para os itens e filtros principais selecionados, distribuído por unidade requisitante. As unidades estão ordenadas pelo seu total consumido.")
-
-            if not analysis_df_materiais.empty:
-                df_for_new_table_source = analysis_df_materiais[
-                    analysis_df_materiais['Descricao Requisitante'].notna() &
-                    (analysis_df_materiais['Descricao Requisitante'] != 'N/A') &
-                    (analysis_df_materiais['Descricao Requisitante'].str.strip() != '')
-                ].copy()
-
-                if not df_for_new_table_source.empty:
-                    try:
-                        pivot_unit_consumo_img = pd.pivot_table(
-                            df_for_new_table_source,
-                            index='Desc. Insumo',
-                            columns='Descricao Requisitante',
-                            values='Quantidade',
-                            aggfunc='sum',
-                            fill_value=0
-                        )
-
-                        if not pivot_unit_consumo_img.empty:
-                            unit_total_consumption_img = pivot_unit_consumo_img.sum(axis=0).sort_values(ascending=False)
-                            sorted_unit_columns_img = unit_total_consumption_img.index.tolist()
-                            sorted_unit_columns_img = [
-                                unit for unit in sorted_unit_columns_img if unit_total_consumption_img[unit] > 0
-                            ]
-
-                            if sorted_unit_columns_img:
-                                pivot_unit_consumo_sorted_img = pivot_unit_consumo_img[sorted_unit_columns_img]
-                                pivot_unit_consumo_sorted_img['Total'] = pivot_unit_consumo_sorted_img[sorted_unit_columns_img].sum(axis=1)
-                                total_row_series_img = pivot_unit_consumo_sorted_img.sum(axis=0)
-                                total_row_series_img.name = 'Total'
-                                display_table_img = pivot_unit_consumo_sorted_img.reset_index()
-                                display_table_img.rename(columns={'Desc. Insumo': 'Descricao'}, inplace=True)
-                                total_row_df_img = pd.DataFrame(total_row_series_img).T
-                                total_row_df_img['Descricao'] = 'Total'
-                                current_display_columns = display_table_img.columns.tolist()
-                                total_row_df_img = total_row_df_img[current_display_columns]
-                                final_display_table_img = pd.concat([display_table_img, total_row_df_img], ignore_index=True)
-                                numeric_cols_img = [col for col in final_display_table_img.columns if col != 'Descricao']
-                                format_dict_new_table_img = {col: "{:,.0f}" for col in numeric_cols_img}
-                                
-                                st.dataframe(final_display_table_img.style.format(format_dict_new_table_img, na_rep='0'), use_container_width=True)
-                                excel_data_unidade_geral = df_to_excel_bytes(final_display_table_img)
-                                st.download_button(
-                                    label="📥 Exportar Consumo Agregado por Unidade (Geral) para Excel",
-                                    data=excel_data_unidade_geral,
-                                    file_name="consumo_agregado_unidade_geral.xlsx",
-                                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                                )
-                            else:
-                                st.info("Nenhuma unidade com consumo significativo encontrado para os itens e filtros selecionados para gerar a tabela de visão geral por unidade.")
-                        else:
-                            st.info("Não foi possível gerar a tabela de consumo agregado por unidade e insumo (a tabela dinâmica resultou vazia ou sem dados significativos).")
-                    except Exception as e:
-                        st.error(f"Ocorreu um erro ao gerar a tabela de consumo agregado por unidade: {str(e)}")
+            st.caption("Esta tabela mostra o consumo total para os itens e filtros principais selecionados, distribuído por unidade requisitante. As unidades estão ordenadas pelo seu total consumido; além das maiores unidades e insumos, o restante é somado em \"Outros\".")
+
+            def unit_cells():
+                # Células insumo x unidade: do DuckDB no modo duckdb; senão o motor agrega a análise
+                return memo.compute('células por unidade', estado_filtros, backend_consulta.unit_cells, **filtros_consulta) if backend_consulta is not None else None
+
+            try:
+                col_top_unidades, col_top_insumos = st.columns(2)
+                top_unidades = col_top_unidades.number_input("Unidades exibidas:", min_value=1, value=TOP_UNIDADES_PADRAO, step=5, key="top_unidades_visao_geral")
+                top_insumos = col_top_insumos.number_input("Insumos exibidos:", min_value=1, value=TOP_INSUMOS_PADRAO, step=50, key="top_insumos_visao_geral")
+                with perfil.stage('seção visão geral por unidade'):
+                    final_display_table_img = memo.compute('visão geral por unidade', dict(estado_filtros, top_unidades=top_unidades, top_insumos=top_insumos),
+                                                           lambda: engine.unit_overview(analysis_df_materiais, top_unidades, top_insumos, celulas=unit_cells()))
+                if not final_display_table_img.empty:
+                    numeric_cols_img = [col for col in final_display_table_img.columns if col != 'Descricao']
+                    format_dict_new_table_img = {col: "{:,.0f}" for col in numeric_cols_img}
+
+                    # Paginação no servidor: só as linhas da página (e a de Total) vão para o navegador
+                    linhas_insumos = len(final_display_table_img) - 1
+                    n_paginas = max(1, -(-linhas_insumos // LINHAS_POR_PAGINA_UNIDADES))
+                    pagina = st.number_input(f"Página (de {n_paginas}):", min_value=1, max_value=n_paginas, value=1, key="pagina_visao_geral_unidade") if n_paginas > 1 else 1
+                    inicio_pagina = (pagina - 1) * LINHAS_POR_PAGINA_UNIDADES
+                    tabela_pagina = pd.concat([final_display_table_img.iloc[inicio_pagina:min(inicio_pagina + LINHAS_POR_PAGINA_UNIDADES, linhas_insumos)], final_display_table_img.iloc[[-1]]])
+                    st.dataframe(tabela_pagina.style.format(format_dict_new_table_img, na_rep='0'), use_container_width=True)
+                    # A exportação leva a tabela completa, montada só no clique
+                    excel_download_button(
+                        label="📥 Exportar Consumo Agregado por Unidade (Geral) para Excel",
+                        df_to_export=lambda: engine.unit_overview(analysis_df_materiais, celulas=unit_cells()),
+                        file_name="consumo_agregado_unidade_geral.xlsx",
+                        estado=estado_filtros,
+                        formatos="{:,.0f}"
+                    )
                 else:
-                    st.info("Nenhum dado de consumo por unidade encontrado (após remover N/A ou unidades vazias) para os filtros aplicados para gerar a tabela de visão geral.")
-            else:
-                st.info("Os dados de análise principal estão vazios. Não é possível gerar a tabela de consumo por unidade.")
+                    st.info("Nenhuma unidade com consumo significativo encontrado para os itens e filtros selecionados para gerar a tabela de visão geral por unidade.")
+            except Exception as e:
+                st.error(f"Ocorreu um erro ao gerar a tabela de consumo agregado por unidade: {str(e)}")
             
             st.markdown("---")
 
@@ -603,92 +524,169 @@ if proceed_with_analysis:
 
             if material_para_analise_unidade_global:
                 st.subheader(f"Consumo de '{material_para_analise_unidade_global}' por Unidade (Detalhado)")
-                insumo_selecionado_df_para_unidade = material_df[material_df['Desc. Insumo'] == material_para_analise_unidade_global]
-                if not insumo_selecionado_df_para_unidade.empty:
-                    codigo_insumo_para_unidade_global = str(insumo_selecionado_df_para_unidade['Cód. Insumo'].iloc[0])
-
-                df_unidade_analise_detalhada = analysis_df_materiais[
-                    (analysis_df_materiais['Desc. Insumo'] == material_para_analise_unidade_global) &
-                    (analysis_df_materiais['Descricao Requisitante'].notna()) &
-                    (analysis_df_materiais['Descricao Requisitante'] != 'N/A') &
-                    (analysis_df_materiais['Descricao Requisitante'].str.strip() != '')
-                ]
-
-                if not df_unidade_analise_detalhada.empty:
-                    consumo_total_anual_unidade_df_det = df_unidade_analise_detalhada.groupby(
-                        ['Descricao Requisitante', 'Ano']
-                    )['Quantidade'].sum().reset_index()
-
-                    meses_com_consumo_unidade_df_det = df_unidade_analise_detalhada[df_unidade_analise_detalhada['Quantidade'] > 0].groupby(
-                        ['Descricao Requisitante', 'Ano']
-                    )['Mês Num'].nunique().reset_index()
-                    meses_com_consumo_unidade_df_det.rename(columns={'Mês Num': 'Nº Meses com Consumo Unidade'}, inplace=True)
-
-                    consumo_unidade_ano_det = pd.merge(
-                        consumo_total_anual_unidade_df_det,
-                        meses_com_consumo_unidade_df_det,
-                        on=['Descricao Requisitante', 'Ano'],
-                        how='left'
-                    )
-                    consumo_unidade_ano_det['Nº Meses com Consumo Unidade'] = consumo_unidade_ano_det['Nº Meses com Consumo Unidade'].fillna(0)
-                    
-                    consumo_unidade_ano_det['Média Mensal por Unidade'] = consumo_unidade_ano_det.apply(
-                        lambda row: row['Quantidade'] / row['Nº Meses com Consumo Unidade'] if row['Nº Meses com Consumo Unidade'] > 0 else 0,
-                        axis=1
-                    )
+                estado_unidade = dict(estado_filtros, insumo_unidade=material_para_analise_unidade_global)
+                codigo_insumo_para_unidade_global = memo.compute('código do insumo', {'insumo': material_para_analise_unidade_global, 'versao': dados.versao}, engine.insumo_code, cubo_df, indice_filtros, material_para_analise_unidade_global)
+                with perfil.stage('seção análise por unidade'): media_mensal_por_unidade_pdf, pivot_unidade_ano_media_mensal_pdf = memo.compute('análise por unidade', estado_unidade, engine.unit_analysis, analysis_df_materiais, material_para_analise_unidade_global)
 
-                    media_mensal_por_unidade_pdf = consumo_unidade_ano_det.groupby('Descricao Requisitante')['Média Mensal por Unidade'].mean().reset_index().sort_values(by='Média Mensal por Unidade', ascending=False)
-                    
+                if not media_mensal_por_unidade_pdf.empty:
                     st.caption(f"Média Mensal de Consumo de '{material_para_analise_unidade_global}' por Unidade (anos {', '.join(map(str,selected_years))}, calculado sobre meses com consumo)");
                     st.dataframe(media_mensal_por_unidade_pdf.style.format({'Média Mensal por Unidade': "{:,.1f}"}), use_container_width=True)
-                    if not media_mensal_por_unidade_pdf.empty:
-                        excel_data_media_unidade_det = df_to_excel_bytes(media_mensal_por_unidade_pdf)
-                        st.download_button(
-                            label=f"📥 Exportar Média Mensal ({material_para_analise_unidade_global}) por Unidade para Excel",
-                            data=excel_data_media_unidade_det,
-                            file_name=f"media_mensal_unidade_{material_para_analise_unidade_global.replace(' ','_').lower()}.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
-                        fig_unidade_media = px.bar(media_mensal_por_unidade_pdf.head(15), x='Descricao Requisitante', y='Média Mensal por Unidade', color='Descricao Requisitante', title=f'Top 15 Unidades por Média Mensal de Consumo de "{material_para_analise_unidade_global}" (calculado sobre meses com consumo)');
+                    excel_download_button(
+                        label=f"📥 Exportar Média Mensal ({material_para_analise_unidade_global}) por Unidade para Excel",
+                        df_to_export=media_mensal_por_unidade_pdf,
+                        file_name=f"media_mensal_unidade_{material_para_analise_unidade_global.replace(' ','_').lower()}.xlsx",
+                        estado=estado_unidade,
+                        formatos={'Média Mensal por Unidade': "{:,.1f}"}
+                    )
+                    with perfil.stage('gráfico média por unidade', 'grafico'):
+                        fig_unidade_media = memo.compute('gráfico média por unidade', estado_unidade, charts.unit_average_figure, media_mensal_por_unidade_pdf, material_para_analise_unidade_global)
                         st.plotly_chart(fig_unidade_media, use_container_width=True)
                     
                     st.caption(f"Detalhe: Média Mensal por Unidade/Ano para '{material_para_analise_unidade_global}' (calculado sobre meses com consumo)");
-                    pivot_unidade_ano_media_mensal_pdf = consumo_unidade_ano_det.pivot_table(index='Descricao Requisitante', columns='Ano', values='Média Mensal por Unidade', fill_value=0).reset_index(); 
                     st.dataframe(pivot_unidade_ano_media_mensal_pdf.style.format({year: "{:,.1f}" for year in selected_years}), height=300, use_container_width=True) 
                     if not pivot_unidade_ano_media_mensal_pdf.empty:
-                        excel_data_pivot_unidade_ano = df_to_excel_bytes(pivot_unidade_ano_media_mensal_pdf)
-                        st.download_button(
+                        excel_download_button(
                             label=f"📥 Exportar Detalhe Unidade/Ano ({material_para_analise_unidade_global}) para Excel",
-                            data=excel_data_pivot_unidade_ano,
+                            df_to_export=pivot_unidade_ano_media_mensal_pdf,
                             file_name=f"detalhe_unidade_ano_{material_para_analise_unidade_global.replace(' ','_').lower()}.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                            estado=estado_unidade,
+                            formatos={year: "{:,.1f}" for year in selected_years}
                         )
                 else: 
                     st.info(f"Nenhum dado de consumo detalhado para '{material_para_analise_unidade_global}' nas unidades e anos selecionados.")
         
         else: 
-            if 'Descricao Requisitante' not in material_df.columns:
+            if 'Descricao Requisitante' not in cubo_df.columns:
                  st.warning("A coluna 'Descricao Requisitante' não foi encontrada nos dados. A análise por unidade requisitante não está disponível.")
 
+        st.markdown("---")
+        st.header("💰 Análise de Gasto (Valor)")
+        st.caption(f"Soma de Valor para os insumos, classes e anos selecionados, no tipo de movimento \"{selected_movimento_consumo}\". Classe e unidade vêm das células da análise; fornecedor, de um agregado montado na carga dos dados.")
+        # Insumos que passaram pelos filtros de descrição/código/classe (None: todos)
+        codigos_analise = analysis_df_materiais['Cód. Insumo'].dropna().unique().tolist() if (selected_desc_insumos or selected_cod_insumos or selected_classes) else None
+        gasto_fornecedor_df = pd.DataFrame(); gasto_classe_df = pd.DataFrame(); gasto_unidade_df = pd.DataFrame()
+
+        st.subheader("Gasto por Fornecedor")
+        try:
+            with perfil.stage('seção gasto por fornecedor'):
+                gasto_fornecedor_df = memo.compute('gasto por fornecedor', estado_filtros, lambda: spend.spend_by(
+                    spend.select_supplier_cells(dados.cubo_fornecedor, codigos_analise, selected_classes, selected_years, selected_movimento_consumo), spend.COLUNA_FORNECEDOR))
+            if not gasto_fornecedor_df.empty:
+                st.dataframe(gasto_fornecedor_df.style.format(FORMATOS_GASTO), use_container_width=True)
+                excel_download_button(label="📥 Exportar Gasto por Fornecedor para Excel", df_to_export=gasto_fornecedor_df, file_name="gasto_por_fornecedor.xlsx", estado=estado_filtros, formatos=FORMATOS_GASTO)
+                with perfil.stage('gráfico gasto por fornecedor', 'grafico'):
+                    st.plotly_chart(memo.compute('gráfico gasto por fornecedor', estado_filtros, charts.spend_figure, gasto_fornecedor_df, spend.COLUNA_FORNECEDOR, 'Fornecedores por Valor'), use_container_width=True)
+            else:
+                st.info("Nenhum valor por fornecedor para os filtros selecionados.")
+        except Exception as e: st.error(f"Erro ao calcular o gasto por fornecedor: {str(e)}"); gasto_fornecedor_df = pd.DataFrame()
+
+        st.subheader("Gasto por Classe")
+        try:
+            with perfil.stage('seção gasto por classe'): gasto_classe_df = memo.compute('gasto por classe', estado_filtros, spend.spend_by, analysis_df_materiais, 'Descricao Classe')
+            if not gasto_classe_df.empty:
+                st.dataframe(gasto_classe_df.style.format(FORMATOS_GASTO), use_container_width=True)
+                excel_download_button(label="📥 Exportar Gasto por Classe para Excel", df_to_export=gasto_classe_df, file_name="gasto_por_classe.xlsx", estado=estado_filtros, formatos=FORMATOS_GASTO)
+                with perfil.stage('gráfico gasto por classe', 'grafico'):
+                    st.plotly_chart(memo.compute('gráfico gasto por classe', estado_filtros, charts.spend_figure, gasto_classe_df, 'Descricao Classe', 'Classes por Valor'), use_container_width=True)
+            else:
+                st.info("Nenhum valor por classe para os filtros selecionados.")
+        except Exception as e: st.error(f"Erro ao calcular o gasto por classe: {str(e)}"); gasto_classe_df = pd.DataFrame()
+
+        if engine.has_units(cubo_df):
+            st.subheader("Gasto por Unidade Requisitante")
+            try:
+                with perfil.stage('seção gasto por unidade'): gasto_unidade_df = memo.compute('gasto por unidade', estado_filtros, spend.spend_by, analysis_df_materiais, engine.COLUNA_REQUISITANTE)
+                if not gasto_unidade_df.empty:
+                    st.dataframe(gasto_unidade_df.style.format(FORMATOS_GASTO), use_container_width=True)
+                    excel_download_button(label="📥 Exportar Gasto por Unidade para Excel", df_to_export=gasto_unidade_df, file_name="gasto_por_unidade.xlsx", estado=estado_filtros, formatos=FORMATOS_GASTO)
+                else:
+                    st.info("Nenhum valor por unidade para os filtros selecionados.")
+            except Exception as e: st.error(f"Erro ao calcular o gasto por unidade: {str(e)}"); gasto_unidade_df = pd.DataFrame()
+
+        st.markdown("---")
+        st.header("⏳ Lotes Próximos do Vencimento")
+        st.caption("Lotes com validade na janela escolhida, dos insumos selecionados (todos, sem filtro de insumo ou classe); anos e tipo de movimento não se aplicam. Entradas, saídas e saldo são das movimentações presentes nos arquivos (o período exportado), não do estoque físico.")
+        lotes_a_vencer_df = pd.DataFrame(); estado_lotes = {}
+        try:
+            col_dias_vencimento, col_dias_vencidos, col_saldo_lotes = st.columns(3)
+            dias_vencimento = col_dias_vencimento.number_input("Vencendo nos próximos (dias):", min_value=1, value=DIAS_VENCIMENTO_PADRAO, step=30, key="dias_vencimento_lotes")
+            dias_vencidos = col_dias_vencidos.number_input("Incluir vencidos há até (dias):", min_value=0, value=0, step=30, key="dias_vencidos_lotes")
+            somente_com_saldo = col_saldo_lotes.checkbox("Só lotes com saldo positivo no período", value=False, key="lotes_com_saldo")
+            hoje = datetime.date.today()
+            codigos_lotes = df_insumos_selecionados_base['Cód. Insumo'].dropna().unique().tolist() if (selected_desc_insumos or selected_cod_insumos or selected_classes) else None
+            estado_lotes = dict(desc=selected_desc_insumos, cod=selected_cod_insumos, classes=selected_classes, versao=dados.versao,
+                                hoje=hoje.isoformat(), dias=dias_vencimento, vencidos=dias_vencidos, com_saldo=somente_com_saldo)
+            with perfil.stage('seção lotes a vencer'):
+                lotes_a_vencer_df = memo.compute('lotes a vencer', estado_lotes, dados.indice_validade.expiring, hoje, dias_vencimento, dias_vencidos, codigos_lotes, somente_com_saldo)
+            if not lotes_a_vencer_df.empty:
+                st.caption(f"{len(lotes_a_vencer_df):,} lote(s) com validade até {hoje + datetime.timedelta(days=int(dias_vencimento)):%d/%m/%Y}.")
+                st.dataframe(lotes_a_vencer_df.style.format(FORMATOS_LOTES), use_container_width=True)
+                excel_download_button(label="📥 Exportar Lotes a Vencer para Excel", df_to_export=lotes_a_vencer_df, file_name="lotes_a_vencer.xlsx", estado=estado_lotes, formatos=FORMATOS_LOTES)
+            else:
+                st.info("Nenhum lote com validade na janela escolhida para os filtros selecionados.")
+        except Exception as e: st.error(f"Erro ao consultar os lotes a vencer: {str(e)}"); lotes_a_vencer_df = pd.DataFrame()
+
+        st.markdown("---")
+        st.header("📦 Exportar Todas as Tabelas")
+        st.caption("Todas as tabelas desta análise em um único arquivo, gerado no clique e gravado em fluxo (a memória não cresce com o tamanho das tabelas). Para tabelas grandes demais para o Excel, use CSV ou Parquet.")
+        formato_completo = st.radio("Formato:", list(FORMATOS_EXPORTACAO_COMPLETA), horizontal=True, key="formato_exportacao_completa")
+        abas_exportacao = {
+            'Consumo Total Anual': consumo_anual_pivot_pdf,
+            'Consumo Médio Mensal': consumo_mensal_pivot_pdf,
+            'Consumo Mensal Detalhado': consumo_mensal_detalhado_pdf_display,
+            'Média Geral Mensal': media_geral_mensal_pdf,
+            'Consumo por Unidade': (lambda: engine.unit_overview(analysis_df_materiais, celulas=unit_cells())) if engine.has_units(cubo_df) else pd.DataFrame(),
+            'Média Mensal por Unidade': media_mensal_por_unidade_pdf,
+            'Unidade por Ano': pivot_unidade_ano_media_mensal_pdf,
+            'Gasto por Fornecedor': gasto_fornecedor_df,
+            'Gasto por Classe': gasto_classe_df,
+            'Gasto por Unidade': gasto_unidade_df,
+            'Lotes a Vencer': lotes_a_vencer_df,
+        }
+        chave_completa = filter_fingerprint(arquivo='exportacao_completa', insumo_unidade=material_para_analise_unidade_global, lotes=estado_lotes, **estado_filtros)
+        extensao_completa, mime_completo, _ = FORMATOS_EXPORTACAO_COMPLETA[formato_completo]
+        st.download_button(
+            label="📥 Exportar Todas as Tabelas",
+            data=lambda: cached_complete_export_bytes(chave_completa, formato_completo, abas_exportacao),
+            file_name=f"analise_consumo_{'_'.join(map(str, selected_years))}.{extensao_completa}",
+            mime=mime_completo,
+            key="exportacao_completa"
+        )
+
         if not analysis_df_materiais.empty:
-            pdf_bytes = generate_pdf_report(
-                actual_selected_insumo_descriptions, selected_cod_insumos, selected_years, 
-                selected_movimento_consumo, selected_classes, 
-                consumo_anual_pivot_pdf, consumo_mensal_pivot_pdf, 
-                fig_consumo_anual_line, fig_consumo_mensal_bar, 
-                media_geral_mensal_pdf, 
-                consumo_mensal_detalhado_pdf_display,
-                fig_consumo_mensal_detalhado,     
-                material_para_analise_unidade_global, 
-                codigo_insumo_para_unidade_global,  
-                media_mensal_por_unidade_pdf, 
-                fig_unidade_media, 
-                pivot_unidade_ano_media_mensal_pdf
-            )
-            pdf_download_button_placeholder.download_button(label="📥 Exportar Relatório para PDF", data=pdf_bytes, file_name=f"relatorio_consumo_{'_'.join(map(str,selected_years)) if selected_years else 'geral'}.pdf", mime="application/pdf")
+            chave_pdf = filter_fingerprint(relatorio='pdf', insumo_unidade=material_para_analise_unidade_global, **estado_filtros)
+            with pdf_download_button_placeholder.container():
+                pdf_report_panel(
+                    chave_pdf,
+                    f"relatorio_consumo_{'_'.join(map(str,selected_years)) if selected_years else 'geral'}.pdf",
+                    dict(
+                        selected_desc_insumos_pdf=actual_selected_insumo_descriptions, selected_cod_insumos_pdf=selected_cod_insumos,
+                        selected_years_pdf=selected_years, selected_movimento_consumo_pdf=selected_movimento_consumo,
+                        selected_classes_pdf=selected_classes,
+                        consumo_anual_pivot_df=consumo_anual_pivot_pdf, consumo_mensal_pivot_df=consumo_mensal_pivot_pdf,
+                        fig_consumo_anual_line_obj=fig_consumo_anual_line, fig_consumo_mensal_bar_obj=fig_consumo_mensal_bar,
+                        media_geral_mensal_df=media_geral_mensal_pdf,
+                        consumo_mensal_detalhado_pdf_data=consumo_mensal_detalhado_pdf_display,
+                        fig_consumo_mensal_detalhado_obj=fig_consumo_mensal_detalhado,
+                        material_analise_unidade_pdf=material_para_analise_unidade_global,
+                        material_analise_unidade_cod_insumo_pdf=codigo_insumo_para_unidade_global,
+                        media_mensal_unidade_df=media_mensal_por_unidade_pdf,
+                        fig_unidade_media_obj=fig_unidade_media,
+                        pivot_unidade_media_mensal_df=pivot_unidade_ano_media_mensal_pdf,
+                    )
+                )
         else: pdf_download_button_placeholder.empty()
 
 st.markdown("---")
 st.caption("Dashboard para análise de consumo.")
 
+if perfil.habilitado:
+    resumo_perfil = perfil.summary()
+    with st.sidebar.expander("⏱️ Perfil desta execução", expanded=False):
+        st.caption(f"Total: {resumo_perfil['total_segundos']:.3f} s · pico do processo: {profiling.peak_rss_bytes() / 2**20:,.0f} MB")
+        if resumo_perfil['etapas']:
+            st.dataframe(pd.DataFrame(resumo_perfil['etapas']).set_index('etapa'), use_container_width=True)
+        st.caption("Exportações geradas no clique saem no log em linhas próprias.")
+    perfil.finish()
+
 # --- END OF FILE dashboard_filtro_movimento_indice6.py ---
\ No newline at end of file
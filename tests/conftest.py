@@ -0,0 +1,6 @@
+# Raiz do repositório (pacote consumo) e benchmarks (gerador de dados) no caminho de import
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [RAIZ, os.path.join(RAIZ, 'benchmarks')]
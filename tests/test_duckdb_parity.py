@@ -0,0 +1,122 @@
+# Paridade entre o backend DuckDB (consumo/duckdb_backend.py) e o caminho pandas
+# em memória (cubo + índice de filtros + consumo/engine.py), sobre um CSV gerado.
+# O tempo dos dois caminhos fica em benchmarks/paridade_duckdb.py.
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('duckdb')
+
+from consumo import engine  # noqa: E402
+from consumo.cube import DIMENSOES_CUBO, build_consumption_cube  # noqa: E402
+from consumo.duckdb_backend import DuckDBBackend, parquet_from_csv  # noqa: E402
+from consumo.expiry_index import build_lot_table  # noqa: E402
+from consumo.filter_index import FilterIndex  # noqa: E402
+from consumo.spend import DIMENSOES_FORNECEDOR, build_supplier_cube  # noqa: E402
+from gerador_material import generate_material_csv  # noqa: E402
+
+LINHAS = 20_000
+COMBINACOES = 20
+
+
+def _plain(df):
+    # Categorias viram texto e o índice é descartado: compara só valores
+    df = df.reset_index(drop=True).copy()
+    for coluna in df.columns:
+        if isinstance(df[coluna].dtype, pd.CategoricalDtype): df[coluna] = df[coluna].astype(object).where(df[coluna].notna(), None)
+    df.columns = [str(coluna) for coluna in df.columns]
+    return df
+
+
+def assert_same(nome, esperado, obtido, ordenar=None):
+    esperado, obtido = _plain(esperado), _plain(obtido)
+    if ordenar:
+        esperado = esperado.sort_values(ordenar, ignore_index=True, na_position='last')
+        obtido = obtido.sort_values(ordenar, ignore_index=True, na_position='last')
+    pd.testing.assert_frame_equal(esperado, obtido, check_dtype=False, check_column_type=False, rtol=1e-6, obj=nome)
+
+
+@pytest.fixture(scope='module')
+def caminhos(tmp_path_factory):
+    # Um CSV e os dois caminhos montados sobre ele, para o módulo inteiro
+    pasta = tmp_path_factory.mktemp('paridade')
+    caminho = generate_material_csv(str(pasta / 'Material-CSVANUAL.csv'), LINHAS, insumos=300, requisitantes=40, classes=8)
+    df = engine.load_material_frame(caminho)
+    cubo = build_consumption_cube(df)
+    backend = DuckDBBackend(parquet_from_csv(caminho), diretorio_temporario=str(pasta))
+    return df, cubo, FilterIndex(cubo), backend
+
+
+def random_filters(rng, cubo):
+    insumos = cubo[['Desc. Insumo', 'Cód. Insumo']].drop_duplicates().dropna()
+    amostra = insumos.iloc[rng.choice(len(insumos), size=min(len(insumos), int(rng.integers(1, 15))), replace=False)]
+    corte = int(rng.integers(0, len(amostra) + 1))
+    classes = cubo['Descricao Classe'].dropna().unique().tolist()
+    anos = sorted(cubo['Ano'].dropna().unique().tolist())
+    movimentos = engine.movement_options(cubo)
+    return dict(
+        desc=amostra['Desc. Insumo'].astype(str).tolist()[:corte], cod=amostra['Cód. Insumo'].astype(str).tolist()[corte:],
+        classes=[classes[i] for i in rng.choice(len(classes), size=int(rng.integers(0, 3)), replace=False)] if classes and rng.random() < 0.3 else [],
+        anos=[int(a) for a in rng.choice(anos, size=int(rng.integers(1, len(anos) + 1)), replace=False)],
+        movimento=movimentos[engine.default_movement_index(movimentos)] if rng.random() < 0.8 else movimentos[int(rng.integers(len(movimentos)))],
+    )
+
+
+def pandas_sections(cubo, indice, filtros):
+    base = engine.select_insumos(indice, filtros['desc'], filtros['cod'], filtros['classes'])
+    analise = engine.select_analysis(cubo, indice, base, filtros['anos'], filtros['movimento'])
+    anual = engine.annual_consumption(analise)
+    return analise, anual, engine.monthly_detail(analise, anual, filtros['anos']), engine.unit_overview(analise, 20, 200)
+
+
+def duckdb_sections(backend, filtros):
+    analise = backend.analysis(**filtros)
+    anual = backend.annual_consumption(**filtros)
+    mensal = engine.monthly_detail(analise, anual, filtros['anos'], consumo_mensal=backend.monthly_consumption(**filtros))
+    return analise, anual, mensal, engine.unit_overview(analise, 20, 200, celulas=backend.unit_cells(**filtros))
+
+
+def test_cubo(caminhos):
+    _, cubo, _, backend = caminhos
+    assert len(cubo)
+    assert_same("cubo", cubo, backend.cube()[cubo.columns], ordenar=DIMENSOES_CUBO)
+
+
+def test_gasto_por_fornecedor(caminhos):
+    df, _, _, backend = caminhos
+    cubo_fornecedor = build_supplier_cube(df)
+    assert len(cubo_fornecedor)
+    assert_same("gasto por fornecedor", cubo_fornecedor, backend.supplier_cube()[cubo_fornecedor.columns], ordenar=DIMENSOES_FORNECEDOR)
+
+
+def test_lotes_por_validade(caminhos):
+    df, _, _, backend = caminhos
+    lotes = build_lot_table(df)
+    assert len(lotes)
+    assert_same("lotes por validade", lotes, backend.lot_table())
+
+
+def _filter_cases():
+    # Sem filtro de insumo (todos) em cada movimento, e combinações aleatórias de filtros
+    return [('todos', None)] + [(f"combinação {n}", n) for n in range(COMBINACOES)]
+
+
+@pytest.mark.parametrize('nome, semente', _filter_cases(), ids=[nome for nome, _ in _filter_cases()])
+def test_secoes(caminhos, nome, semente):
+    _, cubo, indice, backend = caminhos
+    if semente is None:
+        anos = sorted(int(a) for a in cubo['Ano'].dropna().unique())
+        casos = [dict(desc=[], cod=[], classes=[], anos=anos, movimento=movimento) for movimento in engine.movement_options(cubo)]
+    else:
+        casos = [random_filters(np.random.default_rng(semente), cubo)]
+    for filtros in casos:
+        analise_p, anual_p, (grafico_p, pivot_p, meses_p), unidade_p = pandas_sections(cubo, indice, filtros)
+        analise_d, anual_d, (grafico_d, pivot_d, meses_d), unidade_d = duckdb_sections(backend, filtros)
+        assert analise_p.empty == analise_d.empty, f"{nome}: análise vazia só em um dos caminhos ({filtros})"
+        if analise_p.empty: continue
+        assert_same(f"{nome}: análise", analise_p, analise_d[analise_p.columns], ordenar=DIMENSOES_CUBO)
+        assert_same(f"{nome}: consumo anual", anual_p, anual_d)
+        assert meses_p == meses_d, f"{nome}: colunas de mês {meses_p} != {meses_d}"
+        assert_same(f"{nome}: gráfico mensal", grafico_p, grafico_d)
+        assert_same(f"{nome}: detalhe mensal", pivot_p, pivot_d)
+        assert_same(f"{nome}: visão geral por unidade", unidade_p, unidade_d)
@@ -0,0 +1,58 @@
+import os
+import shutil
+
+from consumo import ingest
+from conftest import RAIZ
+
+ORIGEM = os.path.join(RAIZ, 'Material-RELAJANEIRO.csv')
+
+
+def _linhas(caminho):
+    with open(caminho, 'rb') as f:
+        return f.read().splitlines(keepends=True)
+
+
+def _fresh_rows(pasta, destino):
+    # Linhas de uma ingestão do zero dos arquivos que estão hoje na pasta
+    destino.mkdir()
+    for caminho in ingest.list_monthly_files(str(pasta)): shutil.copyfile(caminho, destino / os.path.basename(caminho))
+    ingest.ingest_directory(str(destino))
+    return len(ingest.load_store(str(destino)))
+
+
+def test_duplicatas_voltam_quando_a_parte_que_ficou_com_elas_encolhe(tmp_path):
+    # Mês reexportado com outro nome: a cópia entra sem linhas (todas repetidas)
+    pasta = tmp_path / 'dados'; pasta.mkdir()
+    janeiro = pasta / 'Material-RELAJANEIRO.csv'
+    copia = pasta / 'Material-RELAJAN_COPIA.csv'
+    shutil.copyfile(ORIGEM, janeiro); shutil.copyfile(ORIGEM, copia)
+    resumo = ingest.ingest_directory(str(pasta))
+    total = len(ingest.load_store(str(pasta)))
+    assert resumo['linhas_duplicadas'] == total and total > 10
+
+    # O arquivo que ficou com as linhas perde as 10 últimas: elas ainda existem na cópia
+    janeiro.write_bytes(b''.join(_linhas(ORIGEM)[:-10]))
+    resumo = ingest.ingest_directory(str(pasta))
+    assert set(resumo['arquivos_lidos']) == {janeiro.name, copia.name}
+    assert len(ingest.load_store(str(pasta))) == total == _fresh_rows(pasta, tmp_path / 'do_zero')
+
+    # Sem mudanças, nada é relido
+    assert ingest.ingest_directory(str(pasta))['arquivos_lidos'] == []
+    assert len(ingest.load_store(str(pasta))) == total
+
+
+def test_parte_sem_colisao_nao_e_refeita(tmp_path):
+    pasta = tmp_path / 'dados'; pasta.mkdir()
+    janeiro = pasta / 'Material-RELAJANEIRO.csv'
+    linhas = _linhas(ORIGEM)
+    shutil.copyfile(ORIGEM, janeiro)
+    ingest.ingest_directory(str(pasta))
+    # As 10 últimas linhas saem de janeiro e vão para outro arquivo: sem colisão entre os dois
+    outro = pasta / 'Material-RELAFEVEREIRO.csv'
+    outro.write_bytes(b''.join([linhas[0]] + linhas[-10:]))
+    janeiro.write_bytes(b''.join(linhas[:-10]))
+    assert set(ingest.ingest_directory(str(pasta))['arquivos_lidos']) == {outro.name, janeiro.name}
+    # Mudar janeiro não relê o outro arquivo
+    janeiro.write_bytes(b''.join(linhas[:-20]))
+    assert ingest.ingest_directory(str(pasta))['arquivos_lidos'] == [janeiro.name]
+    assert len(ingest.load_store(str(pasta))) == _fresh_rows(pasta, tmp_path / 'do_zero')
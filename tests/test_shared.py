@@ -0,0 +1,86 @@
+import pickle
+import warnings
+
+import pandas as pd
+import pytest
+
+from consumo.shared import SharedFrame, freeze_frame
+
+
+def _frame():
+    # Colunas de vários blocos: inteiros, float, texto e categoria
+    return pd.DataFrame({'a': [1, 2, 3], 'c': [4.0, 5.0, 6.0], 'b': ['x', 'y', 'z'], 'd': pd.Categorical(['p', 'q', 'p'])})
+
+
+ESCRITAS = {
+    'setitem': lambda f: f.__setitem__('a', 0),
+    'setitem nova coluna': lambda f: f.__setitem__('n', 0),
+    'delitem': lambda f: f.__delitem__('a'),
+    'insert': lambda f: f.insert(0, 'n', 0),
+    'pop': lambda f: f.pop('a'),
+    'isetitem': lambda f: f.isetitem(0, [0, 0, 0]),
+    'update': lambda f: f.update(pd.DataFrame({'b': ['w']})),
+    'loc': lambda f: f.loc.__setitem__((0, 'a'), 5),
+    'loc texto': lambda f: f.loc.__setitem__((0, 'b'), 'w'),
+    'loc máscara': lambda f: f.loc.__setitem__((f['a'] > 1, 'c'), 0.0),
+    'loc nova coluna': lambda f: f.loc.__setitem__((0, 'n'), 1),
+    'iloc': lambda f: f.iloc.__setitem__((1, 0), 9),
+    'iloc texto': lambda f: f.iloc.__setitem__((1, 2), 'w'),
+    'at': lambda f: f.at.__setitem__((0, 'b'), 'w'),
+    'iat': lambda f: f.iat.__setitem__((0, 2), 'w'),
+    'setattr coluna': lambda f: setattr(f, 'a', [7, 7, 7]),
+    'columns': lambda f: setattr(f, 'columns', ['p', 'q', 'r', 's']),
+    'index': lambda f: setattr(f, 'index', [9, 8, 7]),
+    'rename inplace': lambda f: f.rename(columns={'a': 'z'}, inplace=True),
+    'rename_axis inplace': lambda f: f.rename_axis('eixo', inplace=True),
+    'fillna inplace': lambda f: f.fillna(0, inplace=True),
+    'replace inplace': lambda f: f.replace('x', 'w', inplace=True),
+    'drop inplace': lambda f: f.drop(columns='a', inplace=True),
+    'dropna inplace': lambda f: f.dropna(inplace=True),
+    'sort_values inplace': lambda f: f.sort_values('a', ascending=False, inplace=True),
+    'sort_index inplace': lambda f: f.sort_index(ascending=False, inplace=True),
+    'set_index inplace': lambda f: f.set_index('a', inplace=True),
+    'reset_index inplace': lambda f: f.reset_index(inplace=True),
+    'where inplace': lambda f: f.where(f == 0, inplace=True),
+    'mask inplace': lambda f: f.mask(f['a'] > 0, inplace=True),
+    'clip inplace': lambda f: f.clip(lower=0, inplace=True),
+    'eval inplace': lambda f: f.eval('n = a + 1', inplace=True),
+    'query inplace': lambda f: f.query('a > 1', inplace=True),
+    'iadd': lambda f: f.__iadd__(1),
+    'imul': lambda f: f.__imul__(2),
+}
+
+
+@pytest.mark.parametrize('escrita', ESCRITAS.values(), ids=ESCRITAS.keys())
+def test_escrita_levanta_sem_alterar(escrita):
+    original = _frame()
+    compartilhado = freeze_frame(original)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        with pytest.raises(TypeError, match='somente leitura'):
+            escrita(compartilhado)
+    pd.testing.assert_frame_equal(pd.DataFrame(compartilhado), _frame())
+    pd.testing.assert_frame_equal(original, _frame())
+    assert list(compartilhado.a) == [1, 2, 3]
+
+
+def test_leitura_e_derivados():
+    compartilhado = freeze_frame(_frame())
+    assert compartilhado.loc[1, 'b'] == 'y' and compartilhado.iloc[2, 0] == 3
+    assert compartilhado.at[0, 'c'] == 4.0 and compartilhado.iat[0, 3] == 'p'
+    # Derivados são DataFrames comuns, livres para alterar
+    derivado = compartilhado.loc[compartilhado['a'] > 1]
+    assert type(derivado) is pd.DataFrame
+    derivado.loc[:, 'b'] = 'w'
+    copia = compartilhado.copy()
+    copia.loc[0, 'a'] = 5
+    copia.rename(columns={'a': 'z'}, inplace=True)
+    assert type(compartilhado.sort_values('a')) is pd.DataFrame
+    pd.testing.assert_frame_equal(pd.DataFrame(compartilhado), _frame())
+
+
+def test_pickle():
+    compartilhado = freeze_frame(_frame())
+    restaurado = pickle.loads(pickle.dumps(compartilhado))
+    assert isinstance(restaurado, SharedFrame)
+    pd.testing.assert_frame_equal(pd.DataFrame(restaurado), _frame())